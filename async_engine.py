@@ -0,0 +1,332 @@
+"""
+异步抢课引擎：基于 asyncio + aiohttp，同时保持多个 yySave.do 请求在途。
+
+- 连接沿用 tls_transport 中兼容旧服务器的共享 SSLContext；
+- 服务器只认每个 session 最近一次下发的验证码，同一 session 上「取验证码 → 提交」必须串行，
+  因此每个在途请求各用一个独立的 session（通道）：主通道使用当前会话与调用方的预取器，
+  其余 concurrency - 1 个通道从 SessionPool 借出热备会话，各自配一个验证码预取器；
+- 每个请求按 session 当前的 cookie 构造 Cookie 头，响应中的 Set-Cookie 写回 session，与验证码预取线程保持一致；
+- 全局令牌桶限速，避免触发服务器「频繁」限制，一旦出现「频繁」则全体暂停；
+- 任一请求被确认预约成功后，立即取消其余在途请求；
+- 传入 SessionPool 时，请求被重定向到登录页或连续网络层异常会切换到热备会话，后续请求改用新会话的 cookie。
+
+CLI 与 GUI 的 FetchThread 都在各自线程中调用 run()（内部自建事件循环），
+通过 on_result 回调输出每次请求的结果，通过 stop() 从其他线程中止。
+"""
+import asyncio
+import json
+import re
+import time
+
+import aiohttp
+import requests
+
+from session_pool import FAULT_EXPIRED, LOGIN_EXPIRED_CODE, LOGIN_EXPIRED_MSG, TRANSPORT_ERROR_MSG, session_fault
+from session_store import copy_cookie_jar, is_login_redirect
+from tls_transport import legacy_ssl_context
+
+YYSAVE_URL = "https://ehall.seu.edu.cn/gsapp/sys/jzxxtjapp/hdyy/yySave.do"
+DEFAULT_REFERER = "https://ehall.seu.edu.cn/gsapp/sys/jzxxtjapp/*default/index.do"
+
+_JSON_START_RE = re.compile(r'[\[\{]')
+# 从预取器取验证码时每次最多阻塞的秒数（线程中的阻塞调用无法取消，取短一些以便及时退出）
+POP_POLL = 0.2
+# 持续取不到验证码时每隔多少秒报告一次
+POP_TIMEOUT = 5
+
+
+def _parse_json_text(text):
+    """与 _parse_json 相同的容错解析：跳过响应前导不可见字节。"""
+    try:
+        return json.loads(text)
+    except ValueError:
+        m = _JSON_START_RE.search(text)
+        if m:
+            try:
+                return json.loads(text[m.start():])
+            except ValueError:
+                return None
+        return None
+
+
+class AsyncRateLimiter:
+    """令牌桶限速：平均每秒 rate 个请求，允许 burst 个突发。"""
+
+    def __init__(self, rate, burst=1):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._last = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def pause(self, seconds):
+        """全体暂停 seconds 秒（如服务器提示请求频繁）。"""
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+        self._tokens = 0.0
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self._paused_until:
+                    await asyncio.sleep(self._paused_until - now)
+                    self._last = time.monotonic()
+                    continue
+                self._tokens = min(self.burst, self._tokens + (now - self._last) * self.rate)
+                self._last = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+class AsyncBookingEngine:
+    """
+    并发抢课引擎。
+
+    Args:
+        session: 已登录 ehall 的 requests.Session（提供 cookie、请求头与 ehall_referer）
+        wid: 目标讲座 WID
+        prefetcher: 主通道（当前会话）的 CaptchaPrefetcher
+        confirm: 无参函数，查询已预约列表确认是否成功（在线程池中执行）
+        concurrency: 在途请求数（通道数）；大于 1 时需要 pool 与 make_prefetcher，
+            额外通道借不到热备会话时先空转，借到后再加入
+        rate: 全局限速（每秒请求数）
+        check_interval: 每完成多少次请求主动确认一次（服务器返回成功时总会确认）
+        on_result: 回调 on_result(attempt, code, msg, success)，在引擎线程中调用
+        is_full: 可选的无参函数，返回 True 时表示讲座已满，暂缓发送请求（如 CapacityMonitor.is_full）
+        feedback: 可选回调 feedback(image, code, resp_code, msg, success)，把每次提交的验证码与结果
+            反馈给识别器（如 CaptchaSolver.feedback），在引擎线程中调用
+        pool: 可选的 SessionPool，session 失效时切换到热备会话（验证码预取需随 pool.on_failover 一起切换）；
+            额外通道的会话也从这里借出
+        make_prefetcher: 可选函数 make_prefetcher(session)，为额外通道的会话创建（未启动的）CaptchaPrefetcher
+    """
+
+    FREQUENT_PAUSE = 10  # 服务器提示「频繁」后的全体暂停秒数
+    LEASE_RETRY = 2  # 额外通道借不到会话时的重试间隔（秒）
+
+    def __init__(self, session, wid, prefetcher, confirm, concurrency=1, rate=4.0,
+                 check_interval=5, on_result=None, timeout=10, is_full=None, feedback=None, pool=None,
+                 make_prefetcher=None):
+        self.session = session
+        self.wid = wid
+        self.prefetcher = prefetcher
+        self.confirm = confirm
+        self.concurrency = max(1, int(concurrency))
+        self.rate = rate
+        self.check_interval = check_interval
+        self.on_result = on_result
+        self.timeout = timeout
+        self.is_full = is_full
+        self.feedback = feedback
+        self.pool = pool
+        self.make_prefetcher = make_prefetcher
+        if pool is None or make_prefetcher is None:
+            # 没有独立会话可用时无法并发提交
+            self.concurrency = 1
+        self.attempts = 0
+        self.confirmed = False
+        self._loop = None
+        self._done = None
+        self._stop_requested = False
+
+    def stop(self):
+        """从任意线程请求停止，所有在途请求会被取消。"""
+        self._stop_requested = True
+        loop, done = self._loop, self._done
+        if loop is not None and done is not None:
+            loop.call_soon_threadsafe(done.set)
+
+    def run(self):
+        """阻塞运行直到确认成功或被 stop()，返回是否确认成功。"""
+        return asyncio.run(self._main())
+
+    def _headers(self):
+        """所有请求共用的请求头；Cookie 与 Referer 随每个请求单独构造（见 _session_headers）。"""
+        headers = {k: v for k, v in self.session.headers.items() if k.lower() != "content-type"}
+        headers.update({
+            "Accept": "application/json, text/javascript, */*; q=0.01",
+            "Accept-Language": "zh-CN,zh;q=0.9,en;q=0.8,en-GB;q=0.7,en-US;q=0.6",
+            "Content-Type": "application/x-www-form-urlencoded; charset=UTF-8",
+            "Sec-Fetch-Site": "same-origin",
+            "Sec-Fetch-Mode": "cors",
+            "Sec-Fetch-Dest": "empty",
+            "X-Requested-With": "XMLHttpRequest",
+        })
+        return headers
+
+    @staticmethod
+    def _session_headers(session):
+        headers = {"Referer": getattr(session, "ehall_referer", DEFAULT_REFERER)}
+        # 由 requests 按自身的 cookie 策略挑选适用于 yySave.do 的 cookie；每次都从 session 当前的 cookie 构造，
+        # 验证码预取线程收到的新 cookie 也会带上
+        cookie = requests.cookies.get_cookie_header(copy_cookie_jar(session), requests.Request("POST", YYSAVE_URL))
+        if cookie:
+            headers["Cookie"] = cookie
+        return headers
+
+    @staticmethod
+    def _store_cookies(session, response):
+        """把响应中的 Set-Cookie 写回 requests session（aiohttp 这边用 DummyCookieJar，不保存 cookie）。"""
+        for morsel in response.cookies.values():
+            session.cookies.set(
+                morsel.key, morsel.value,
+                domain=morsel["domain"] or response.url.host, path=morsel["path"] or "/",
+            )
+
+    async def _main(self):
+        self._loop = asyncio.get_running_loop()
+        self._done = asyncio.Event()
+        if self._stop_requested:
+            return False
+        self._limiter = AsyncRateLimiter(self.rate, burst=self.concurrency)
+        self._confirm_lock = asyncio.Lock()
+
+        connector = aiohttp.TCPConnector(ssl=legacy_ssl_context(), limit=self.concurrency)
+        async with aiohttp.ClientSession(
+            connector=connector,
+            headers=self._headers(),
+            cookie_jar=aiohttp.DummyCookieJar(),
+            timeout=aiohttp.ClientTimeout(total=self.timeout),
+        ) as client:
+            workers = [asyncio.create_task(self._worker(client))]
+            workers += [asyncio.create_task(self._lane(client)) for _ in range(self.concurrency - 1)]
+            await self._done.wait()
+            for w in workers:
+                w.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+        # 被取消的主通道可能刚取走一张验证码，释放「提交中」状态，预取器可以继续补充
+        self.prefetcher.done()
+        return self.confirmed
+
+    async def _worker(self, client):
+        """主通道：使用当前会话（有会话池时跟随切换）与调用方的预取器。"""
+        while not self._done.is_set():
+            session = self._active_session()
+            result = await self._attempt(client, session, self.prefetcher)
+            if result is None:
+                if self.prefetcher.stopped:
+                    # 预取器已停止，不会再有验证码
+                    self._done.set()
+                continue
+            code, msg, success = result
+            if self.pool is not None:
+                # 登录失效或连续请求异常时切换到热备会话（或由后台创建好后切换），不阻塞事件循环；
+                # 下一次请求通过 _active_session() 读到新会话
+                self.pool.report(session, code, msg)
+            await self._after(msg, success)
+
+    async def _lane(self, client):
+        """额外通道：从会话池借一个热备会话并配一个验证码预取器，会话失效时归还不用、重新借。"""
+        session = prefetcher = None
+        try:
+            while not self._done.is_set():
+                if session is None:
+                    leased = self.pool.lease(1)
+                    if not leased:
+                        await asyncio.sleep(self.LEASE_RETRY)
+                        continue
+                    session = leased[0]
+                    prefetcher = self.make_prefetcher(session)
+                    prefetcher.start()
+                result = await self._attempt(client, session, prefetcher)
+                if result is None:
+                    continue
+                code, msg, success = result
+                if session_fault(code, msg) == FAULT_EXPIRED:
+                    prefetcher.stop()
+                    session = prefetcher = None
+                await self._after(msg, success)
+        finally:
+            if prefetcher is not None:
+                prefetcher.stop()
+
+    async def _attempt(self, client, session, prefetcher):
+        """在一个通道上取验证码并提交一次，返回 (code, msg, success)；讲座已满或取不到验证码时返回 None。"""
+        if self.is_full is not None and self.is_full():
+            await asyncio.sleep(1)
+            return None
+        item = await self._pop(prefetcher)
+        if item is None:
+            return None
+        v_code = item[0]
+        try:
+            await self._limiter.acquire()
+            if prefetcher is self.prefetcher and self._active_session() is not session:
+                # 等待期间已切换会话，旧会话下取得的验证码不能用新会话提交
+                return None
+            code, msg, success = await self._save(client, session, v_code)
+        finally:
+            prefetcher.done()
+        self._report(code, msg, success)
+        if self.feedback is not None:
+            self.feedback(item[1], v_code, code, msg, success)
+        return code, msg, success
+
+    async def _after(self, msg, success):
+        if "频繁" in msg:
+            self._limiter.pause(self.FREQUENT_PAUSE)
+        if "验证码错误" in msg:
+            return
+        if success or self.attempts % self.check_interval == 0:
+            await self._check()
+
+    async def _pop(self, prefetcher):
+        """
+        从预取器取一张验证码，持续取不到时每 POP_TIMEOUT 秒报告一次。
+        预取器已停止或引擎已结束时返回 None。
+        """
+        deadline = time.monotonic() + POP_TIMEOUT
+        while not self._done.is_set() and not prefetcher.stopped:
+            item = await asyncio.to_thread(prefetcher.pop, POP_POLL)
+            if item is not None:
+                return item
+            if time.monotonic() >= deadline:
+                self._report(500, "验证码预取超时", False)
+                deadline = time.monotonic() + POP_TIMEOUT
+        return None
+
+    async def _save(self, client, session, v_code):
+        form_data = {"paramJson": json.dumps({"HD_WID": self.wid, "vcode": v_code})}
+        try:
+            async with client.post(YYSAVE_URL, data=form_data, headers=self._session_headers(session)) as r:
+                text = await r.text(errors="replace")
+                content_type = r.headers.get("Content-Type", "")
+                final_url = r.url
+                self._store_cookies(session, r)
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            return 500, f"{TRANSPORT_ERROR_MSG}: {str(e)[:80]}", False
+
+        if is_login_redirect(final_url):
+            return LOGIN_EXPIRED_CODE, LOGIN_EXPIRED_MSG, False
+
+        if not text.strip():
+            return 500, "服务器繁忙，无响应内容", False
+        if content_type.startswith("text/html"):
+            return 500, "服务器繁忙，返回异常页面", False
+        result = _parse_json_text(text)
+        if not isinstance(result, dict):
+            return 500, "服务器繁忙，响应非JSON", False
+        return result.get("code", -1), result.get("msg", "未知错误"), result.get("success", False)
+
+    def _active_session(self):
+        """当前应使用的 session：有会话池时以 pool.active 为准，切换（包括余量监视触发的切换）后立即生效。"""
+        if self.pool is not None:
+            return self.pool.active
+        return self.session
+
+    def _report(self, code, msg, success):
+        self.attempts += 1
+        if self.on_result:
+            self.on_result(self.attempts, code, msg, success)
+        return self.attempts
+
+    async def _check(self):
+        # 多个请求同时触发确认时只查询一次
+        if self._confirm_lock.locked():
+            return
+        async with self._confirm_lock:
+            if await asyncio.to_thread(self.confirm):
+                self.confirmed = True
+                self._done.set()
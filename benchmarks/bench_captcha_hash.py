@@ -0,0 +1,70 @@
+"""
+微基准：比较验证码查表键的计算开销。
+
+- legacy：PIL 解码 + 重新编码为 JPEG + md5（旧版 get_code 的做法）
+- raw：直接对 vcode.do 返回的原始字节求 md5
+
+用法：
+    python benchmarks/bench_captcha_hash.py                 # 使用合成的验证码图片
+    python benchmarks/bench_captcha_hash.py code_img/true   # 使用已保存的真实验证码
+"""
+import os
+import random
+import sys
+import timeit
+from io import BytesIO
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+
+from captcha_table import legacy_digest, raw_digest
+
+
+def synthetic_captchas(n=20):
+    """生成与讲座系统验证码尺寸相近的 JPEG 图片。"""
+    from PIL import Image, ImageDraw
+
+    rng = random.Random(0)
+    images = []
+    for _ in range(n):
+        img = Image.new("RGB", (90, 34), (rng.randint(200, 255),) * 3)
+        draw = ImageDraw.Draw(img)
+        for _ in range(30):
+            draw.point((rng.randrange(90), rng.randrange(34)), fill=(rng.randrange(256),) * 3)
+        draw.text((12, 10), "".join(rng.choice("0123456789") for _ in range(4)), fill=(0, 0, 0))
+        with BytesIO() as out:
+            img.save(out, format="JPEG")
+            images.append(out.getvalue())
+    return images
+
+
+def load_captchas(path):
+    images = []
+    for name in sorted(os.listdir(path)):
+        if name.lower().endswith((".jpg", ".jpeg", ".png")):
+            with open(os.path.join(path, name), "rb") as f:
+                images.append(f.read())
+    return images
+
+
+def bench(func, images, number):
+    total = timeit.timeit(lambda: [func(img) for img in images], number=number)
+    return total / (number * len(images)) * 1e6
+
+
+def main():
+    images = load_captchas(sys.argv[1]) if len(sys.argv) > 1 else synthetic_captchas()
+    if not images:
+        print("未找到验证码图片")
+        return
+    number = max(1, 2000 // len(images))
+    legacy_us = bench(legacy_digest, images, number)
+    raw_us = bench(raw_digest, images, number)
+    print(f"样本数: {len(images)}，平均大小: {sum(map(len, images)) / len(images):.0f} 字节")
+    print(f"legacy (PIL 解码 + JPEG 编码 + md5): {legacy_us:8.2f} µs/张")
+    print(f"raw    (原始字节 md5):               {raw_us:8.2f} µs/张")
+    print(f"每张节省: {legacy_us - raw_us:.2f} µs（{legacy_us / raw_us:.0f}x）")
+
+
+if __name__ == "__main__":
+    main()
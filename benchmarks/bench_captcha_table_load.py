@@ -0,0 +1,72 @@
+"""
+基准：比较 CSV 与二进制（mmap）对照表的加载耗时、查询耗时与内存占用。
+
+合成指定条目数的对照表写入临时目录，分别加载后随机查询（一半命中）。
+内存占用以 tracemalloc 统计的 Python 堆分配为准，mmap 映射的页缓存不计入、且可在进程间共享。
+
+用法：
+    python benchmarks/bench_captcha_table_load.py            # 默认 100000 条
+    python benchmarks/bench_captcha_table_load.py 1000000
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+
+from captcha_table import CaptchaHashTable, write_binary_table, write_table
+
+
+def synthetic_table(n):
+    rng = random.Random(0)
+    return {"%032x" % rng.getrandbits(128): "%04d" % rng.randrange(10000) for _ in range(n)}
+
+
+def measure_load(path):
+    tracemalloc.start()
+    start = time.perf_counter()
+    table = CaptchaHashTable(path)
+    elapsed = time.perf_counter() - start
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return table, elapsed, current, peak
+
+
+def measure_lookup(table, keys):
+    start = time.perf_counter()
+    for key in keys:
+        table.get(key)
+    return (time.perf_counter() - start) / len(keys) * 1e6
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    raw = synthetic_table(n)
+    rng = random.Random(1)
+    present = rng.sample(sorted(raw), min(5000, n))
+    keys = present + ["%032x" % rng.getrandbits(128) for _ in present]
+    rng.shuffle(keys)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = os.path.join(tmp, "table.csv")
+        bin_path = os.path.join(tmp, "table.bin")
+        write_table(csv_path, raw)
+        write_binary_table(bin_path, raw)
+
+        print(f"条目数: {n}，CSV {os.path.getsize(csv_path) / 1024:.0f} KiB，"
+              f"二进制 {os.path.getsize(bin_path) / 1024:.0f} KiB")
+        print(f"{'格式':<8}{'加载(ms)':>10}{'常驻堆(KiB)':>14}{'峰值堆(KiB)':>14}{'查询(µs)':>10}")
+        for name, path in (("csv", csv_path), ("binary", bin_path)):
+            table, elapsed, current, peak = measure_load(path)
+            per_lookup = measure_lookup(table, keys)
+            print(f"{name:<8}{elapsed * 1000:>10.1f}{current / 1024:>14.0f}{peak / 1024:>14.0f}{per_lookup:>10.2f}")
+            if table.packed is not None:
+                table.packed.close()
+
+
+if __name__ == "__main__":
+    main()
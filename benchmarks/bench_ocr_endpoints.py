@@ -0,0 +1,92 @@
+"""
+比较 OCR 服务各识别端点的延迟（p50 / p99）。
+
+- base64：POST /predict_base64，JSON 包裹的 Base64 字符串（油猴脚本当前的调用方式）
+- raw：POST /predict_raw，请求体即图片原始字节，响应为纯文本
+每种端点分别测试「长连接复用」与「每次新建连接」两种情况，使用同一组验证码。
+
+先启动服务：python ddddocr_api.py
+用法：
+    python benchmarks/bench_ocr_endpoints.py                          # 合成验证码，默认 http://127.0.0.1:5000
+    python benchmarks/bench_ocr_endpoints.py code_img/true --rounds 5
+    python benchmarks/bench_ocr_endpoints.py --url http://192.168.1.10:5000
+"""
+import argparse
+import base64
+import http.client
+import json
+import os
+import sys
+import time
+from urllib.parse import urlsplit
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+
+from bench_captcha_hash import load_captchas, synthetic_captchas
+
+
+def request_base64(conn, img):
+    body = json.dumps({"img_b64": base64.b64encode(img).decode()})
+    conn.request("POST", "/predict_base64", body, {"Content-Type": "application/json"})
+    r = conn.getresponse()
+    return r.status, json.loads(r.read()).get("result", "")
+
+
+def request_raw(conn, img):
+    conn.request("POST", "/predict_raw", img, {"Content-Type": "application/octet-stream"})
+    r = conn.getresponse()
+    return r.status, r.read().decode("utf-8")
+
+
+def percentile(sorted_values, p):
+    idx = min(len(sorted_values) - 1, max(0, round(p / 100 * (len(sorted_values) - 1))))
+    return sorted_values[idx]
+
+
+def run(func, images, rounds, host, port, keep_alive):
+    latencies = []
+    conn = http.client.HTTPConnection(host, port, timeout=10)
+    for _ in range(rounds):
+        for img in images:
+            if not keep_alive:
+                conn.close()
+                conn = http.client.HTTPConnection(host, port, timeout=10)
+            t0 = time.perf_counter()
+            status, _ = func(conn, img)
+            latencies.append((time.perf_counter() - t0) * 1000)
+            if status != 200:
+                raise RuntimeError(f"HTTP {status}")
+    conn.close()
+    latencies.sort()
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description="OCR 端点延迟基准")
+    parser.add_argument("images", nargs="?", help="验证码图片目录，默认使用合成图片")
+    parser.add_argument("--url", default="http://127.0.0.1:5000")
+    parser.add_argument("--rounds", type=int, default=3, help="每组图片重复的轮数")
+    args = parser.parse_args()
+
+    images = load_captchas(args.images) if args.images else synthetic_captchas()
+    if not images:
+        print("未找到验证码图片")
+        return
+    url = urlsplit(args.url)
+    host, port = url.hostname, url.port or 80
+
+    # 预热：让服务端完成模型首次推理
+    run(request_raw, images[:1], 1, host, port, True)
+
+    print(f"样本数: {len(images)} x {args.rounds} 轮，服务: {args.url}")
+    print(f"{'端点':<24}{'p50 (ms)':>10}{'p99 (ms)':>10}{'平均 (ms)':>11}")
+    for name, func in (("base64", request_base64), ("raw", request_raw)):
+        for keep_alive in (True, False):
+            lat = run(func, images, args.rounds, host, port, keep_alive)
+            label = f"{name} ({'长连接' if keep_alive else '每次新连接'})"
+            print(f"{label:<24}{percentile(lat, 50):>10.2f}{percentile(lat, 99):>10.2f}{sum(lat) / len(lat):>11.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+余量监视：独立于抢课请求，按自身节奏轮询讲座列表，发布目标讲座最新的 (总人数, 已预约人数)。
+
+抢课循环不再在每次 yySave.do 之前拉取整张讲座列表（pageSize=100），
+只读取 CapacityMonitor.current() 即可判断是否已满，读取不加锁、不阻塞。
+快照过旧或最近一次刷新失败时视为余量未知（不算已满），抢课请求照常发送，与不做余量检查时一致。
+"""
+import threading
+import time
+
+# 快照超过 interval 的该倍数仍未刷新时视为未知
+STALE_INTERVALS = 3
+
+
+class CapacityMonitor:
+    """
+    后台轮询目标讲座余量。
+
+    snapshot 为不可变元组 (total, booked, updated_at)，updated_at 为 time.monotonic()；
+    每次刷新整体替换该属性（单次赋值是原子的），读方无需加锁；尚未取到数据或最近一次刷新失败时为 None。
+
+    Args:
+        fetch_func: 无参函数，返回讲座列表（list[dict]），服务器繁忙时返回 None；
+                    抛出 RuntimeError 表示 VPN/登录失效等致命错误
+        wid: 目标讲座 WID
+        interval: 有余量时的轮询间隔（秒）
+        full_interval: 已满时的轮询间隔（秒），用于尽快发现有人退课
+    """
+
+    def __init__(self, fetch_func, wid, interval=5, full_interval=1):
+        self._fetch_func = fetch_func
+        self.wid = wid
+        self.interval = interval
+        self.full_interval = full_interval
+        self.snapshot = None
+        self.fatal_error = None
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="capacity-monitor", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join(timeout=2)
+        self._thread = None
+
+    def poke(self):
+        """立即触发一次刷新（例如抢课请求返回人数已满）。"""
+        self._wake.set()
+
+    def current(self):
+        """返回未过期的快照，过旧或没有时返回 None。"""
+        snap = self.snapshot
+        if snap is None or time.monotonic() - snap[2] > self.interval * STALE_INTERVALS:
+            return None
+        return snap
+
+    def is_full(self):
+        snap = self.current()
+        return snap is not None and snap[0] <= snap[1]
+
+    def refresh(self):
+        """同步刷新一次，返回是否取到了目标讲座的数据。"""
+        try:
+            lecture_list = self._fetch_func()
+        except RuntimeError as e:
+            self.fatal_error = e
+            lecture_list = None
+        except Exception:
+            lecture_list = None
+        for lecture in lecture_list or []:
+            if lecture.get("WID") == self.wid:
+                self.snapshot = (int(lecture["HDZRS"]), int(lecture["YYRS"]), time.monotonic())
+                return True
+        # 取不到数据时不再沿用旧快照，否则一次「已满」会让抢课一直暂停
+        self.snapshot = None
+        return False
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.refresh()
+            if self.fatal_error is not None:
+                break
+            self._wake.wait(self.full_interval if self.is_full() else self.interval)
+            self._wake.clear()
@@ -0,0 +1,133 @@
+"""
+验证码在线学习：根据 yySave.do 的返回结果持续扩充对照表。
+
+- 服务器确认接受的验证码（预约成功，或返回名额已满、已预约等校验通过后才有的提示）记为 (原始字节 md5 → label)，立即写入内存中的
+  对照表与感知哈希索引，正在运行的识别马上就能命中；
+- 服务器拒绝的 (md5, label) 记为已知错误，同一张图不会再以同一个错误答案提交，
+  对照表与近邻索引中的该答案一并删除。
+
+学习结果以追加方式写入日志文件（默认 captcha_learned.csv），每行 `ok|bad,md5,label`，
+每条记录一次 write() 写完，进程中途退出最多丢掉最后一行，不会破坏已有内容。
+下次启动时按顺序重放，后出现的记录覆盖先出现的。
+"""
+import os
+import threading
+
+from captcha_phash import dhash
+from captcha_table import raw_digest
+
+LEARNED_PATH = "captcha_learned.csv"
+
+
+# 只有验证码校验通过之后才会出现的业务提示
+VERIFIED_MESSAGES = ("名额已满", "人数已满", "已预约")
+
+
+def captcha_verdict(code, msg, success):
+    """
+    根据 yySave.do 的返回判断验证码是否正确：True 正确，False 错误，None 无法判断。
+    只有预约成功或 VERIFIED_MESSAGES 中的业务提示才说明验证码已通过校验；请求异常（本地构造的 500）、
+    限流、未开放、登录失效以及其他未知提示都不一定经过验证码校验，不作为学习依据。
+    """
+    if success:
+        return True
+    msg = msg or ""
+    if "验证码错误" in msg:
+        return False
+    if code == 500:
+        return None
+    if any(text in msg for text in VERIFIED_MESSAGES):
+        return True
+    return None
+
+
+class CaptchaLearningStore:
+    """把服务器反馈的验证码结果写回对照表，并记录已知错误答案。"""
+
+    def __init__(self, path=LEARNED_PATH, table=None, phash_index=None):
+        self.path = path
+        self.table = table
+        self.phash_index = phash_index
+        self.rejected = {}  # md5 -> {已被服务器拒绝的 label}
+        self.confirmed = 0
+        self.rejected_count = 0
+        self._lock = threading.Lock()
+        if path and os.path.exists(path):
+            self.load()
+
+    def load(self):
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                parts = line.rstrip("\n").split(",", 2)
+                if len(parts) != 3 or not parts[2]:
+                    continue
+                kind, digest, label = parts
+                if kind == "ok":
+                    self._apply_confirm(digest, label)
+                elif kind == "bad":
+                    self._apply_reject(digest, label)
+
+    def is_rejected(self, digest, label):
+        labels = self.rejected.get(digest)
+        return labels is not None and label in labels
+
+    def confirm(self, img_bytes, label, digest=None):
+        """记录一条服务器确认正确的验证码。"""
+        if not label:
+            return
+        digest = digest or raw_digest(img_bytes)
+        if self.table is not None and self.table.get(digest) == label:
+            return
+        self._apply_confirm(digest, label)
+        if self.phash_index is not None:
+            try:
+                self.phash_index.add(dhash(img_bytes), label)
+            except Exception:
+                pass
+        self._append("ok", digest, label)
+
+    def reject(self, img_bytes, label, digest=None):
+        """记录一条服务器拒绝的 (验证码, 答案)。"""
+        if not label:
+            return
+        digest = digest or raw_digest(img_bytes)
+        if self.is_rejected(digest, label):
+            return
+        self._apply_reject(digest, label)
+        if self.phash_index is not None:
+            # confirm() 可能已把这个答案加入近邻索引，不删掉的话相近的图片仍会命中错误答案
+            try:
+                self.phash_index.discard(dhash(img_bytes), label)
+            except Exception:
+                pass
+        self._append("bad", digest, label)
+
+    def _apply_confirm(self, digest, label):
+        if self.table is not None:
+            self.table.add(digest, label)
+        labels = self.rejected.get(digest)
+        if labels is not None:
+            labels.discard(label)
+        self.confirmed += 1
+
+    def _apply_reject(self, digest, label):
+        self.rejected.setdefault(digest, set()).add(label)
+        if self.table is not None:
+            # 对照表里的答案被服务器否定，删掉以免再次命中
+            self.table.discard(digest, label)
+        self.rejected_count += 1
+
+    def _append(self, kind, digest, label):
+        if not self.path:
+            return
+        data = f"{kind},{digest},{label}\n".encode("utf-8")
+        with self._lock:
+            try:
+                fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+                try:
+                    os.write(fd, data)
+                finally:
+                    os.close(fd)
+            except OSError:
+                # 学习结果只是加速手段，写盘失败不影响抢课
+                pass
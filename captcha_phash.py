@@ -0,0 +1,118 @@
+"""
+验证码感知哈希索引：服务器 JPEG 编码哪怕只差一个字节，精确 md5 就会失配；
+感知哈希（dHash，64 位）对这种重新编码不敏感，按汉明距离查找近邻即可命中同一张验证码。
+
+哈希以 64 位整数紧凑存放在 array('Q') 中，BK 树按汉明距离建索引，查询只需访问少量节点。
+文件格式为每行 `16 位十六进制哈希,label`，可用 tools/build_phash_index.py 从已标注的验证码图片生成。
+"""
+import os
+import threading
+from array import array
+from io import BytesIO
+
+# 默认最大汉明距离。验证码背景相近，阈值过大可能把不同数字的验证码判为同一张
+PHASH_MAX_DISTANCE = 4
+
+
+def dhash(img_bytes):
+    """计算 64 位差值哈希（dHash）：缩放为 9x8 灰度图，比较每行相邻像素的明暗。"""
+    from PIL import Image
+
+    img = Image.open(BytesIO(img_bytes)).convert("L").resize((9, 8), Image.BILINEAR)
+    px = img.tobytes()
+    value = 0
+    for row in range(8):
+        base = row * 9
+        for col in range(8):
+            value = (value << 1) | (px[base + col] > px[base + col + 1])
+    return value
+
+
+class PerceptualIndex:
+    """基于 BK 树的 64 位感知哈希近邻索引。"""
+
+    def __init__(self, path=None):
+        self.hashes = array("Q")
+        self.labels = []
+        # BK 树：_children[i] 为 {与节点 i 的距离: 子节点下标}，节点 0 为根
+        self._children = []
+        self._lookup = {}  # hash -> 下标，避免重复插入
+        self._lock = threading.Lock()
+        if path and os.path.exists(path):
+            self.load(path)
+
+    def __len__(self):
+        return len(self.hashes)
+
+    def load(self, path):
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line or line.startswith("#"):
+                    continue
+                try:
+                    hash_hex, label = line.split(",", 1)
+                    self.add(int(hash_hex, 16), label)
+                except ValueError:
+                    continue
+
+    def add(self, value, label):
+        """插入一条 (hash, label)；同一哈希已存在时更新标签。"""
+        with self._lock:
+            idx = self._lookup.get(value)
+            if idx is not None:
+                self.labels[idx] = label
+                return
+            idx = len(self.hashes)
+            self.hashes.append(value)
+            self.labels.append(label)
+            self._children.append({})
+            self._lookup[value] = idx
+            if idx == 0:
+                return
+            node = 0
+            while True:
+                d = (self.hashes[node] ^ value).bit_count()
+                child = self._children[node].get(d)
+                if child is None:
+                    self._children[node][d] = idx
+                    return
+                node = child
+
+    def discard(self, value, label):
+        """删除标签为 label 的 (hash, label)。BK 树不便摘除节点，只把标签置为 None，节点仍用于剪枝。"""
+        with self._lock:
+            idx = self._lookup.get(value)
+            if idx is not None and self.labels[idx] == label:
+                self.labels[idx] = None
+
+    def nearest(self, value, max_distance=PHASH_MAX_DISTANCE):
+        """返回距离不超过 max_distance 的最近邻 (label, distance)，没有则返回 None。"""
+        if not self.hashes:
+            return None
+        best_idx, best_d = -1, max_distance + 1
+        stack = [0]
+        while stack:
+            node = stack.pop()
+            d = (self.hashes[node] ^ value).bit_count()
+            if d < best_d and self.labels[node] is not None:
+                best_idx, best_d = node, d
+                if d == 0:
+                    break
+            # 三角不等式剪枝：只有 |d - k| < best_d 的子树可能包含更近的点
+            # 复制成元组再遍历，与并发的 add() 互不干扰
+            for k, child in tuple(self._children[node].items()):
+                if d - best_d < k < d + best_d:
+                    stack.append(child)
+        if best_idx < 0:
+            return None
+        return self.labels[best_idx], best_d
+
+    def save(self, path):
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8", newline="\n") as f:
+            for value, label in zip(self.hashes, self.labels):
+                if label is None:
+                    continue
+                f.write(f"{value:016x},{label}\n")
+        os.replace(tmp_path, path)
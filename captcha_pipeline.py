@@ -0,0 +1,151 @@
+"""
+验证码预取流水线：后台线程提前完成 vcode.do 请求、解码与识别，
+抢课循环直接取出已识别好的验证码立即发送 yySave.do，不再串行等待验证码往返与 OCR。
+
+服务器只认每个 session 最近一次下发的验证码：在调用方提交之前再请求 vcode.do，
+手上这条就作废了。因此每个 session 最多只预取一条，并且在调用方取走之后，
+要等它报告提交完成（done()）或再次 pop() 时才会获取下一条。
+
+使用方法：
+1. 用一个无参函数构造 CaptchaPrefetcher，该函数返回 (code, image_bytes)，失败时抛异常；
+2. 在目标时间前（二次登录之后）调用 start() 开始预取；
+3. 抢课时调用 pop() 取出一条 (code, image, fetched_at)，yySave.do 返回后调用 done()；
+4. session 被替换后调用 invalidate() 丢弃旧 session 下取到的验证码；结束时调用 stop()。
+"""
+import threading
+import time
+from collections import deque
+
+# 服务器端验证码有效期（秒），超过该时长的预取结果视为过期直接丢弃
+CAPTCHA_VALIDITY = 60
+
+
+class CaptchaPrefetcher:
+    """
+    单个 session 的已识别验证码槽位，由后台线程补充。
+
+    队列元素为 (code, image, fetched_at)，fetched_at 为 time.monotonic() 时间戳；队列中至多一条。
+    pop() 取走后进入「提交中」状态，此时后台线程不会请求新的验证码，直到 done() 或下一次 pop()。
+    """
+
+    def __init__(self, fetch_func, max_age=CAPTCHA_VALIDITY, retry_interval=0.2):
+        self._fetch_func = fetch_func
+        self.max_age = max_age
+        self.retry_interval = retry_interval
+        self._queue = deque()
+        self._cond = threading.Condition()
+        self._stop = threading.Event()
+        self._thread = None
+        # 已被取走、尚未报告提交完成的验证码
+        self._in_flight = False
+        # 每次 invalidate() 递增，用于丢弃在 invalidate 之前发出、之后才返回的验证码
+        self._generation = 0
+        self.last_error = None
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._in_flight = False
+        self._thread = threading.Thread(target=self._worker, name="captcha-prefetch", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        with self._cond:
+            self._queue.clear()
+            self._cond.notify_all()
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join(timeout=2)
+        self._thread = None
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive() and not self._stop.is_set()
+
+    @property
+    def stopped(self):
+        return self._stop.is_set()
+
+    def invalidate(self):
+        """丢弃队列中所有验证码（例如 session 已替换），后台线程会立即补充新的。"""
+        with self._cond:
+            self._queue.clear()
+            self._generation += 1
+            self._in_flight = False
+            self._cond.notify_all()
+
+    def done(self):
+        """报告取走的验证码已提交完毕（yySave.do 已返回），后台线程随即获取下一条。"""
+        with self._cond:
+            self._in_flight = False
+            self._cond.notify_all()
+
+    def pop(self, timeout=None):
+        """
+        取出一条未过期的验证码 (code, image, fetched_at)，再次调用即表示上一条已提交完毕。
+        队列为空时最多等待 timeout 秒，超时或已停止返回 None。
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            if self._in_flight:
+                self._in_flight = False
+                self._cond.notify_all()  # 唤醒后台线程补充
+            while True:
+                self._purge_expired()
+                if self._queue:
+                    item = self._queue.pop()
+                    self._in_flight = True
+                    return item
+                if self._stop.is_set():
+                    return None
+                wait = None if deadline is None else deadline - time.monotonic()
+                if wait is not None and wait <= 0:
+                    return None
+                self._cond.wait(wait if wait is not None else 0.5)
+
+    def __len__(self):
+        with self._cond:
+            self._purge_expired()
+            return len(self._queue)
+
+    def _purge_expired(self):
+        # 调用方需持有 self._cond
+        now = time.monotonic()
+        while self._queue and now - self._queue[0][2] > self.max_age:
+            self._queue.popleft()
+
+    def _worker(self):
+        while not self._stop.is_set():
+            with self._cond:
+                self._purge_expired()
+                while (self._queue or self._in_flight) and not self._stop.is_set():
+                    if self._in_flight:
+                        # 调用方正在提交取走的验证码，此时再请求会让它作废
+                        self._cond.wait()
+                    else:
+                        # 已有一条：等待被取走或过期
+                        age = time.monotonic() - self._queue[0][2]
+                        self._cond.wait(max(0.05, self.max_age - age))
+                    self._purge_expired()
+                generation = self._generation
+            if self._stop.is_set():
+                break
+
+            try:
+                code, image = self._fetch_func()
+            except Exception as e:
+                self.last_error = e
+                self._stop.wait(self.retry_interval)
+                continue
+            if not code:
+                # 识别为空（或置信度过低被丢弃）的验证码不入队，稍等后重新获取，避免连续请求触发「频繁」
+                self._stop.wait(self.retry_interval)
+                continue
+
+            with self._cond:
+                if generation != self._generation or self._stop.is_set():
+                    continue
+                self._queue.append((code, image, time.monotonic()))
+                self.last_error = None
+                self._cond.notify_all()
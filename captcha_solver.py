@@ -0,0 +1,159 @@
+"""
+验证码识别流水线：备忘缓存 → 精确哈希 → 感知哈希近邻 → OCR，只有前几级都未命中时才调用较慢的 OCR。
+
+solve() 返回 (label, source, confidence)：
+    source 为 "memo"（同一张图片近期已识别过）、"hash"（精确命中）、"phash"（近邻命中）或 "ocr"；
+    confidence 为 0~1 的置信度，精确命中为 1，近邻命中随汉明距离线性下降，OCR 结果为模型给出的
+    整串置信度（ocr 不支持输出概率时为 None），备忘命中沿用首次识别时的置信度。
+
+OCR 置信度低于 min_confidence 时丢弃结果、返回空串，由调用方重新获取验证码，不浪费抢课请求；
+传入 ConfidenceLog 时，feedback() 会把每个 OCR 结果的置信度与服务器判定记入日志，供调整阈值。
+
+配合 CaptchaLearningStore 使用时，服务器拒绝过的 (图片, 答案) 不会再被返回：
+前两级命中已知错误答案时继续往下一级查找，OCR 结果也是已知错误时返回空串，由调用方重新获取验证码。
+"""
+from captcha_learning import captcha_verdict
+from captcha_phash import PHASH_MAX_DISTANCE, dhash
+from captcha_table import raw_digest
+from memo_cache import MEMO_SIZE, MEMO_TTL, MemoCache
+from ocr_batch import classify_batch
+from ocr_confidence import recognize
+
+
+class CaptchaSolver:
+    def __init__(self, table=None, phash_index=None, ocr=None, max_distance=PHASH_MAX_DISTANCE,
+                 learning=None, memo_size=MEMO_SIZE, memo_ttl=MEMO_TTL, min_confidence=0.0,
+                 confidence_log=None):
+        self.table = table
+        self.phash_index = phash_index
+        self.ocr = ocr
+        self.max_distance = max_distance
+        self.learning = learning
+        # 以原始字节 md5 为键缓存识别结果，memo_size 为 0 时不缓存
+        self.memo = MemoCache(memo_size, memo_ttl)
+        self.min_confidence = min_confidence
+        self.confidence_log = confidence_log
+        # 因置信度过低被丢弃的 OCR 结果数
+        self.low_confidence = 0
+
+    def solve(self, img_bytes):
+        digest = raw_digest(img_bytes)
+        hit = self._cached_lookup(img_bytes, digest)
+        if hit is not None:
+            return hit
+        if self.ocr is None:
+            return "", "ocr", None
+        label, confidence = self._classify(img_bytes, digest)
+        return label, "ocr", confidence
+
+    def lookup(self, img_bytes):
+        """只查缓存与对照表，不调用 OCR：命中返回 (label, source, confidence)，未命中返回 None。"""
+        return self._cached_lookup(img_bytes, raw_digest(img_bytes))
+
+    def classify(self, img_bytes):
+        """直接调用 OCR（不查表），结果写入备忘缓存。"""
+        return self._classify(img_bytes, raw_digest(img_bytes))[0]
+
+    def solve_batch(self, images):
+        """
+        批量识别，按输入顺序返回 [(label, source, confidence, error), ...]，error 为 None 表示成功。
+        相同的图片只识别一次；先逐张查表，未命中的图片交给 classify_batch 逐张识别（工作池模式下并行）。
+        """
+        digests = [raw_digest(img) for img in images]
+        unique = {}  # md5 -> 首次出现的下标
+        for i, digest in enumerate(digests):
+            unique.setdefault(digest, i)
+
+        solved = {}
+        misses = []
+        for digest, i in unique.items():
+            hit = self._cached_lookup(images[i], digest)
+            if hit is not None:
+                solved[digest] = hit + (None,)
+            elif self.ocr is None:
+                solved[digest] = ("", "ocr", None, None)
+            else:
+                misses.append(digest)
+
+        if misses:
+            results = classify_batch(self.ocr, [images[unique[d]] for d in misses])
+            for digest, (label, error) in zip(misses, results):
+                if error is None:
+                    label = self._remember(digest, label)
+                solved[digest] = (label, "ocr", None, error)
+        return [solved[d] for d in digests]
+
+    def _cached_lookup(self, img_bytes, digest):
+        cached = self.memo.get(digest)
+        if cached is not None and not self._rejected(digest, cached[0]):
+            return cached[0], "memo", cached[2]
+        hit = self._lookup(img_bytes, digest)
+        if hit is not None:
+            self.memo.put(digest, hit)
+        return hit
+
+    def remember(self, img_bytes, label):
+        """记录一次在外部完成的 OCR 结果（如交给工作池识别），返回过滤已知错误答案后的结果。"""
+        return self._remember(raw_digest(img_bytes), label)
+
+    def _classify(self, img_bytes, digest):
+        """调用 OCR，返回 (label, confidence)；置信度低于阈值时 label 为空串。"""
+        result = recognize(self.ocr, img_bytes)
+        if result.confidence is not None and result.confidence < self.min_confidence:
+            self.low_confidence += 1
+            if self.confidence_log is not None:
+                # 没有提交、不知道对错，也记下置信度分布
+                self.confidence_log.append(result.confidence, None)
+            return "", result.confidence
+        return self._remember(digest, result.text, result.confidence), result.confidence
+
+    def _remember(self, digest, label, confidence=None):
+        if self._rejected(digest, label):
+            return ""
+        if label:
+            self.memo.put(digest, (label, "ocr", confidence))
+        return label
+
+    def _lookup(self, img_bytes, digest):
+        """只查精确哈希与感知哈希索引，命中返回 (label, source, confidence)，未命中返回 None。"""
+        if self.table:
+            label = self.table.lookup(img_bytes, digest)
+            if label and not self._rejected(digest, label):
+                return label, "hash", 1.0
+
+        if self.phash_index:
+            try:
+                hit = self.phash_index.nearest(dhash(img_bytes), self.max_distance)
+            except Exception:
+                hit = None
+            if hit is not None and not self._rejected(digest, hit[0]):
+                label, distance = hit
+                return label, "phash", 1.0 - distance / (self.max_distance + 1)
+        return None
+
+    def feedback(self, img_bytes, label, code, msg, success):
+        """把一次 yySave.do 的结果反馈给学习存储，返回判定结果（True/False/None）。"""
+        verdict = captcha_verdict(code, msg, success)
+        if not img_bytes or not label or verdict is None:
+            return verdict
+        digest = raw_digest(img_bytes)
+        cached = self.memo.peek(digest)
+        if (self.confidence_log is not None and cached is not None and cached[0] == label
+                and cached[1] == "ocr" and cached[2] is not None):
+            self.confidence_log.append(cached[2], verdict)
+        if verdict is False:
+            # 缓存里的答案已被服务器否定，即使没有学习存储也不能再返回
+            self.memo.pop(digest)
+        elif cached is not None and cached[0] == label:
+            # 服务器确认过的答案等同于精确命中；同一结果重复提交时也不会重复记入置信度日志
+            self.memo.put(digest, (label, "hash", 1.0))
+        if self.learning is None:
+            return verdict
+        if verdict:
+            self.learning.confirm(img_bytes, label, digest)
+        else:
+            self.learning.reject(img_bytes, label, digest)
+        return verdict
+
+    def _rejected(self, digest, label):
+        return self.learning is not None and self.learning.is_rejected(digest, label)
@@ -0,0 +1,237 @@
+"""
+验证码哈希对照表：以 vcode.do 返回的原始图片字节的 md5 为键，直接查表得到验证码。
+
+旧版对照表的键是「PIL 解码后重新编码为 JPEG」的 md5，每张验证码都要在热路径上做一次解码 + 编码。
+新版直接对原始字节求 md5，无需 PIL。文件格式仍为每行 `hash,label`，用注释行标明其后各行的键类型：
+
+    # key=raw-md5      其后各行为原始字节 md5（新格式）
+    # key=legacy-md5   其后各行为 JPEG 重新编码后的 md5（旧格式）
+
+没有任何标记行的文件按旧格式读取。旧格式条目仅在新键未命中时才会用到，命中后自动记入新键；
+未命中的图片按新键记入一个有界缓存，同一张图不会再做第二次解码 + 编码。
+可用 tools/migrate_captcha_table.py 根据已保存的验证码图片（code_img/）把旧表迁移为新格式。
+
+新键条目还可以转换为紧凑的二进制格式（tools/convert_captcha_table.py），加载时只 mmap 文件、
+按需二分查找，不再逐行解析成字典；多个进程映射同一文件时共享同一份只读页缓存。二进制格式：
+
+    文件头 16 字节：魔数 b"CAPTBL01"、条目数（uint32 小端）、标签宽度（uint16 小端）、2 字节保留
+    其后为按摘要升序排列的定长记录：16 字节 md5 摘要 + 标签（UTF-8，右侧以 \0 补齐到标签宽度）
+"""
+import mmap
+import os
+import struct
+import sys
+from hashlib import md5
+from io import BytesIO
+
+from memo_cache import MemoCache
+
+RAW_HEADER = "# key=raw-md5"
+LEGACY_HEADER = "# key=legacy-md5"
+
+# 记录已查过旧键且未命中的图片（按新键），同一张图只做一次解码 + 编码
+LEGACY_MISS_MEMO = 1024
+
+BIN_MAGIC = b"CAPTBL01"
+BIN_HEADER = struct.Struct("<8sIH2x")
+DIGEST_SIZE = 16
+
+
+def raw_digest(img_bytes):
+    """新键：原始图片字节的 md5。"""
+    return md5(img_bytes).hexdigest()
+
+
+def legacy_digest(img_bytes):
+    """旧键：PIL 解码后重新编码为 JPEG 的 md5（与旧版 get_code 的算法一致）。"""
+    from PIL import Image
+
+    img = Image.open(BytesIO(img_bytes))
+    with BytesIO() as output:
+        img.save(output, format="JPEG")
+        return md5(output.getvalue()).hexdigest()
+
+
+def read_table(path):
+    """读取对照表文件，返回 (raw, legacy) 两个 {hash: label} 字典。"""
+    raw, legacy = {}, {}
+    target = legacy
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            if line.startswith("#"):
+                if line == RAW_HEADER:
+                    target = raw
+                elif line == LEGACY_HEADER:
+                    target = legacy
+                continue
+            try:
+                # 使用 split(",", 1) 确保只在第一个逗号处分割，以防标签中含有逗号
+                hash_val, label = line.split(",", 1)
+            except ValueError:
+                continue
+            target[hash_val] = label
+    return raw, legacy
+
+
+def write_table(path, raw, legacy=None):
+    """写出对照表（先写临时文件再替换，避免写到一半被读取）。"""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8", newline="\n") as f:
+        f.write(RAW_HEADER + "\n")
+        for hash_val in sorted(raw):
+            f.write(f"{hash_val},{raw[hash_val]}\n")
+        if legacy:
+            f.write(LEGACY_HEADER + "\n")
+            for hash_val in sorted(legacy):
+                f.write(f"{hash_val},{legacy[hash_val]}\n")
+    os.replace(tmp_path, path)
+
+
+def write_binary_table(path, raw):
+    """把 {原始字节 md5: label} 写成二进制对照表（先写临时文件再替换），返回标签宽度。"""
+    records = sorted((bytes.fromhex(hash_val), label.encode("utf-8")) for hash_val, label in raw.items())
+    width = max((len(label) for _, label in records), default=1)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(BIN_HEADER.pack(BIN_MAGIC, len(records), width))
+        for digest, label in records:
+            f.write(digest + label.ljust(width, b"\0"))
+    os.replace(tmp_path, path)
+    return width
+
+
+class PackedTable:
+    """mmap 映射的只读二进制对照表，按摘要二分查找。"""
+
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            if size < BIN_HEADER.size:
+                raise ValueError(f"{path} 不是有效的二进制对照表")
+            # 映射建立后即可关闭文件描述符，映射本身仍然有效
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, count, width = BIN_HEADER.unpack_from(self._mm, 0)
+        if magic != BIN_MAGIC or size != BIN_HEADER.size + count * (DIGEST_SIZE + width):
+            self._mm.close()
+            raise ValueError(f"{path} 不是有效的二进制对照表")
+        self._count = count
+        self._width = width
+        self._record_size = DIGEST_SIZE + width
+
+    def __len__(self):
+        return self._count
+
+    def get(self, hash_val):
+        """按十六进制 md5 查找，未命中返回 None。"""
+        try:
+            key = bytes.fromhex(hash_val)
+        except ValueError:
+            return None
+        mm, record_size = self._mm, self._record_size
+        lo, hi = 0, self._count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            offset = BIN_HEADER.size + mid * record_size
+            digest = mm[offset:offset + DIGEST_SIZE]
+            if digest < key:
+                lo = mid + 1
+            elif digest > key:
+                hi = mid
+            else:
+                label = mm[offset + DIGEST_SIZE:offset + record_size]
+                return label.rstrip(b"\0").decode("utf-8")
+        return None
+
+    def close(self):
+        self._mm.close()
+
+
+def preferred_table_path(csv_path):
+    """
+    同目录下存在不旧于 CSV 的同名 .bin 时返回 .bin 的路径，否则返回 CSV 路径。
+    CSV 更新过而未重新转换时仍读 CSV，避免用到过期的二进制表。
+    打包环境中两者都是构建时的快照、解压后的修改时间没有意义，有 .bin 就用 .bin。
+    """
+    bin_path = os.path.splitext(csv_path)[0] + ".bin"
+    if not os.path.exists(bin_path):
+        return csv_path
+    if getattr(sys, 'frozen', False) or not os.path.exists(csv_path):
+        return bin_path
+    return csv_path if os.path.getmtime(csv_path) > os.path.getmtime(bin_path) else bin_path
+
+
+class CaptchaHashTable:
+    """
+    验证码对照表的内存索引。
+
+    从 .bin 文件加载时，主体条目留在 mmap 映射中（packed），entries 只保存运行中新学到
+    或迁移得到的条目，查询时优先于映射；被否定的映射条目在 entries 中记为 None 以屏蔽。
+    """
+
+    def __init__(self, path=None):
+        self.entries = {}  # 原始字节 md5 -> label（label 为 None 表示屏蔽 packed 中的同键条目）
+        self.legacy = {}   # 旧格式 md5 -> label
+        self.packed = None
+        self._legacy_misses = MemoCache(LEGACY_MISS_MEMO)
+        if path and os.path.exists(path):
+            self.load(path)
+
+    def load(self, path):
+        if path.endswith(".bin"):
+            self.packed = PackedTable(path)
+            return
+        raw, legacy = read_table(path)
+        self.entries.update(raw)
+        self.legacy.update(legacy)
+
+    def __len__(self):
+        return len(self.entries) + len(self.legacy) + (len(self.packed) if self.packed else 0)
+
+    def get(self, digest):
+        """按原始字节 md5 查找标签，未命中返回 None。"""
+        if digest in self.entries:
+            return self.entries[digest]
+        if self.packed is not None:
+            return self.packed.get(digest)
+        return None
+
+    def add(self, digest, label):
+        self.entries[digest] = label
+
+    def discard(self, digest, label):
+        """删除一条标签为 label 的条目（标签不同时不处理）。"""
+        if self.get(digest) != label:
+            return
+        if self.packed is not None and self.packed.get(digest) is not None:
+            self.entries[digest] = None
+        else:
+            self.entries.pop(digest, None)
+
+    def lookup(self, img_bytes, digest=None):
+        """
+        查表，命中返回验证码，未命中返回 None。
+        digest 为调用方已算好的原始字节 md5（可省略）；表中还没有任何新键条目（如随仓库发布的旧格式表）时
+        跳过新键查询，直接走旧键。
+        """
+        label = None
+        if self.entries or self.packed is not None:
+            digest = digest or raw_digest(img_bytes)
+            label = self.get(digest)
+        if label is None and self.legacy:
+            digest = digest or raw_digest(img_bytes)
+            if self._legacy_misses.peek(digest) is not None:
+                # 这张图已经查过旧键
+                return None
+            try:
+                label = self.legacy.get(legacy_digest(img_bytes))
+            except Exception:
+                label = None
+            if label is not None:
+                # 记入新键，同一张图下次直接命中，无需再解码
+                self.entries[digest] = label
+            else:
+                self._legacy_misses.put(digest, True)
+        return label
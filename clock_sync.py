@@ -0,0 +1,124 @@
+"""
+服务器时钟同步：在倒计时期间采样 ehall 响应的 Date 头与往返时延（RTT），
+估计「服务器时间 - 本地时间」的偏移量及其误差上界，让倒计时按服务器时间触发。
+
+原理（类 NTP 的最小 RTT 过滤）：
+Date 头只精确到秒。若请求在本地时刻 t0 发出、t1 收到响应，且 Date 为 D，
+则服务器生成响应时的真实时间落在 [D, D+1) 内，该时刻又落在本地 [t0, t1] 内，
+于是偏移量 offset 满足 D - t1 <= offset <= D + 1 - t0。
+取 RTT 最小的若干个样本求区间交集，即得到偏移估计与置信区间。
+配合 probe_delay() 把探测安排在服务器「整秒跳变」附近，区间可收敛到 RTT 量级以下。
+"""
+import time
+from email.utils import parsedate_to_datetime
+
+PROBE_URL = "https://ehall.seu.edu.cn/gsapp/sys/jzxxtjapp/hdyy/queryActivityList.do"
+# 单次采样请求的超时（秒）；采样在倒计时线程中同步执行，最坏情况下会阻塞这么久
+PROBE_TIMEOUT = 3
+# 距开抢不足 该秒数 + PROBE_TIMEOUT 时停止采样：既避免同步请求与抢课请求争抢连接，
+# 也保证一次慢探测返回时倒计时仍来得及进入最后的高精度等待
+SYNC_STOP_BEFORE = 3
+
+
+class ServerClock:
+    """服务器时钟偏移估计器。offset 为正表示服务器时间比本地快。"""
+
+    def __init__(self, max_samples=32, rtt_slack=0.05):
+        self.max_samples = max_samples
+        # 参与区间求交的样本 RTT 不得超过 最小 RTT + rtt_slack（秒）
+        self.rtt_slack = rtt_slack
+        self._samples = []  # [(rtt, lo, hi)]
+        self._next_probe = 0.0
+
+    def add_sample(self, t0, t1, date_header):
+        """记录一次采样。t0/t1 为本地 time.time() 的发送/接收时刻。"""
+        if not date_header or t1 < t0:
+            return False
+        try:
+            server_sec = parsedate_to_datetime(date_header).timestamp()
+        except (TypeError, ValueError):
+            return False
+        self._samples.append((t1 - t0, server_sec - t1, server_sec + 1 - t0))
+        if len(self._samples) > self.max_samples:
+            # 淘汰 RTT 最大的样本
+            self._samples.sort(key=lambda x: x[0])
+            self._samples.pop()
+        return True
+
+    def sample(self, session, url=PROBE_URL, timeout=PROBE_TIMEOUT):
+        """用一次轻量请求（pageSize=1）采样服务器时间，返回 RTT（秒），失败返回 None。"""
+        t0 = time.time()
+        try:
+            res = session.post(
+                f"{url}?_={int(t0 * 1000)}",
+                data={"pageIndex": 1, "pageSize": 1},
+                headers={"Content-Type": "application/x-www-form-urlencoded; charset=UTF-8"},
+                verify=False, timeout=timeout,
+            )
+        except Exception:
+            return None
+        t1 = time.time()
+        if not self.add_sample(t0, t1, res.headers.get("Date")):
+            return None
+        return t1 - t0
+
+    def maybe_sample(self, session, remaining):
+        """
+        倒计时循环中调用：根据距开抢时刻（目标时间 + 延迟）的剩余秒数决定是否采样。
+        远离目标时每 30 秒一次，最后一分钟每秒一次，且尽量对齐服务器整秒跳变。
+        """
+        if remaining <= SYNC_STOP_BEFORE + PROBE_TIMEOUT or time.time() < self._next_probe:
+            return False
+        self.sample(session)
+        interval = 30 if remaining > 60 else 1
+        self._next_probe = time.time() + interval + self.probe_delay()
+        return True
+
+    def estimate(self):
+        """返回 (offset, bound)：偏移估计及误差上界（秒）；尚无样本时返回 None。"""
+        if not self._samples:
+            return None
+        min_rtt = min(s[0] for s in self._samples)
+        good = [s for s in self._samples if s[0] <= min_rtt + self.rtt_slack]
+        lo = max(s[1] for s in good)
+        hi = min(s[2] for s in good)
+        if lo > hi:
+            # 区间不相交（本地时钟跳变或服务器多节点不同步），只信任 RTT 最小的样本
+            _, lo, hi = min(good, key=lambda x: x[0])
+        return (lo + hi) / 2, (hi - lo) / 2
+
+    @property
+    def offset(self):
+        est = self.estimate()
+        return est[0] if est else 0.0
+
+    @property
+    def bound(self):
+        est = self.estimate()
+        return est[1] if est else None
+
+    def now(self):
+        """估计的当前服务器时间（epoch 秒）。"""
+        return time.time() + self.offset
+
+    def to_local(self, server_ts):
+        """把服务器时间戳换算成本地 time.time() 时间戳。"""
+        return server_ts - self.offset
+
+    def probe_delay(self):
+        """
+        距离下一次「最有价值」探测还需等待的秒数：
+        让请求到达服务器的时刻恰好落在估计的服务器整秒跳变处，每次采样都能把区间折半。
+        """
+        est = self.estimate()
+        if est is None:
+            return 0.0
+        min_rtt = min(s[0] for s in self._samples)
+        arrive = time.time() + min_rtt / 2 + est[0]  # 现在发出时到达服务器的服务器时间
+        return (1.0 - arrive % 1.0) % 1.0
+
+    def describe(self):
+        est = self.estimate()
+        if est is None:
+            return "未同步"
+        return f"偏移 {est[0] * 1000:+.0f} ms (±{est[1] * 1000:.0f} ms, {len(self._samples)} 个样本)"
@@ -0,0 +1,61 @@
+"""
+连接预热：二次登录换了新 session 后，开抢前预先建立并保持 N 条到 ehall 的 keep-alive 连接，
+让第一次 yySave.do 直接复用已完成 TCP + TLS 握手的连接，不再在 T0 时刻现场握手。
+
+urllib3 连接池只有在并发请求时才会打开多条连接，因此每一轮预热并发发出 N 个轻量请求；
+之后每隔 interval 秒重复一轮，防止空闲连接被服务器 keep-alive 超时关闭。
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+WARMUP_URL = "https://ehall.seu.edu.cn/gsapp/sys/jzxxtjapp/hdyy/queryActivityList.do"
+
+
+class ConnectionWarmer:
+    """后台保持 session 连接池中 n 条连接处于已握手、未超时的状态。"""
+
+    def __init__(self, session, n=4, interval=4, timeout=3):
+        self.session = session
+        self.n = n
+        self.interval = interval
+        self.timeout = timeout
+        self._stop = threading.Event()
+        self._thread = None
+        self.rounds = 0
+        self.last_ok = 0  # 最近一轮成功的请求数
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="conn-warmup", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=0.5):
+        """停止预热。只短暂等待进行中的一轮，避免拖慢开抢。"""
+        self._stop.set()
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join(timeout=timeout)
+        self._thread = None
+
+    def _ping(self):
+        try:
+            res = self.session.post(
+                f"{WARMUP_URL}?_={int(time.time() * 1000)}",
+                data={"pageIndex": 1, "pageSize": 1},
+                headers={"Content-Type": "application/x-www-form-urlencoded; charset=UTF-8"},
+                verify=False, timeout=self.timeout,
+            )
+            res.content  # 读完响应体，连接才会归还连接池
+            return True
+        except Exception:
+            return False
+
+    def _run(self):
+        with ThreadPoolExecutor(max_workers=self.n, thread_name_prefix="conn-warmup") as pool:
+            while not self._stop.is_set():
+                done, _ = wait([pool.submit(self._ping) for _ in range(self.n)])
+                self.last_ok = sum(1 for f in done if f.result())
+                self.rounds += 1
+                self._stop.wait(self.interval)
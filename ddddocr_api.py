@@ -1,32 +1,38 @@
+import argparse
 import base64
-import os
-import io
-import sys
-from flask import Flask, request, jsonify
-from PIL import Image
-import ddddocr
+import multiprocessing
+from flask import Flask, Response, g, request, jsonify
 
 from flask_cors import CORS # 导入 CORS
 
+import ocr_metrics
+import ocr_service
+from ocr_pool import OcrPoolSaturated
+
 app = Flask(__name__)
-CORS(app, resources={r"/*": {"origins": "*"}})
-# 全局 OCR 模型实例
-ocr = None 
-captcha_hash_table = {}
-
-def resource_path(relative_path):
-    if getattr(sys, 'frozen', False):  # 判断是否处于打包环境
-        base_path = getattr(sys, '_MEIPASS', '')  # 临时解压路径
-    else:
-        # 以脚本所在目录为基准，确保无论从哪启动都能找到资源
-        base_path = os.path.dirname(os.path.abspath(__file__))
-    return str(os.path.join(base_path, relative_path))
+CORS(app, resources={r"/*": {"origins": "*"}}, expose_headers=["X-OCR-Source"])
+
+
+@app.before_request
+def _metrics_before():
+    # 只统计已注册的路由，避免任意路径撑大指标标签
+    if request.url_rule is not None:
+        g.metrics_route = request.url_rule.rule
+        g.metrics_started = ocr_metrics.request_started(g.metrics_route)
+
+
+@app.after_request
+def _metrics_after(response):
+    route = g.pop("metrics_route", None)
+    if route is not None:
+        ocr_metrics.request_finished(route, response.status_code, g.pop("metrics_started"))
+    return response
+
 
 @app.route('/predict', methods=['POST'])
 def predict():
     """识别上传图片文件的API端点"""
-    global ocr # 访问全局 OCR 实例
-    if ocr is None:
+    if ocr_service.ocr is None:
         return jsonify({"error": "OCR模型尚未加载"}), 503 # 模型未加载时返回 503
         
     try:
@@ -43,11 +49,13 @@ def predict():
         # 读取图片文件
         image_bytes = file.read()
         
-        # 使用ddddocr识别验证码
-        result = ocr.classification(image_bytes)
+        # 先查表，未命中再用 ddddocr 识别验证码
+        result, source = ocr_service.recognize(image_bytes)
         
-        return jsonify({"result": result})
+        return jsonify({"result": result, "source": source})
     
+    except OcrPoolSaturated as e:
+        return jsonify({"error": str(e)}), 503
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -55,14 +63,17 @@ def predict():
 @app.route('/health', methods=['GET'])
 def health():
     """健康检查端点"""
-    global ocr
-    return jsonify({"status": "healthy", "model_loaded": ocr is not None})
+    return jsonify(ocr_service.health_info())
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Prometheus 指标端点（文本暴露格式）"""
+    return Response(ocr_metrics.render(), content_type=ocr_metrics.CONTENT_TYPE)
 
 @app.route('/predict_base64', methods=['POST']) # 修正路由名称，避免与 /predict 冲突
 def ocr_from_base64():
     """识别Base64编码的验证码图片的API端点"""
-    global ocr
-    if ocr is None:
+    if ocr_service.ocr is None:
         return jsonify({"error": "OCR模型尚未加载"}), 503 # 模型未加载时返回 503
         
     try:
@@ -83,51 +94,136 @@ def ocr_from_base64():
         # Base64解码为字节流
         image_bytes = base64.b64decode(img_b64)
         
-        # 使用ddddocr识别验证码
-        result = ocr.classification(image_bytes)
+        # 先查表，未命中再用 ddddocr 识别验证码
+        result, source = ocr_service.recognize(image_bytes)
         
-        return jsonify({"result": result}) # 返回 {"result": "识别结果"}
+        return jsonify({"result": result, "source": source}) # 返回 {"result": "识别结果", "source": "hit"|"ocr"}
     
+    except OcrPoolSaturated as e:
+        return jsonify({"error": str(e)}), 503
     except Exception as e:
         # 捕获所有其他识别或解码错误
         return jsonify({"error": f"识别过程中发生错误: {str(e)}"}), 500
 
 
-if __name__ == '__main__':
-    # 启动前加载模型
+@app.route('/predict_raw', methods=['POST'])
+def predict_raw():
+    """
+    低开销识别端点：请求体直接是图片原始字节（application/octet-stream），
+    响应体为纯文本识别结果，来源（hit/ocr）放在 X-OCR-Source 响应头中。
+    省去 JSON 解析与 Base64 编解码，配合 HTTP/1.1 长连接使用。
+    """
+    if ocr_service.ocr is None:
+        return Response("OCR模型尚未加载", status=503, mimetype="text/plain")
+
+    image_bytes = request.get_data(cache=False)
+    if not image_bytes:
+        return Response("未提供图片数据", status=400, mimetype="text/plain")
+    try:
+        result, source = ocr_service.recognize(image_bytes)
+    except OcrPoolSaturated as e:
+        return Response(str(e), status=503, mimetype="text/plain")
+    except Exception as e:
+        return Response(f"识别过程中发生错误: {str(e)}", status=500, mimetype="text/plain")
+    return Response(result, mimetype="text/plain", headers={"X-OCR-Source": source})
 
 
-    # --- 1. 初始化模型 (使用 ddddocr 默认内置模型) ---
-    captcha_hash_table_path = resource_path("captcha_hash_table.csv")
+@app.route('/predict_batch', methods=['POST'])
+def predict_batch():
+    """
+    批量识别验证码的API端点，按输入顺序返回结果。
+    只是把多张图片合并到一个请求里的便捷封装：模型不支持批量推理，服务端仍逐张识别。
+    支持两种请求格式：
+      - JSON: {"images": ["base64...", ...]}
+      - multipart/form-data: 多个文件（字段名任意，按上传顺序）
+    """
+    if ocr_service.ocr is None:
+        return jsonify({"error": "OCR模型尚未加载"}), 503
 
     try:
-        ocr = ddddocr.DdddOcr(show_ad=False)
+        if request.files:
+            images = [f.read() for _, f in request.files.items(multi=True)]
+        else:
+            data = request.get_json(silent=True)
+            if not isinstance(data, dict) or not isinstance(data.get('images'), list):
+                return jsonify({"error": "请求数据格式错误，需要 JSON {\"images\": [...]} 或 multipart 文件上传"}), 400
+            images = []
+            for i, img_b64 in enumerate(data['images']):
+                if not isinstance(img_b64, str) or not img_b64:
+                    return jsonify({"error": f"第 {i} 张图片的 Base64 数据为空或格式错误"}), 400
+                images.append(ocr_service.decode_base64(img_b64))
+
+        if not images:
+            return jsonify({"error": "未提供图片"}), 400
+        if len(images) > ocr_service.MAX_BATCH_SIZE:
+            return jsonify({"error": f"单次最多识别 {ocr_service.MAX_BATCH_SIZE} 张图片"}), 400
+
+        # 相同图片只识别一次；先整体查表，未命中的再一次性交给 OCR
+        results = ocr_service.recognize_batch(images)
+        hits = sum(1 for r in results if r["source"] == "hit")
+        return jsonify({"results": results, "count": len(results), "hit": hits, "ocr": len(results) - hits})
+
+    except OcrPoolSaturated as e:
+        return jsonify({"error": str(e)}), 503
     except Exception as e:
-        print(f"FATAL ERROR: Failed to initialize ddddocr model: {e}")
-        # 即使模型加载失败，服务也继续运行以提供健康检查和调试
-
-    # --- 2. 加载哈希表 (可选) ---
-    captcha_hash_table = {}
-    if os.path.exists(captcha_hash_table_path):
-        with open(captcha_hash_table_path) as f:
-            for line in f:
-                if line.strip():
-                    try:
-                        # 使用 split(",", 1) 确保只在第一个逗号处分割，以防标签中含有逗号
-                        hash_val, label = line.strip().split(",", 1)
-                        captcha_hash_table[hash_val] = label
-                    except ValueError:
-                        print(f"Warning: Skipping malformed line in hash table: {line.strip()}")
+        return jsonify({"error": f"识别过程中发生错误: {str(e)}"}), 500
+
+
+if __name__ == '__main__':
+    # 打包为 exe 后工作进程需要此调用才能正常启动
+    multiprocessing.freeze_support()
+
+    parser = argparse.ArgumentParser(description="ddddocr 验证码识别 API 服务")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=5000)
+    parser.add_argument("--workers", type=int, default=0,
+                        help="OCR 工作进程数，每个进程各自加载一份模型；0 表示在主进程内识别")
+    parser.add_argument("--threads", type=int, default=0,
+                        help="每份模型的 intra-op 线程数，0 表示使用 onnxruntime 默认值")
+    parser.add_argument("--queue", type=int, default=16,
+                        help="工作进程全忙时最多排队的请求数，超出直接返回 503")
+    parser.add_argument("--debug", action="store_true", help="以 Flask 调试模式运行（含自动重载，仅用于开发）")
+    parser.add_argument("--asgi", action="store_true",
+                        help="使用异步 ASGI 前端（uvicorn）：OCR 在线程池中执行，查表与健康检查不被慢请求阻塞")
+    parser.add_argument("--deadline", type=float, default=8.0,
+                        help="ASGI 前端单次识别的最长等待秒数，超时返回 504")
+    args = parser.parse_args()
+
+    # --- 1. 初始化模型 (使用 ddddocr 默认内置模型) 与哈希表 ---
+    ocr_service.init_service(args.workers, args.threads, args.queue)
 
     # --- 3. 启动服务器 ---
     print("ddddocr API服务启动中...")
     print("API文档:")
-    print("  POST /predict - 上传图片文件识别验证码")
-    print("  POST /predict_base64 - 通过Base64字符串识别验证码")
-    print("  GET /health - 健康检查")
+    print("  POST /predict - 上传图片文件识别验证码")
+    print("  POST /predict_base64 - 通过Base64字符串识别验证码")
+    print("  POST /predict_raw - 请求体为图片原始字节，返回纯文本结果（最低开销）")
+    print("  POST /predict_batch - 批量识别（JSON images 列表或 multipart 多文件）")
+    print("  GET /health - 健康检查")
+    print("  GET /metrics - Prometheus 指标（请求数、分阶段耗时、在途请求、错误、命中率）")
     print("\n示例用法:")
-    print("  curl -X POST -F 'image=@验证码图片.jpg' http://127.0.0.1:5000/predict")
+    print("  curl -X POST -F 'image=@验证码图片.jpg' http://127.0.0.1:5000/predict")
     # 修正 base64 示例以匹配新的路由 /predict_base64
-    print("  curl -X POST -H 'Content-Type: application/json' -d '{\"img_b64\": \"base64编码的图片数据\"}' http://127.0.0.1:5000/predict_base64") 
-        
-    app.run(host='0.0.0.0', port=5000, threaded=True, debug=True)
\ No newline at end of file
+    print("  curl -X POST -H 'Content-Type: application/json' -d '{\"img_b64\": \"base64编码的图片数据\"}' http://127.0.0.1:5000/predict_base64")
+    print("  curl -X POST --data-binary @验证码图片.jpg -H 'Content-Type: application/octet-stream' http://127.0.0.1:5000/predict_raw")
+    print("  python ddddocr_api.py --workers 4 --threads 1   # 多进程模式，可同时服务多个客户端")
+    print("  python ddddocr_api.py --asgi --deadline 8        # 异步前端，慢请求不阻塞查表与健康检查")
+
+    if args.asgi:
+        import uvicorn
+        import ocr_asgi
+
+        ocr_asgi.configure(deadline=args.deadline, threads=max(2, args.workers + args.queue))
+        uvicorn.run(ocr_asgi.app, host=args.host, port=args.port, log_level="warning")
+    elif args.debug:
+        app.run(host=args.host, port=args.port, threaded=True, debug=True)
+    else:
+        # Flask 自带的开发服务器每个响应后都会断开连接；waitress 支持 HTTP/1.1 长连接，
+        # 客户端每个会话只需建立一次 TCP 连接
+        try:
+            from waitress import serve
+        except ImportError:
+            print("未安装 waitress，使用 Flask 开发服务器（不支持长连接）：pip install waitress")
+            app.run(host=args.host, port=args.port, threaded=True)
+        else:
+            serve(app, host=args.host, port=args.port, threads=max(8, args.workers * 2 + args.queue))
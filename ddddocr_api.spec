@@ -1,19 +1,41 @@
 # -*- mode: python ; coding: utf-8 -*-
 
+import os
 
 a = Analysis(
     ['ddddocr_api.py'],
     pathex=[],
     binaries=[],
     datas=[
-        ('captcha_hash_table.csv', '.')
-    ],
+        ('captcha_hash_table.csv', '.'),
+        ('captcha_table.py', '.'),
+        ('captcha_phash.py', '.'),
+        ('captcha_learning.py', '.'),
+        ('captcha_solver.py', '.'),
+        ('ocr_batch.py', '.'),
+        ('ocr_pool.py', '.'),
+        ('ocr_service.py', '.'),
+        ('ocr_asgi.py', '.'),
+        ('ocr_metrics.py', '.'),
+        ('memo_cache.py', '.'),
+        ('ocr_loader.py', '.'),
+        ('ocr_confidence.py', '.')
+    ] + ([('captcha_hash_table.bin', '.')] if os.path.exists('captcha_hash_table.bin') else []),
     hiddenimports=[
         'ddddocr',
         'ddddocr.recognizer',
         'ddddocr.detector',
         'ddddocr.utils',
         'flask',
+        'waitress',
+        'starlette',
+        'multipart',
+        'uvicorn',
+        'uvicorn.logging',
+        'uvicorn.loops.auto',
+        'uvicorn.protocols.http.auto',
+        'uvicorn.protocols.websockets.auto',
+        'uvicorn.lifespan.on',
         'threading',
         'base64',
         'json',
@@ -17,14 +17,33 @@ a = Analysis(
     binaries=[],
     datas=[
         ('captcha_hash_table.csv', '.'),
-        ('seu_auth.py', '.')
-    ],
+        ('seu_auth.py', '.'),
+        ('captcha_pipeline.py', '.'),
+        ('clock_sync.py', '.'),
+        ('scheduler.py', '.'),
+        ('conn_warmup.py', '.'),
+        ('tls_transport.py', '.'),
+        ('async_engine.py', '.'),
+        ('capacity_monitor.py', '.'),
+        ('captcha_table.py', '.'),
+        ('captcha_phash.py', '.'),
+        ('captcha_solver.py', '.'),
+        ('captcha_learning.py', '.'),
+        ('ocr_batch.py', '.'),
+        ('memo_cache.py', '.'),
+        ('ocr_loader.py', '.'),
+        ('ocr_confidence.py', '.'),
+        ('session_store.py', '.'),
+        ('session_keeper.py', '.'),
+        ('session_pool.py', '.')
+    ] + ([('captcha_hash_table.bin', '.')] if os.path.exists('captcha_hash_table.bin') else []),
     hiddenimports=[
         'json',
         'ddddocr',
         'PIL',
         'rich',
         'requests',
+        'aiohttp',
         'Crypto',
         'ssl'
     ],
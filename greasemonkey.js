@@ -264,7 +264,7 @@
                     throw new Error('OCR 识别结果为空');
                 }
 
-                logStream(`✓ OCR 识别成功: **${ocrResult}**`, 'success');
+                logStream(`✓ OCR 识别成功: **${ocrResult}**${result.source === 'hit' ? '（查表命中）' : ''}`, 'success');
                 return ocrResult;
 
             } catch (error) {
@@ -20,7 +20,7 @@ from PyQt6.QtWidgets import (
     QStyle, QStyleOptionViewItem, QStyledItemDelegate, QScrollArea
 )
 from PyQt6.QtCore import (
-    Qt, QThread, pyqtSignal, QTimer, QSize, QRect, QRectF
+    Qt, QObject, QThread, pyqtSignal, QTimer, QSize, QRect, QRectF
 )
 from PyQt6.QtGui import (
     QFont, QColor, QPalette, QIcon, QAction, QCursor, QTextDocument, QTextOption
@@ -31,6 +31,13 @@ PROJECT_ROOT = Path(__file__).parent.parent
 sys.path.insert(0, str(PROJECT_ROOT))
 
 from backend import FetchLectureBackend
+from clock_sync import ServerClock
+from scheduler import deadline_from_epoch, wait_until
+from conn_warmup import ConnectionWarmer
+from async_engine import AsyncBookingEngine
+from capacity_monitor import CapacityMonitor
+from session_store import SessionExpiredError, derive_session
+from session_pool import FAULT_EXPIRED, STANDBY_COUNT
 
 # ========== 日志配置 ==========
 LOG_DIR = PROJECT_ROOT / "logs"
@@ -385,6 +392,8 @@ class LoginWidget(QWidget):
         self.account_combo = QComboBox()
         self.account_combo.setMinimumHeight(40)
         self._load_saved_accounts()
+        # 选中账号或开始输入新账号时就在后台预取统一认证公钥，点击登录时不必再等这一次往返
+        self.account_combo.currentIndexChanged.connect(self._prefetch_saved_login)
         saved_layout.addWidget(self.account_combo)
 
         btn_row = QHBoxLayout()
@@ -411,6 +420,7 @@ class LoginWidget(QWidget):
 
         self.input_username = QLineEdit()
         self.input_username.setPlaceholderText("请输入学号/一卡通号")
+        self.input_username.textEdited.connect(lambda _: FetchLectureBackend.prefetch_login())
         new_layout.addWidget(self.input_username)
 
         self.input_password = QLineEdit()
@@ -495,6 +505,11 @@ class LoginWidget(QWidget):
             except Exception:
                 pass
 
+    def _prefetch_saved_login(self, idx):
+        account_key = self.account_combo.itemData(idx) if idx > 0 else None
+        if account_key:
+            FetchLectureBackend.prefetch_login(account_key)
+
     def _load_account_data(self, account_key):
         f = self.config_dir / f"{account_key}.json"
         if f.exists():
@@ -811,7 +826,9 @@ class LoginThread(QThread):
 
     def run(self):
         try:
-            session, error_info = FetchLectureBackend.login(self.username, self.password, self.fingerprint)
+            session, error_info = FetchLectureBackend.login(
+                self.username, self.password, self.fingerprint, reuse=True
+            )
             if session and not error_info:
                 self.finished_ok.emit(session)
             elif error_info == 'non_trusted_device':
@@ -850,7 +867,7 @@ class PhoneVerifyThread(QThread):
 
 class LectureListWidget(QWidget):
     """讲座列表 + 抢课控制"""
-    start_fetch = pyqtSignal(str, str, str, float, float)  # wid, name, start_time, relogin_sec, delay_sec
+    start_fetch = pyqtSignal(str, str, str, float, float, int)  # wid, name, start_time, relogin_sec, delay_sec, concurrency
     stop_fetch = pyqtSignal()
 
     def __init__(self, session, parent=None):
@@ -918,9 +935,16 @@ class LectureListWidget(QWidget):
         param_row.addWidget(QLabel("延迟开始(秒):"))
         self.spin_delay = QDoubleSpinBox()
         self.spin_delay.setRange(-60, 60)
-        self.spin_delay.setValue(0.5)
+        self.spin_delay.setValue(0)
         self.spin_delay.setSuffix(" s")
         param_row.addWidget(self.spin_delay)
+
+        param_row.addWidget(QLabel("并发请求:"))
+        self.spin_concurrency = QSpinBox()
+        self.spin_concurrency.setRange(1, 8)
+        self.spin_concurrency.setValue(1)
+        self.spin_concurrency.setToolTip("同时在途的抢课请求数，1 为逐个请求")
+        param_row.addWidget(self.spin_concurrency)
         param_row.addStretch()
         ctrl_layout.addLayout(param_row)
 
@@ -1192,7 +1216,8 @@ class LectureListWidget(QWidget):
         self.start_fetch.emit(
             wid, name, start_time,
             self.spin_relogin.value(),
-            self.spin_delay.value()
+            self.spin_delay.value(),
+            self.spin_concurrency.value()
         )
 
     def _on_stop(self):
@@ -1317,7 +1342,14 @@ class MyBookingsWidget(QWidget):
         else:
             self.timer.stop()
 
+    def set_session(self, session):
+        self.session = session
+        self.refresh()
+
     def refresh(self):
+        if self.session is None:
+            # session 仍在后台创建，就绪后 set_session() 会立即刷新
+            return
         self.btn_refresh.setEnabled(False)
         self.thread = RefreshBookingsThread(self.session)
         self.thread.finished_ok.connect(self._on_ok)
@@ -1495,6 +1527,73 @@ class RefreshBookingsThread(QThread):
             self.finished_err.emit(str(e))
 
 
+class DeriveSessionThread(QThread):
+    """由已登录 session 派生一个独立的 ehall session；TGT 不可用时回退到完整登录。"""
+    finished_ok = pyqtSignal(object)
+    finished_err = pyqtSignal(str)
+
+    def __init__(self, base_session, username, password, fingerprint):
+        super().__init__()
+        self.base_session = base_session
+        self.username = username
+        self.password = password
+        self.fingerprint = fingerprint
+
+    def run(self):
+        try:
+            session, error = derive_session(self.base_session)
+            if session is None:
+                bookings_log.warning("派生 session 失败（%s），改为完整登录", error)
+                session, error = FetchLectureBackend.login(self.username, self.password, self.fingerprint)
+            if session and not error:
+                self.finished_ok.emit(session)
+            else:
+                self.finished_err.emit(f"创建 session 失败: {error}")
+        except Exception as e:
+            self.finished_err.emit(f"创建 session 异常: {e}")
+
+
+class SessionManager(QObject):
+    """
+    只登录一次，为其他并行使用者（已预约列表等）在后台派生独立的 ehall session。
+    派生完成后通过 session_ready(purpose, session) 交付；同一用途多次请求时只交付最新一次的结果。
+    """
+    session_ready = pyqtSignal(str, object)
+    session_failed = pyqtSignal(str, str)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.base_session = None
+        self._credentials = None
+        self._latest = {}      # purpose -> 最近一次请求的线程
+        self._running = set()  # 运行中的线程，保持引用直到线程真正结束
+
+    def set_base(self, session, username, password, fingerprint):
+        self.base_session = session
+        self._credentials = (username, password, fingerprint)
+
+    def request(self, purpose):
+        if self.base_session is None:
+            return
+        thread = DeriveSessionThread(self.base_session, *self._credentials)
+        thread.finished_ok.connect(lambda s, t=thread: self._on_done(purpose, t, s, None))
+        thread.finished_err.connect(lambda e, t=thread: self._on_done(purpose, t, None, e))
+        thread.finished.connect(lambda t=thread: self._running.discard(t))
+        self._latest[purpose] = thread
+        self._running.add(thread)
+        thread.start()
+
+    def _on_done(self, purpose, thread, session, error):
+        if self._latest.get(purpose) is not thread:
+            # 已有更新的请求，丢弃过时的结果
+            return
+        del self._latest[purpose]
+        if session is not None:
+            self.session_ready.emit(purpose, session)
+        else:
+            self.session_failed.emit(purpose, error)
+
+
 class MainWindow(QMainWindow):
     def __init__(self):
         super().__init__()
@@ -1504,6 +1603,9 @@ class MainWindow(QMainWindow):
 
         self.session = None
         self.fetch_thread = None
+        self.session_manager = SessionManager(self)
+        self.session_manager.session_ready.connect(self._on_session_ready)
+        self.session_manager.session_failed.connect(self._on_session_failed)
 
         self._init_ui()
 
@@ -1573,24 +1675,26 @@ class MainWindow(QMainWindow):
         self.lecture_widget.stop_fetch.connect(self._on_stop_fetch)
         left_layout.addWidget(self.lecture_widget)
 
-        # 创建右侧组件（独立 session，不与抢课共享）
-        bookings_session, _ = FetchLectureBackend.login(username, password, fingerprint)
+        # 创建右侧组件（独立 session，不与抢课共享），session 由统一认证 TGT 在后台派生
         right_layout = self.right_widget.layout()
         while right_layout.count():
             right_layout.itemAt(0).widget().setParent(None)
-        self.bookings_widget = MyBookingsWidget(bookings_session)
+        self.bookings_widget = MyBookingsWidget(None)
         right_layout.addWidget(self.bookings_widget)
+        self.session_manager.set_base(session, username, password, fingerprint)
+        self.session_manager.request("bookings")
 
         # 自动刷新讲座列表
         self.lecture_widget.refresh_list()
 
-    def _on_start_fetch(self, wid, name, start_time, relogin_sec, delay_sec):
+    def _on_start_fetch(self, wid, name, start_time, relogin_sec, delay_sec, concurrency):
         if not self.session:
             return
         self.fetch_thread = FetchThread(
             self.session, wid, name, start_time, relogin_sec, delay_sec,
             self._username, self._password, self._fingerprint,
-            bookings_session=self.bookings_widget.session
+            bookings_session=self.bookings_widget.session,
+            concurrency=concurrency
         )
         self.fetch_thread.log_signal.connect(self.lecture_widget.append_log)
         self.fetch_thread.session_renewed.connect(self._on_session_renewed)
@@ -1605,14 +1709,23 @@ class MainWindow(QMainWindow):
             self.lecture_widget.append_log("⏹ 正在停止...", "yellow")
 
     def _on_session_renewed(self, session):
-        """二次登录后同步新 session，并为已预约列表创建独立 session"""
+        """二次登录后同步新 session，并在后台为已预约列表派生新的独立 session"""
         self.session = session
-        bookings_session, _ = FetchLectureBackend.login(
-            self._username, self._password, self._fingerprint
-        )
-        if bookings_session:
-            self.bookings_widget.session = bookings_session
-            self.fetch_thread.bookings_session = bookings_session
+        self.session_manager.set_base(session, self._username, self._password, self._fingerprint)
+        self.session_manager.request("bookings")
+
+    def _on_session_ready(self, purpose, session):
+        if purpose != "bookings":
+            return
+        if self.bookings_widget:
+            self.bookings_widget.set_session(session)
+        if self.fetch_thread and self.fetch_thread.isRunning():
+            self.fetch_thread.bookings_session = session
+
+    def _on_session_failed(self, purpose, error):
+        bookings_log.error("%s session 创建失败: %s", purpose, error)
+        if purpose == "bookings" and self.bookings_widget:
+            self.bookings_widget._on_err(error)
 
     def _on_fetch_success(self, msg):
         self.lecture_widget.append_log(msg, "green")
@@ -1637,8 +1750,10 @@ class FetchThread(QThread):
     success_signal = pyqtSignal(str)       # msg
     finished_signal = pyqtSignal()
 
+    FINAL_WAIT_SECONDS = 1  # 开抢前最后 N 秒改用高精度调度器等待
+
     def __init__(self, session, wid, name, start_time_str, relogin_sec, delay_sec,
-                 username, password, fingerprint, bookings_session=None):
+                 username, password, fingerprint, bookings_session=None, concurrency=1):
         super().__init__()
         self.session = session
         self.bookings_session = bookings_session
@@ -1650,8 +1765,24 @@ class FetchThread(QThread):
         self.username = username
         self.password = password
         self.fingerprint = fingerprint
+        self.concurrency = concurrency
+        self.engine = None
+        self.monitor = None
+        self.backend = None
+        self.keeper = None
+        self.pool = None
         self.stop_requested = False
 
+    @property
+    def stop_requested(self):
+        return self._stop_requested
+
+    @stop_requested.setter
+    def stop_requested(self, value):
+        self._stop_requested = value
+        if value and self.engine:
+            self.engine.stop()
+
     def run(self):
         try:
             self._run_countdown()
@@ -1661,33 +1792,114 @@ class FetchThread(QThread):
         except Exception as e:
             self.log_signal.emit(f"❌ 异常: {str(e)}", "red")
         finally:
+            if self.keeper:
+                self.keeper.stop()
+            if self.pool:
+                self.pool.stop()
+                if self.pool.failovers:
+                    fetch_log.info("抢课期间切换热备会话 %d 次", self.pool.failovers)
+            if self.backend:
+                self.backend.stop_prefetch()
             self.finished_signal.emit()
 
+    def _start_prefetch(self):
+        """二次登录后启动验证码预取，让第一次抢课请求无需等待验证码识别"""
+        if self.backend is None:
+            self.backend = FetchLectureBackend(self.session)
+        else:
+            self.backend.set_session(self.session)
+        self.backend.start_prefetch()
+
+    def _start_pool(self):
+        """
+        启动热备会话池：从当前会话的统一认证 cookie 派生若干独立的 ehall 会话，
+        抢课中当前会话被重定向到登录页或连续请求异常时立即切换。
+        """
+        if self.pool is None:
+            # 并发模式下额外的在途请求各借用一个热备会话，热备数量相应增加
+            self.pool = FetchLectureBackend.create_session_pool(
+                self.session, self.username, self.password, self.fingerprint, on_failover=self._on_failover,
+                size=STANDBY_COUNT + self.concurrency - 1,
+            )
+        else:
+            self.pool.set_active(self.session)
+        self.pool.start()
+
+    def _on_failover(self, session, reason):
+        """在执行切换的线程中调用：验证码预取、余量监视随之改用新会话。"""
+        self.session = session
+        if self.backend is not None:
+            self.backend.set_session(session)
+        if self.engine is not None:
+            self.engine.session = session
+        self.session_renewed.emit(session)
+        cause = "已失效" if reason == FAULT_EXPIRED else "连续请求异常"
+        fetch_log.warning("当前会话%s，切换到热备会话（剩余 %d 个）", cause, self.pool.standby_count)
+        self.log_signal.emit(f"🔁 当前会话{cause}，已切换到热备会话", "yellow")
+
     def _run_countdown(self):
         self.log_signal.emit(f"⏰ 目标时间: {self.start_time.strftime('%Y-%m-%d %H:%M:%S')}", "blue")
         relogin_done = False
+        warmer = None
+        # 按服务器时间倒计时：采样 ehall 响应的 Date 头估计时钟偏移
+        clock = ServerClock()
+        target_ts = self.start_time.timestamp()
+        clock.sample(self.session)
+        self.log_signal.emit(f"🕰 服务器时钟{clock.describe()}", "blue")
+        # 倒计时期间后台保活：定时探测登录状态，失效或接近历史存活时长时才重新登录
+        keeper = self.keeper = FetchLectureBackend.create_keeper(
+            self.session, self.username, self.password, self.fingerprint
+        )
+        keeper.start()
 
         while not self.stop_requested:
-            now = datetime.datetime.now()
-            remaining = (self.start_time - now).total_seconds()
-
-            if remaining <= -self.delay_sec:
+            if keeper.session is not self.session:
+                # 保活线程已在后台换了新 session
+                self.session = keeper.session
+                self.session_renewed.emit(self.session)
+                self.log_signal.emit(f"🔄 登录会话已在后台刷新（第 {keeper.renewals} 次）", "green")
+                if self.pool is not None:
+                    self.pool.set_active(self.session)
+                if relogin_done:
+                    self._start_prefetch()
+                    if warmer:
+                        warmer.stop()
+                    warmer = ConnectionWarmer(self.session)
+                    warmer.start()
+
+            remaining = clock.to_local(target_ts) - time.time()
+            if clock.maybe_sample(self.session, remaining + self.delay_sec):
+                remaining = clock.to_local(target_ts) - time.time()
+
+            # 距开抢时刻不足 FINAL_WAIT_SECONDS 秒时交给高精度调度器
+            fire_in = remaining + self.delay_sec
+            if fire_in <= self.FINAL_WAIT_SECONDS:
                 break
 
-            # 提前重新登录
+            # 开抢前检查登录状态（一次探测），只有确认失效才重新登录
             if not relogin_done and 0 < remaining <= self.relogin_sec:
-                self.log_signal.emit(f"🕒 提前 {self.relogin_sec} 秒，进行二次登录...", "yellow")
+                self.log_signal.emit(f"🕒 提前 {self.relogin_sec} 秒，检查登录状态...", "yellow")
                 try:
-                    login_result = FetchLectureBackend.login(self.username, self.password, self.fingerprint)
-                    if login_result and login_result[0]:
-                        self.session = login_result[0]
+                    renewals = keeper.renewals
+                    session = keeper.ensure_valid()
+                    if session is None:
+                        self.log_signal.emit("⚠ 登录已失效且重新登录失败，继续使用当前 session", "yellow")
+                    elif keeper.renewals > renewals:
+                        self.session = session
                         self.session_renewed.emit(self.session)
-                        self.log_signal.emit("✅ 二次登录成功", "green")
+                        self.log_signal.emit("✅ 登录已失效，重新登录成功", "green")
                     else:
-                        self.log_signal.emit("⚠ 二次登录失败，继续使用当前 session", "yellow")
+                        self.log_signal.emit(
+                            f"✅ 登录状态有效（会话已存活 {keeper.age() / 60:.0f} 分钟），无需重新登录", "green"
+                        )
                     relogin_done = True
+                    self._start_prefetch()
+                    self._start_pool()
+                    # 预先建立 keep-alive 连接并保持到开抢
+                    warmer = ConnectionWarmer(self.session)
+                    warmer.start()
                 except Exception as e:
-                    self.log_signal.emit(f"❌ 二次登录失败: {e}", "red")
+                    self.log_signal.emit(f"❌ 登录检查失败: {e}", "red")
                     relogin_done = True
 
             if self.stop_requested:
@@ -1697,59 +1909,100 @@ class FetchThread(QThread):
             if remaining > 120:
                 if int(remaining) % 30 == 0:
                     self.log_signal.emit(f"⏳ 剩余 {int(remaining)} 秒", "cyan")
-                time.sleep(5)
+                step = 5
             elif remaining > 10:
                 if int(remaining) % 10 == 0:
                     self.log_signal.emit(f"⏳ 剩余 {int(remaining)} 秒", "cyan")
-                time.sleep(2)
-            elif remaining > 0:
-                time.sleep(0.5)
+                step = 2
             else:
-                time.sleep(0.05)
+                step = 0.5
+            time.sleep(min(step, fire_in - self.FINAL_WAIT_SECONDS))
+
+        # 开抢后不再在后台替换 session
+        keeper.stop()
+        if keeper.session is not self.session:
+            self.session = keeper.session
+            self.session_renewed.emit(self.session)
+            if self.backend is not None:
+                self.backend.set_session(self.session)
+        if warmer:
+            warmer.stop()
+            fetch_log.info("连接预热: %d 轮，最近一轮 %d/%d 条连接可用", warmer.rounds, warmer.last_ok, warmer.n)
 
         if not self.stop_requested:
-            self.log_signal.emit("🚀 倒计时结束，开始抢课！", "green")
+            # 最后阶段：粗睡眠 → 短睡眠 → 忙等，精确到开抢时刻
+            late_ns = wait_until(
+                deadline_from_epoch(clock.to_local(target_ts) + self.delay_sec),
+                should_stop=lambda: self.stop_requested,
+            )
+            if late_ns is not None:
+                fetch_log.info("定时唤醒误差 %.0f µs", late_ns / 1000)
+
+        if not self.stop_requested:
+            fetch_log.info("倒计时结束，服务器时钟%s", clock.describe())
+            self.log_signal.emit(f"🚀 倒计时结束（服务器时钟{clock.describe()}），开始抢课！", "green")
 
     def _run_fetch_loop(self):
-        backend = FetchLectureBackend(self.session)
+        if self.backend is None:
+            self._start_prefetch()
+        self._start_pool()
+
+        def fetch_lectures():
+            session = self.session
+            try:
+                return FetchLectureBackend.get_lecture_list(session)[1]
+            except SessionExpiredError:
+                # 登录失效不再是致命错误：换成热备会话，下一轮用新会话轮询
+                self.pool.failover(session)
+                return None
+
+        # 余量监视：后台独立轮询讲座列表，抢课请求只读取最新快照
+        self.monitor = CapacityMonitor(fetch_lectures, self.wid)
+        self.monitor.start()
+        try:
+            if self.concurrency > 1:
+                self._run_engine()
+            else:
+                self._run_serial_loop()
+        finally:
+            self.monitor.stop()
+
+    def _run_serial_loop(self):
+        backend = self.backend
+        monitor = self.monitor
         attempt = 0
         check_interval = 5
 
         while not self.stop_requested:
             attempt += 1
             try:
-                # 获取最新讲座列表检查人数（失败时跳过余量检查，继续抢）
-                try:
-                    session, lecture_list, stu_cnt_arr = FetchLectureBackend.get_lecture_list(self.session)
-                except RuntimeError as e:
+                if monitor.fatal_error is not None:
                     # VPN/登录失效等致命错误，停止循环
-                    fetch_log.error("致命错误: %s", e)
-                    self.log_signal.emit(f"❌ 致命错误: {str(e)}", "red")
+                    fetch_log.error("致命错误: %s", monitor.fatal_error)
+                    self.log_signal.emit(f"❌ 致命错误: {str(monitor.fatal_error)}", "red")
                     return
 
-                if lecture_list and stu_cnt_arr:
-                    skip_fetch = False
-                    for i, (total, booked) in enumerate(stu_cnt_arr):
-                        if lecture_list[i].get("WID") == self.wid:
-                            if total <= booked:
-                                self.log_signal.emit(f"⚠ 人数已满 ({booked}/{total})，等待...", "yellow")
-                                time.sleep(1)
-                                attempt -= 1  # 不计为有效尝试
-                                skip_fetch = True
-                            break
-                    if skip_fetch:
-                        continue
-                else:
-                    fetch_log.warning("第%d次: 获取列表失败，跳过余量检查", attempt)
-                    self.log_signal.emit("⚠ 获取列表失败，跳过余量检查，继续抢课", "yellow")
+                # 读取余量快照（尚未取到数据或快照过旧时不做余量检查，继续抢）
+                snap = monitor.current()
+                if snap and snap[0] <= snap[1]:
+                    self.log_signal.emit(f"⚠ 人数已满 ({snap[1]}/{snap[0]})，等待...", "yellow")
+                    time.sleep(1)
+                    attempt -= 1  # 不计为有效尝试
+                    continue
 
+                session = backend.session
                 code, msg, success = backend.fetch_lecture(self.wid)
                 style = "green" if success else "yellow" if "繁忙" in msg else "red" if "频繁" in msg else "yellow"
                 self.log_signal.emit(f"第 {attempt} 次 | {code} | {msg}", style)
+                if "满" in msg:
+                    # 服务器提示已满，立即刷新余量快照
+                    monitor.poke()
                 if code == 500:
                     fetch_log.warning("第%d次: 抢课请求失败: %s", attempt, msg)
                 elif success:
                     fetch_log.info("第%d次: 抢课请求成功: code=%s msg=%s", attempt, code, msg)
+                # 登录失效或连续请求异常时切换到热备会话（_on_failover 会替换 backend 的 session）
+                self.pool.report(session, code, msg)
 
                 if "验证码错误" in msg:
                     time.sleep(random.uniform(0.1, 0.3))
@@ -1778,9 +2031,44 @@ class FetchThread(QThread):
                 time.sleep(1)
 
 
+    def _run_engine(self):
+        """并发模式：异步引擎同时保持多个抢课请求在途，确认成功后取消其余请求"""
+        backend = self.backend
+
+        def on_result(attempt, code, msg, success):
+            style = "green" if success else "yellow" if "繁忙" in msg else "red" if "频繁" in msg else "yellow"
+            self.log_signal.emit(f"第 {attempt} 次 | {code} | {msg}", style)
+            if code == 500:
+                fetch_log.warning("第%d次: 抢课请求失败: %s", attempt, msg)
+            elif success:
+                fetch_log.info("第%d次: 抢课请求成功: code=%s msg=%s", attempt, code, msg)
+
+        self.engine = AsyncBookingEngine(
+            self.session, self.wid, backend.prefetcher,
+            confirm=lambda: backend.check_booking_success(self.wid, session=self.bookings_session),
+            concurrency=self.concurrency,
+            on_result=on_result,
+            is_full=self.monitor.is_full,
+            feedback=backend.captcha_feedback,
+            pool=self.pool,
+            make_prefetcher=FetchLectureBackend.create_prefetcher,
+        )
+        self.log_signal.emit(
+            f"⚡ 并发模式：同时保持 {self.concurrency} 个请求在途（每个请求各用一个独立会话，热备会话就绪后加入）", "blue"
+        )
+        if self.stop_requested:
+            return
+        if self.engine.run():
+            fetch_log.info("抢课成功确认！讲座: %s，共 %d 次请求", self.name, self.engine.attempts)
+            self.log_signal.emit(f"🎉 抢课成功！讲座: {self.name}", "green")
+            self.success_signal.emit(f"🎉 抢课成功确认！\n讲座: {self.name}\n共 {self.engine.attempts} 次请求")
+
+
 def main():
     app = QApplication(sys.argv)
     app.setStyleSheet(STYLESHEET)
+    # 验证码模型加载需要数秒，启动时即在后台开始，与用户登录同时进行
+    FetchLectureBackend.preload_ocr()
     window = MainWindow()
     window.show()
     sys.exit(app.exec())
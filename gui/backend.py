@@ -10,19 +10,27 @@ import base64
 import random
 import logging
 import logging.handlers
+import threading
 import urllib3
-from hashlib import md5
-from io import BytesIO
 
-import ddddocr
 import requests
-from PIL import Image
 
 # 确保项目根目录在 sys.path
 PROJECT_ROOT = os.path.dirname(os.path.abspath(__file__))
 sys.path.insert(0, PROJECT_ROOT)
 
-from seu_auth import seu_login
+from seu_auth import LoginPipeline, seu_login
+from captcha_pipeline import CaptchaPrefetcher
+from tls_transport import mount_tls
+from session_store import SESSIONS_DIR, SessionExpiredError, SessionStore, is_login_redirect
+from session_keeper import KEEPALIVE_INTERVAL, SessionKeeper
+from session_pool import LOGIN_EXPIRED_CODE, LOGIN_EXPIRED_MSG, STANDBY_COUNT, SessionPool
+from captcha_table import CaptchaHashTable, preferred_table_path
+from captcha_phash import PerceptualIndex
+from captcha_solver import CaptchaSolver
+from captcha_learning import CaptchaLearningStore, LEARNED_PATH
+from ocr_loader import BackgroundLoader, load_ocr
+from ocr_confidence import CONFIDENCE_LOG, THRESHOLD_PATH, ConfidenceLog, load_threshold
 
 # JSON 解析工具：跳过前导垃圾字节，找到第一个 { 或 [ 开始解析
 import re
@@ -54,24 +62,11 @@ _log = logging.getLogger("backend")
 _log.setLevel(logging.DEBUG)
 _log.addHandler(_fh)
 
-import ssl
-from requests.adapters import HTTPAdapter
 from urllib3.exceptions import InsecureRequestWarning
 
 urllib3.disable_warnings(InsecureRequestWarning)
 
 
-class TLSAdapter(HTTPAdapter):
-    def init_poolmanager(self, *args, **kwargs):
-        ctx = ssl.create_default_context()
-        ctx.set_ciphers("DEFAULT@SECLEVEL=1")
-        ctx.check_hostname = False
-        ctx.verify_mode = ssl.CERT_NONE
-        ctx.options |= 0x4
-        kwargs["ssl_context"] = ctx
-        return super().init_poolmanager(*args, **kwargs)
-
-
 def resource_path(relative_path):
     if getattr(sys, 'frozen', False):
         # PyInstaller 打包后，资源文件在临时解压目录 _MEIPASS 下
@@ -82,25 +77,58 @@ def resource_path(relative_path):
     return str(os.path.join(base_path, relative_path))
 
 
-# 全局 OCR 实例（延迟初始化）
-_ocr = None
-_captcha_hash_table = None
+# 登录会话快照，与 accounts/、logs/ 一样放在项目根目录
+_session_store = SessionStore(
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), SESSIONS_DIR)
+)
+
+# 验证码识别组件（OCR 模型 + 对照表）在后台线程加载，首次识别时尚未就绪才阻塞
+_solver_loader = None
+
+
+def _build_solver():
+    captcha_hash_table = CaptchaHashTable(preferred_table_path(resource_path("captcha_hash_table.csv")))
+    phash_index = PerceptualIndex(resource_path("captcha_phash_table.csv"))
+    # 学习结果与置信度日志需要可写，放在项目根目录（与 accounts/、logs/ 同级），不放进打包资源目录
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    learning = CaptchaLearningStore(os.path.join(root, LEARNED_PATH), captcha_hash_table, phash_index)
+    # 置信度低于阈值的 OCR 结果直接丢弃、重新获取验证码，不浪费抢课请求
+    solver = CaptchaSolver(
+        captcha_hash_table, phash_index, load_ocr(), learning=learning,
+        min_confidence=load_threshold(os.path.join(root, THRESHOLD_PATH)),
+        confidence_log=ConfidenceLog(os.path.join(root, CONFIDENCE_LOG)),
+    )
+    _log.info("验证码模型加载完成")
+    return solver
 
 
 def _init_ocr():
-    global _ocr, _captcha_hash_table
-    if _ocr is not None:
-        return
-    # 自定义模型 model.onnx 已与当前验证码格式不兼容，改用默认内置模型
-    captcha_hash_table_path = resource_path("captcha_hash_table.csv")
-    _ocr = ddddocr.DdddOcr(show_ad=False)
-    _captcha_hash_table = {}
-    if os.path.exists(captcha_hash_table_path):
-        with open(captcha_hash_table_path) as f:
-            for line in f:
-                if line.strip():
-                    hash_val, label = line.strip().split(",", 1)
-                    _captcha_hash_table[hash_val] = label
+    """启动后台加载（可重复调用，立即返回）。程序启动时调用，使加载与登录同时进行。"""
+    global _solver_loader
+    if _solver_loader is None:
+        _solver_loader = BackgroundLoader(_build_solver)
+    _solver_loader.start()
+
+
+def _get_solver():
+    _init_ocr()
+    return _solver_loader.get()
+
+
+# 预取了公钥的登录流水线，按账号保存（"" 为账号尚未确定时的预取）：
+# 用户输入账号密码或手机验证码时即在后台获取公钥，非可信设备时验证码登录沿用同一个 auth session
+_pipelines = {}
+_pipelines_lock = threading.Lock()
+
+
+def _take_pipeline(username):
+    with _pipelines_lock:
+        return _pipelines.pop(username, None) or _pipelines.pop("", None) or LoginPipeline()
+
+
+def _keep_pipeline(username, pipeline):
+    with _pipelines_lock:
+        _pipelines[username] = pipeline
 
 
 class FetchLectureBackend:
@@ -110,7 +138,51 @@ class FetchLectureBackend:
         self.session = session
         _init_ocr()
         self._captcha_code = None
+        self._captcha_image = None
         self._captcha_time = 0
+        self._prefetcher = None
+        # 最近一次提交的验证码 (code, image)，供调用方保存/统计
+        self.last_captcha = None
+
+    def start_prefetch(self):
+        """启动验证码预取线程，抢课时直接取用已识别好的验证码（每个 session 同一时刻只预取一张）。"""
+        if self._prefetcher is None:
+            self._prefetcher = CaptchaPrefetcher(self._fetch_captcha)
+        self._prefetcher.start()
+
+    @staticmethod
+    def create_prefetcher(session):
+        """为另一个 session 创建（未启动的）验证码预取器，供并发抢课的额外通道使用。"""
+        return CaptchaPrefetcher(FetchLectureBackend(session)._fetch_captcha)
+
+    @property
+    def prefetcher(self):
+        return self._prefetcher
+
+    def stop_prefetch(self):
+        if self._prefetcher is not None:
+            self._prefetcher.stop()
+            self._prefetcher = None
+
+    @staticmethod
+    def preload_ocr():
+        """在后台开始加载验证码模型，程序启动时调用即可与登录、获取讲座列表并行。"""
+        _init_ocr()
+
+    @staticmethod
+    def captcha_feedback(image, v_code, code, msg, success):
+        """把 yySave.do 的结果反馈给识别器：正确答案写回对照表，错误答案不再提交。"""
+        solver = _solver_loader.value if _solver_loader is not None else None
+        if image is None or solver is None:
+            return None
+        return solver.feedback(image, v_code, code, msg, success)
+
+    def set_session(self, session):
+        """替换 session（如二次登录后），旧 session 下预取的验证码全部作废。"""
+        self.session = session
+        self._captcha_code = None
+        if self._prefetcher is not None:
+            self._prefetcher.invalidate()
 
     def get_code(self):
         """获取并识别验证码。短时间内复用缓存，避免重复请求。"""
@@ -118,6 +190,19 @@ class FetchLectureBackend:
         if self._captcha_code and now - self._captcha_time < self.CAPTCHA_TTL:
             return self._captcha_code
 
+        result, image = self._fetch_captcha()
+        if result:
+            # 只有非空验证码才缓存，空验证码不缓存以免一直发空请求
+            self._captcha_code = result
+            self._captcha_image = image
+            self._captcha_time = now
+        else:
+            self._captcha_code = None
+            _log.warning("验证码识别失败（空结果），下次重新获取")
+        return result
+
+    def _fetch_captcha(self):
+        """请求 vcode.do 并识别，返回 (code, image_bytes)，不做缓存。"""
         c_url = f"https://ehall.seu.edu.cn/gsapp/sys/jzxxtjapp/hdyy/vcode.do?_={int(time.time() * 1000)}"
         c_headers = {
             "Accept": "application/json, text/javascript, */*; q=0.01",
@@ -137,39 +222,36 @@ class FetchLectureBackend:
         if "result" not in c_r:
             raise RuntimeError("验证码接口繁忙，响应缺少result字段")
         c_img = base64.b64decode(c_r["result"].split(",")[1])
-        result = ""
-
-        if _captcha_hash_table:
-            img = Image.open(BytesIO(c_img))
-            with BytesIO() as output:
-                img.save(output, format="JPEG")
-                hash_val = md5(output.getvalue()).hexdigest()
-            if hash_val in _captcha_hash_table:
-                result = _captcha_hash_table[hash_val]
-
-        if not result:
-            result = _ocr.classification(c_img)
 
-        if result:
-            # 只有非空验证码才缓存，空验证码不缓存以免一直发空请求
-            self._captcha_code = result
-            self._captcha_time = now
-        else:
-            self._captcha_code = None
-            _log.warning("验证码识别失败（空结果），下次重新获取")
-        return result
+        # 精确哈希 → 感知哈希近邻 → OCR，只有前两级都未命中时才调用 OCR；置信度过低时返回空串
+        solver = _get_solver()
+        result, _, confidence = solver.solve(c_img)
+        if not result and confidence is not None and confidence < solver.min_confidence:
+            _log.debug("OCR 置信度 %.3f 低于阈值，丢弃并重新获取验证码", confidence)
+        return result, c_img
 
     @staticmethod
-    def login(username: str, password: str, fingerprint=None):
+    def login(username: str, password: str, fingerprint=None, reuse=False):
         """
         登录统一身份认证 + 讲座系统，返回 (session, error_info)。
         成功时 error_info 为 None，失败时 session 为 None。
         当 error_info == 'non_trusted_device' 时，session 为 auth session（可用于发送验证码）。
+        reuse=True 时先尝试复用保存的会话快照（一次探测请求），无效才走完整登录。
         """
+        if reuse:
+            session = _session_store.restore(username)
+            if session is not None:
+                _log.info("复用保存的登录会话: %s", username)
+                return session, None
+
         service_url = "http://ehall.seu.edu.cn/gsapp/sys/jzxxtjapp/*default/index.do"
-        session, redirect_url, error_info = seu_login(username, password, service_url, fingerprint)
+        pipeline = _take_pipeline(username)
+        session, redirect_url, error_info = seu_login(username, password, service_url, fingerprint,
+                                                      pipeline=pipeline)
 
         if error_info == 'non_trusted_device':
+            # 用户查看短信、输入验证码期间预取下一次登录用的公钥，login_with_phone 沿用同一个 auth session
+            _keep_pipeline(username, pipeline.prefetch())
             return session, 'non_trusted_device'  # session 可用于发送验证码
 
         if error_info:
@@ -177,27 +259,70 @@ class FetchLectureBackend:
 
         if not session or not redirect_url:
             return None, "登录失败：未获取到有效会话"
+        return FetchLectureBackend._enter_ehall(username, session, redirect_url, pipeline)
 
+    @staticmethod
+    def _enter_ehall(username, session, redirect_url, pipeline):
+        """带 ticket 访问 redirect_url 进入讲座系统，成功后保存会话快照。返回 (session, error_info)。"""
         # 先挂 TLSAdapter，再访问 redirect_url
         # 原因：redirect_url 是 http://，服务器会 302 到 https://，
         # 若 TLSAdapter 未装好就跟随重定向，校园网 TLS 握手会失败，导致 cookie 未注入
-        session.mount("https://", TLSAdapter())
-        session.mount("http://", TLSAdapter())
+        mount_tls(session)
 
         # seu_auth.py 中 session 全局 header 含 Content-Type: application/json，
         # 会污染后续 form data 请求，这里清掉，让各接口自行指定
         session.headers.pop("Content-Type", None)
 
         try:
-            res = session.get(redirect_url, verify=False, allow_redirects=True)
+            with pipeline.timed("redirect"):
+                res = session.get(redirect_url, verify=False, allow_redirects=True)
             if res.status_code != 200:
                 return None, f"访问讲座系统失败: HTTP {res.status_code}"
             # 保存 ehall 首页完整 URL（含 gid_ 等安全参数），供后续请求作为 Referer
             session.ehall_referer = res.url
         except Exception as e:
             return None, f"访问讲座系统异常: {e}"
+        session.created_at = time.time()
+        _session_store.save(username, session)
+        _log.info("登录成功: %s（%s）", username, pipeline.format_timings())
         return session, None
 
+    @staticmethod
+    def prefetch_login(username=""):
+        """
+        在后台为接下来的登录预取 RSA 公钥，立即返回。在用户输入账号密码时调用；
+        该账号有会话快照时登录大概率直接复用快照，不预取。
+        """
+        if username and os.path.exists(_session_store.path(username)):
+            return
+        with _pipelines_lock:
+            pipeline = _pipelines.get(username)
+            if pipeline is None:
+                pipeline = _pipelines[username] = LoginPipeline()
+        pipeline.prefetch()
+
+    @staticmethod
+    def _relogin_func(username, password, fingerprint, purpose):
+        def relogin():
+            new_session, error_info = FetchLectureBackend.login(username, password, fingerprint)
+            if error_info:
+                _log.warning("%s重新登录失败: %s", purpose, error_info)
+                return None
+            return new_session
+        return relogin
+
+    @staticmethod
+    def create_keeper(session, username, password, fingerprint, interval=KEEPALIVE_INTERVAL):
+        """创建会话保活器：定时探测登录状态，确认失效或接近历史存活时长时才重新登录。"""
+        relogin = FetchLectureBackend._relogin_func(username, password, fingerprint, "保活")
+        return SessionKeeper(session, relogin, interval=interval, store=_session_store)
+
+    @staticmethod
+    def create_session_pool(session, username, password, fingerprint, on_failover=None, size=STANDBY_COUNT):
+        """创建热备会话池：从 session 的统一认证 cookie 派生热备会话，派生失败时完整登录。"""
+        relogin = FetchLectureBackend._relogin_func(username, password, fingerprint, "热备会话")
+        return SessionPool(session, relogin=relogin, size=size, on_failover=on_failover)
+
     @staticmethod
     def send_phone_code(username, session):
         """
@@ -226,46 +351,21 @@ class FetchLectureBackend:
     def login_with_phone(username, password, fingerprint, phone_code):
         """
         带手机验证码的登录（验证码已发送，直接登录）。
+        沿用 login() 返回 non_trusted_device 时的 auth session 与已预取的公钥。
         """
-        from seu_auth import get_pub_key, rsa_encrypt
-        from urllib.parse import unquote
-
         service_url = "http://ehall.seu.edu.cn/gsapp/sys/jzxxtjapp/*default/index.do"
-
-        # 重新获取公钥并登录
-        session2, pub_key = get_pub_key()
-        if not session2 or not pub_key:
-            return None, "获取公钥失败"
-
-        enc_password = rsa_encrypt(password, pub_key)
-        enc_phone_code = rsa_encrypt(phone_code, pub_key)
-
-        login_url = 'https://auth.seu.edu.cn/auth/casback/casLogin'
-        data = {
-            'captcha': '', 'loginType': 'account', 'mobilePhoneNum': '',
-            'mobileVerifyCode': enc_phone_code, 'password': enc_password,
-            'rememberMe': False, 'service': service_url,
-            'username': username, 'wxBinded': False,
-        }
-        if fingerprint:
-            data['fingerPrint'] = fingerprint
-
-        res = session2.post(url=login_url, data=json.dumps(data))
-        result = res.json()
-
-        if not result.get('success'):
-            return None, result.get('info', '登录失败')
-
-        redirect_url = result.get('redirectUrl')
-        if redirect_url:
-            redirect_url = unquote(redirect_url)
-            session2.mount("https://", TLSAdapter())
-            session2.mount("http://", TLSAdapter())
-            res = session2.get(redirect_url, verify=False, allow_redirects=True)
-            session2.ehall_referer = res.url
-            return session2, None
-
-        return None, "获取重定向URL失败"
+        pipeline = _take_pipeline(username)
+        session, redirect_url, error_info = seu_login(username, password, service_url, fingerprint, phone_code,
+                                                      pipeline=pipeline)
+        if error_info == 'non_trusted_device':
+            # 验证码错误或已过期，保留 auth session 供重新发送验证码后再试
+            _keep_pipeline(username, pipeline.prefetch())
+            return None, "验证码错误或已过期"
+        if error_info:
+            return None, error_info
+        if not session or not redirect_url:
+            return None, "获取重定向URL失败"
+        return FetchLectureBackend._enter_ehall(username, session, redirect_url, pipeline)
 
     @staticmethod
     def get_lecture_list(session):
@@ -293,7 +393,7 @@ class FetchLectureBackend:
             elif "vpn.seu.edu.cn" in final_url:
                 raise RuntimeError("当前不在校园网，请连接 EasyConnect VPN 后重试")
             elif "login" in final_url or "portal" in final_url:
-                raise RuntimeError("session 已失效，请重新登录")
+                raise SessionExpiredError("session 已失效，请重新登录")
             else:
                 # 服务器返回异常JSON但非VPN/登录问题，视为繁忙
                 return session, None, None
@@ -332,10 +432,19 @@ class FetchLectureBackend:
         发送抢课请求。返回 (code, msg, success)。
         服务器繁忙时返回友好提示而非致命错误，让抢课循环继续重试。
         """
-        try:
-            v_code = self.get_code()
-        except RuntimeError as e:
-            return 500, str(e), False
+        if self._prefetcher is not None:
+            item = self._prefetcher.pop(timeout=5)
+            if item is None:
+                err = self._prefetcher.last_error
+                return 500, str(err) if err else "验证码预取超时", False
+            v_code, v_img, _ = item
+        else:
+            try:
+                v_code = self.get_code()
+            except RuntimeError as e:
+                return 500, str(e), False
+            v_img = self._captcha_image if v_code else None
+        self.last_captcha = (v_code, v_img)
         if not v_code:
             _log.warning("验证码识别为空，跳过本次请求")
             return 500, "验证码识别失败", False
@@ -358,6 +467,9 @@ class FetchLectureBackend:
 
         try:
             r = self.session.post(url, data=form_data, headers=headers, verify=False)
+            if is_login_redirect(r.url):
+                _log.warning("yySave 被重定向到登录页: %s", r.url)
+                return LOGIN_EXPIRED_CODE, LOGIN_EXPIRED_MSG, False
 
             if not r.text.strip():
                 _log.warning("yySave HTTP %s: 响应为空", r.status_code)
@@ -380,10 +492,17 @@ class FetchLectureBackend:
                 _log.info("yySave 成功: code=%s msg=%s", code, msg)
             else:
                 _log.warning("yySave 失败: code=%s msg=%s", code, msg)
+            if self.captcha_feedback(v_img, v_code, code, msg, success) is False:
+                # 缓存的验证码已被服务器否定，不能在缓存期内重复提交
+                self._captcha_code = None
             return code, msg, success
 
         except requests.exceptions.RequestException as e:
             return 500, f"服务器繁忙，请求异常: {str(e)[:80]}", False
+        finally:
+            if self._prefetcher is not None:
+                # 已提交完毕，预取线程可以为该 session 请求下一张验证码
+                self._prefetcher.done()
 
     def check_booking_success(self, target_wid: str, max_page: int = 5, session=None) -> bool:
         """
@@ -7,20 +7,33 @@ import random
 import re
 import urllib3
 from hashlib import md5
-from io import BytesIO
 import select
 import datetime
 
-import ddddocr
 import requests
-from PIL import Image
 from rich.console import Console
 from rich.progress import Progress
 from rich.prompt import Prompt, Confirm
 from rich.table import Table
 from rich.panel import Panel
 
-from seu_auth import seu_login  # 确保该模块存在
+from seu_auth import LoginPipeline, seu_login  # 确保该模块存在
+from tls_transport import mount_tls
+from session_store import SessionStore, is_login_redirect
+from session_keeper import SessionKeeper
+from session_pool import FAULT_EXPIRED, LOGIN_EXPIRED_CODE, LOGIN_EXPIRED_MSG, STANDBY_COUNT, SessionPool
+from captcha_table import CaptchaHashTable, preferred_table_path
+from captcha_phash import PerceptualIndex
+from captcha_solver import CaptchaSolver
+from captcha_learning import CaptchaLearningStore, LEARNED_PATH
+from captcha_pipeline import CaptchaPrefetcher
+from ocr_loader import BackgroundLoader, load_ocr
+from ocr_confidence import CONFIDENCE_LOG, THRESHOLD_PATH, ConfidenceLog, load_threshold
+from clock_sync import ServerClock
+from scheduler import deadline_from_epoch, wait_until
+from conn_warmup import ConnectionWarmer
+from async_engine import AsyncBookingEngine
+from capacity_monitor import CapacityMonitor
 
 # JSON 解析工具：跳过前导垃圾字节
 _JSON_START_RE = re.compile(r'[\[\{]')
@@ -46,6 +59,9 @@ error_console = Console(stderr=True, style="bold red")
 # 是否保存验证码
 save_code = False
 
+# 登录会话快照：重启后直接复用仍然有效的会话，跳过统一认证登录
+session_store = SessionStore()
+
 def resource_path(relative_path):
     if getattr(sys, 'frozen', False):  # 判断是否处于打包环境
         base_path = getattr(sys, '_MEIPASS', '')  # 临时解压路径
@@ -54,22 +70,13 @@ def resource_path(relative_path):
         base_path = os.path.dirname(os.path.abspath(__file__))
     return str(os.path.join(base_path, relative_path))
 
-import ssl
-from requests.adapters import HTTPAdapter
+# 学习结果、置信度日志与阈值文件需要可写，放在脚本所在目录（与 GUI、tools/tune_confidence.py 一致），不依赖启动时的工作目录
+PROJECT_ROOT = os.path.dirname(os.path.abspath(__file__))
+
 from urllib3.exceptions import InsecureRequestWarning
 
 urllib3.disable_warnings(InsecureRequestWarning)
 
-class TLSAdapter(HTTPAdapter):
-    def init_poolmanager(self, *args, **kwargs):
-        ctx = ssl.create_default_context()
-        ctx.set_ciphers("DEFAULT@SECLEVEL=1")
-        ctx.check_hostname = False
-        ctx.verify_mode = ssl.CERT_NONE
-        ctx.options |= 0x4
-        kwargs["ssl_context"] = ctx
-        return super().init_poolmanager(*args, **kwargs)
-
 # 生成浏览器指纹
 def generate_fingerprint():
     # 仿照984ba064c2399f4b5c379df8aaeb995a生成，同样字符数，随机生成
@@ -107,6 +114,8 @@ def fetch_lecture(hd_wid: str, ss, ver_code):
 
     try:
         r = ss.post(url, data=form_data, headers=headers, verify=False)
+        if is_login_redirect(r.url):
+            return LOGIN_EXPIRED_CODE, LOGIN_EXPIRED_MSG, False
         
         # 调试输出
         if not r.text.strip():
@@ -161,7 +170,7 @@ def check_booking_success(ss, target_wid: str, max_page: int = 5) -> bool:
     return False
 
 
-def get_code(ss, captcha_hash_table=None):
+def get_code(ss, solver):
     c_url = f"https://ehall.seu.edu.cn/gsapp/sys/jzxxtjapp/hdyy/vcode.do?_={int(time.time() * 1000)}"
     c_headers = {
         "Accept": "application/json, text/javascript, */*; q=0.01",
@@ -181,19 +190,9 @@ def get_code(ss, captcha_hash_table=None):
     except (json.JSONDecodeError, RuntimeError):
         raise RuntimeError("验证码接口繁忙")
     c_img = base64.b64decode(c_r["result"].split(",")[1])
-    result = ""
-
-    if captcha_hash_table:
-        img = Image.open(BytesIO(c_img))
-        with BytesIO() as output:
-            img.save(output, format="JPEG")
-            hash_val = md5(output.getvalue()).hexdigest()
-        if hash_val in captcha_hash_table:
-            result = captcha_hash_table[hash_val]
-
-    if not result:
-        result = ocr.classification(c_img)
 
+    # 精确哈希 → 感知哈希近邻 → OCR，只有前两级都未命中时才调用 OCR；置信度过低时返回空串
+    result, _, _ = solver.solve(c_img)
     return result, c_img
 
 def get_mobile_verify_code(ss, username: str):
@@ -205,16 +204,32 @@ def get_mobile_verify_code(ss, username: str):
     else:
         console.print(Panel.fit(f"[bold yellow]⚠ {res.json()['info']}[/]", title="提示"))
 
-def login(username: str, password: str, fingerprint=None):
+def login(username: str, password: str, fingerprint=None, reuse=False, pipeline=None):
+    """
+    登录并返回 ehall session，失败返回 None。
+    reuse=True 时先尝试复用 sessions/ 下保存的会话快照（一次探测请求），无效才走完整登录。
+    pipeline 为已在后台预取公钥的 LoginPipeline（如在用户输入账号密码时创建），不传则新建。
+    """
+    if reuse:
+        session = session_store.restore(username)
+        if session is not None:
+            console.print("[bold green]✓ 已复用保存的登录会话[/]")
+            return session
+    if pipeline is None:
+        pipeline = LoginPipeline()
     try:
         service_url = "http://ehall.seu.edu.cn/gsapp/sys/jzxxtjapp/*default/index.do"
-        session, redirect_url, error_type = seu_login(username, password, service_url, fingerprint)
+        session, redirect_url, error_type = seu_login(username, password, service_url, fingerprint,
+                                                      pipeline=pipeline)
         
         if error_type == 'non_trusted_device':
             console.print(Panel.fit(f"[bold yellow]⚠ 非可信设备登录，需要输入手机验证码[/]", title="提示"))
             get_mobile_verify_code(session, username)
+            # 用户查看短信、输入验证码期间在同一个 auth session 上预取下一次登录用的公钥
+            pipeline.prefetch()
             phone_code = Prompt.ask("请输入手机验证码")
-            session, redirect_url, error_type = seu_login(username, password, service_url, fingerprint, phone_code)
+            session, redirect_url, error_type = seu_login(username, password, service_url, fingerprint, phone_code,
+                                                          pipeline=pipeline)
         if not session:
             raise Exception("统一身份认证平台登录失败")
         if not redirect_url:
@@ -222,22 +237,25 @@ def login(username: str, password: str, fingerprint=None):
 
         # 在访问 ehall 前先挂 TLSAdapter，并清掉统一认证阶段遗留的 JSON Content-Type，
         # 否则后续表单接口会带错请求头，导致列表接口返回异常。
-        session.mount("https://", TLSAdapter())
-        session.mount("http://", TLSAdapter())
+        mount_tls(session)
         session.headers.pop("Content-Type", None)
 
-        res = session.get(redirect_url, verify=False, allow_redirects=True)
+        with pipeline.timed("redirect"):
+            res = session.get(redirect_url, verify=False, allow_redirects=True)
         if res.status_code != 200:
             raise Exception(f"访问研究生素质讲座系统失败[{res.status_code}, {res.reason}]")
         # 保存 ehall 首页完整 URL（含 gid_ 等安全参数），供后续请求作为 Referer
         session.ehall_referer = res.url
+        session.created_at = time.time()
+        session_store.save(username, session)
+        console.print(f"[dim]登录各阶段耗时: {pipeline.format_timings()}[/]")
         return session
     except Exception as e:
         error_console.print(Panel.fit(f"[bold red]✗ 登录失败: {str(e)}[/]", title="错误"))
         return None
 
 
-def get_lecture_list(session):
+def get_lecture_list(session, quiet=False):
     try:
         res = session.post(
             f"https://ehall.seu.edu.cn/gsapp/sys/jzxxtjapp/hdyy/queryActivityList.do?_={int(time.time() * 1000)}",
@@ -252,15 +270,16 @@ def get_lecture_list(session):
         lecture_list = data["datas"]
         stu_cnt_arr = [[int(l["HDZRS"]), int(l["YYRS"])] for l in lecture_list]
 
-        console.print("[bold green]✓ 获取讲座列表成功[/]")
+        if not quiet:
+            console.print("[bold green]✓ 获取讲座列表成功[/]")
         return session, lecture_list, stu_cnt_arr
     except Exception as e:
         # 网络异常等，返回空让抢课继续
         return session, None, None
 
 
-def login_and_get_lecture_list(username: str, password: str, fingerprint=None):
-    session = login(username, password, fingerprint)
+def login_and_get_lecture_list(username: str, password: str, fingerprint=None, pipeline=None):
+    session = login(username, password, fingerprint, reuse=True, pipeline=pipeline)
     if session is None:
         return None, None, None
 
@@ -290,18 +309,22 @@ def print_lecture_list(lecture_list: list):
 
 
 if __name__ == "__main__":
-    # 初始化验证码组件（自定义模型已不兼容新验证码，改用默认内置模型）
-    captcha_hash_table_path = resource_path("captcha_hash_table.csv")
-    ocr = ddddocr.DdddOcr(show_ad=False)
-    captcha_hash_table = {}
-    if os.path.exists(captcha_hash_table_path):
-        with open(captcha_hash_table_path) as f:
-            for line in f:
-                if line.strip():
-                    hash_val, label = line.strip().split(",")
-                    captcha_hash_table[hash_val] = label
-
-    # 用户认证
+    def build_solver():
+        ocr = load_ocr()
+        captcha_hash_table = CaptchaHashTable(preferred_table_path(resource_path("captcha_hash_table.csv")))
+        phash_index = PerceptualIndex(resource_path("captcha_phash_table.csv"))
+        # 服务器确认/否定过的验证码答案，边抢边学
+        learning = CaptchaLearningStore(os.path.join(PROJECT_ROOT, LEARNED_PATH), captcha_hash_table, phash_index)
+        # 置信度低于阈值的 OCR 结果直接丢弃、重新获取验证码，不浪费抢课请求
+        return CaptchaSolver(captcha_hash_table, phash_index, ocr, learning=learning,
+                             min_confidence=load_threshold(os.path.join(PROJECT_ROOT, THRESHOLD_PATH)),
+                             confidence_log=ConfidenceLog(os.path.join(PROJECT_ROOT, CONFIDENCE_LOG)))
+
+    # 验证码组件在后台加载并预热，与读取配置、登录、获取讲座列表同时进行
+    solver_loader = BackgroundLoader(build_solver).start()
+
+    # 用户认证；需要手动输入账号密码时，输入期间在后台预取统一认证的 RSA 公钥
+    auth_pipeline = None
     with console.status("[bold green]正在读取配置文件...") as status:
         try:
             with open("config.txt") as f:
@@ -310,6 +333,7 @@ if __name__ == "__main__":
         except Exception:
             status.stop()  # 关键：停止状态动画
             console.print(Panel.fit("[yellow]⚠ 将在当前目录创建 config.txt 文件[/]", title="提示"))
+            auth_pipeline = LoginPipeline().prefetch()
             user_name = Prompt.ask("请输入学号", console=console)
             password = Prompt.ask("请输入密码", password=True, console=console)
             fingerprint = generate_fingerprint()
@@ -318,7 +342,7 @@ if __name__ == "__main__":
 
 # 第一次登录：获取讲座列表和初始Session
     console.print(Panel.fit(f"[bold]🕒 {time.ctime()} 首次尝试登录系统并获取讲座列表...[/]", title="状态"))
-    s, lecture_list, stu_cnt_arr = login_and_get_lecture_list(user_name, password, fingerprint)
+    s, lecture_list, stu_cnt_arr = login_and_get_lecture_list(user_name, password, fingerprint, auth_pipeline)
     if lecture_list is None:
         error_console.print("[bold red]✗ 登录或获取讲座列表失败，退出程序[/]")
         sys.exit(1)
@@ -337,22 +361,53 @@ if __name__ == "__main__":
     if not Confirm.ask(f"确认选择讲座 [cyan]{lecture_info['JZMC']}[/]", default=True, console=console):
         sys.exit(0)
 
-    # 等待抢课 - 使用本地时间
+    # 等待抢课 - 按服务器时间（倒计时期间采样 ehall 响应的 Date 头估计时钟偏移）
     target_time = datetime.datetime.strptime(lecture_info["YYKSSJ"], "%Y-%m-%d %H:%M:%S")
+    target_ts = target_time.timestamp()
+    clock = ServerClock()
     
-    # 提前重新登录的时间（秒）。目标时间前 10 秒重新登录，确保 session 最新
+    # 提前检查登录状态的时间（秒）。目标时间前 10 秒探测一次 session，确认失效才重新登录
     # RELOGIN_BEFORE_SECONDS = 10 
-    RELOGIN_BEFORE_SECONDS = Prompt.ask("请输入提前重新登录的时间（秒）", console=console, default=10)
+    RELOGIN_BEFORE_SECONDS = Prompt.ask("请输入提前检查登录状态的时间（秒），失效时重新登录", console=console, default=10)
     RELOGIN_BEFORE_SECONDS = float(RELOGIN_BEFORE_SECONDS)
     
-    # 倒计时延迟（秒）。目标时间结束后再延迟 0.5 秒开始抢课循环
-    # START_DELAY_SECONDS = 0.5 
-    START_DELAY_SECONDS = Prompt.ask("请输入倒计时延迟（秒），可为负数", console=console, default=0.5)
+    # 倒计时延迟（秒）。已按服务器时间倒计时，通常无需额外延迟
+    # START_DELAY_SECONDS = 0
+    START_DELAY_SECONDS = Prompt.ask("请输入倒计时延迟（秒），可为负数", console=console, default=0)
     START_DELAY_SECONDS = float(START_DELAY_SECONDS)
 
+    # 开抢前最后多少秒改用高精度调度器等待（不再刷新进度条）
+    FINAL_WAIT_SECONDS = 1
+
+    # 同时在途的抢课请求数。1 为逐个请求；大于 1 时使用异步并发引擎，每个在途请求各用一个独立会话
+    CONCURRENCY = int(Prompt.ask("请输入并发请求数（1 为逐个请求）", console=console, default=1))
+
+    # 验证码预取：后台线程提前完成验证码请求与识别（始终使用最新的 session）
+    # 服务器只认最近一次下发的验证码，同一时刻只预取一张；第一次识别时模型若仍未加载完成才会阻塞
+    prefetcher = CaptchaPrefetcher(lambda: get_code(ss=s, solver=solver_loader.get()))
+
+    def next_code():
+        item = prefetcher.pop(timeout=5)
+        if item is None:
+            return "", None
+        return item[0], item[1]
+
+    # 热备会话：开抢前从统一认证 cookie 派生若干个独立的 ehall 会话，
+    # 抢课中当前会话被重定向到登录页或连续请求异常时立即切换，再在后台补充
+    def on_failover(session, reason):
+        global s
+        s = session
+        prefetcher.invalidate()
+        cause = "已失效" if reason == FAULT_EXPIRED else "连续请求异常"
+        console.print(f"[bold yellow]⚠ 当前会话{cause}，已切换到热备会话（剩余热备 {session_pool.standby_count} 个）[/]")
+
+    # 并发模式下额外的在途请求各借用一个热备会话，热备数量相应增加
+    session_pool = SessionPool(s, relogin=lambda: login(user_name, password, fingerprint),
+                               size=STANDBY_COUNT + CONCURRENCY - 1, on_failover=on_failover)
+
     with Progress() as progress:
-        start_time = datetime.datetime.now()
-        total_seconds = (target_time - start_time).total_seconds()
+        clock.sample(s)
+        total_seconds = clock.to_local(target_ts) - time.time()
         
         # total_seconds 可能为负，确保总数合理
         task = progress.add_task(
@@ -361,25 +416,55 @@ if __name__ == "__main__":
         )
         
         relogin_done = False
+        warmer = None
+        # 倒计时期间后台保活：定时探测登录状态，失效或接近历史存活时长时才重新登录
+        keeper = SessionKeeper(s, lambda: login(user_name, password, fingerprint), store=session_store)
+        keeper.start()
 
         while True:
-            current_time = datetime.datetime.now()
-            remaining = (target_time - current_time).total_seconds()
+            remaining = clock.to_local(target_ts) - time.time()
+            if clock.maybe_sample(s, remaining + START_DELAY_SECONDS):
+                remaining = clock.to_local(target_ts) - time.time()
             
-            # 检查是否需要提前重新登录
+            if keeper.session is not s:
+                # 保活线程已在后台换了新 session
+                s = keeper.session
+                console.print(f"[bold green]✓ 登录会话已在后台刷新（第 {keeper.renewals} 次）[/]")
+                session_pool.set_active(s)
+                if relogin_done:
+                    prefetcher.invalidate()
+                    if warmer:
+                        warmer.stop()
+                    warmer = ConnectionWarmer(s)
+                    warmer.start()
+
+            # 开抢前检查登录状态（一次探测），只有确认失效才重新登录
             if not relogin_done and 0 < remaining <= RELOGIN_BEFORE_SECONDS:
-                console.rule(f"[bold yellow]🕒 目标时间前 {RELOGIN_BEFORE_SECONDS} 秒，进行二次登录...[/]")
-                s = login(user_name, password, fingerprint)
+                console.rule(f"[bold yellow]🕒 目标时间前 {RELOGIN_BEFORE_SECONDS} 秒，检查登录状态...[/]")
+                renewals = keeper.renewals
+                s = keeper.ensure_valid()
                 if s is None:
-                    error_console.print("[bold red]✗ 提前二次登录失败，退出程序[/]")
+                    error_console.print("[bold red]✗ 登录已失效且重新登录失败，退出程序[/]")
                     sys.exit(1)
-                console.print("[bold green]✓ 二次登录成功！[/]")
+                if keeper.renewals > renewals:
+                    console.print("[bold green]✓ 登录已失效，重新登录成功！[/]")
+                else:
+                    console.print(f"[bold green]✓ 登录状态有效（会话已存活 {keeper.age() / 60:.0f} 分钟），无需重新登录[/]")
                 relogin_done = True
-
-
-            if remaining <= -START_DELAY_SECONDS:
-                # 倒计时结束且延迟时间已过
-                progress.update(task, completed=max(total_seconds, 1))
+                # 立即开始预取验证码，倒计时结束即可直接发送抢课请求
+                prefetcher.invalidate()
+                prefetcher.start()
+                # 同时开始派生热备会话
+                session_pool.set_active(s)
+                session_pool.start()
+                # 预先建立 keep-alive 连接并保持到开抢
+                warmer = ConnectionWarmer(s)
+                warmer.start()
+
+
+            # 距开抢时刻（目标时间 + 延迟）不足 FINAL_WAIT_SECONDS 秒时，交给高精度调度器
+            fire_in = remaining + START_DELAY_SECONDS
+            if fire_in <= FINAL_WAIT_SECONDS:
                 break
             
             if remaining <= 0:
@@ -389,118 +474,179 @@ if __name__ == "__main__":
                     completed=total_seconds,
                     description=f"[bold red]⏰ 目标已到，延迟 {abs(remaining):.2f} / {START_DELAY_SECONDS:.2f} 秒开始抢课...[/]"
                 )
-                time.sleep(0.01) # 微小延迟，保持 CPU 占用合理
-                continue
-            
-            # 正常倒计时更新
-            progress.update(
-                task,
-                completed=total_seconds - remaining, # 计算已完成的进度
-                description=f"[bold cyan]⏳ 剩余时间: {str(datetime.timedelta(seconds=int(remaining)))}.{int((remaining % 1) * 10):<1} 秒[/] | 目标时间: {target_time.strftime('%H:%M:%S')}"
-            )
+            else:
+                # 正常倒计时更新
+                progress.update(
+                    task,
+                    completed=total_seconds - remaining, # 计算已完成的进度
+                    description=f"[bold cyan]⏳ 剩余时间: {str(datetime.timedelta(seconds=int(remaining)))}.{int((remaining % 1) * 10):<1} 秒[/] | 目标时间: {target_time.strftime('%H:%M:%S')} | 服务器时钟{clock.describe()}"
+                )
             
-            # 根据剩余时间调整休眠，越接近目标时间越频繁
+            # 根据剩余时间调整休眠，越接近目标时间越频繁（刷新进度条无需比 0.1 秒更频繁）
             if remaining > 60:
-                time.sleep(1)
+                step = 1
             elif remaining > 10:
-                time.sleep(0.5)
-            elif remaining > 2:
-                time.sleep(0.1)
+                step = 0.5
             else:
-                time.sleep(0.01) # 接近 0 时采用更精细的等待
+                step = 0.1
+            time.sleep(min(step, fire_in - FINAL_WAIT_SECONDS))
+
+        # 开抢后不再在后台替换 session
+        keeper.stop()
+        s = keeper.session
+        session_pool.set_active(s)
+        session_pool.start()
+        if warmer:
+            warmer.stop()
+            console.print(f"[dim]连接预热完成：{warmer.rounds} 轮，最近一轮 {warmer.last_ok}/{warmer.n} 条连接可用[/]")
+
+        # 最后阶段：粗睡眠 → 短睡眠 → 忙等，精确到开抢时刻
+        late_ns = wait_until(deadline_from_epoch(clock.to_local(target_ts) + START_DELAY_SECONDS))
+        progress.update(task, completed=max(total_seconds, 1))
+
+    console.print(f"[dim]定时唤醒误差 {late_ns / 1000:.0f} µs | 服务器时钟{clock.describe()}[/]")
 
     # 抢课循环开始
     console.rule(f"[bold red]🚀 延迟 {START_DELAY_SECONDS} 秒结束，开始抢课！[/]")
     
-    # 确保在开始抢课时 s 是最新的（如果在倒计时期间没有触发二次登录，这里相当于补一个）
+    # 倒计时期间没有做过登录检查（如启动时已过检查时刻），这里补一次，确认失效才重新登录
     if not relogin_done:
-         console.rule("[bold yellow]🕒 未触发二次登录，进行最终登录检查...[/]")
-         s = login(user_name, password, fingerprint)
+         console.rule("[bold yellow]🕒 未检查过登录状态，进行最终登录检查...[/]")
+         s = keeper.ensure_valid()
          if s is None:
              error_console.print("[bold red]✗ 最终登录失败，退出程序[/]")
              sys.exit(1)
          console.print("[bold green]✓ 最终登录检查成功，开始抢课！[/]")
+         prefetcher.invalidate()
+         session_pool.set_active(s)
+    prefetcher.start()
     
     # 创建验证码保存目录 (保持不变)
     if save_code:
         os.makedirs("code_img/true", exist_ok=True)
         os.makedirs("code_img/false", exist_ok=True)
     
-    # 第一次获取验证码
-    v_code, v_img = get_code(ss=s, captcha_hash_table=captcha_hash_table)
-    attempt = 1
-    check_interval = 5  # 每抢 N 次查询一次已预约列表
+    # 余量监视：后台独立轮询讲座列表，抢课请求只读取最新快照，不再每次请求前拉取整张列表
+    monitor = CapacityMonitor(lambda: get_lecture_list(s, quiet=True)[1], wid)
+    monitor.start()
+
+    # 验证码模型通常早已在后台加载完成，仍未就绪时在此等待（预取线程同样在等待）
+    solver = solver_loader.get()
+    console.print(f"[dim]验证码模型后台加载耗时 {solver_loader.elapsed:.2f} 秒[/]")
+
     success_confirmed = False
+    if CONCURRENCY > 1:
+        # 并发模式：异步引擎同时保持多个抢课请求在途，确认成功后取消其余请求
+        def print_result(attempt, code, msg, success):
+            style = "green" if success else "yellow" if "繁忙" in msg else "red" if "频繁" in msg else "yellow"
+            console.print(f"[{style}]» 第 {attempt} 次 | 状态码: {code} | 消息: {msg} | 成功: {success}[/]")
+
+        engine = AsyncBookingEngine(
+            s, wid, prefetcher,
+            confirm=lambda: check_booking_success(s, wid),
+            concurrency=CONCURRENCY,
+            on_result=print_result,
+            is_full=monitor.is_full,
+            feedback=solver.feedback,
+            pool=session_pool,
+            make_prefetcher=lambda session: CaptchaPrefetcher(lambda: get_code(ss=session, solver=solver)),
+        )
+        success_confirmed = engine.run()
+        if success_confirmed:
+            console.print(Panel.fit(
+                f"[bold green]🎉 抢课成功确认！[/]\n讲座WID: {wid}\n讲座名称: {lecture_info['JZMC']}\n共发出 {engine.attempts} 次请求",
+                title="✓ 成功"
+            ))
+    else:
+        # 第一次获取验证码（预取队列中已就绪，无需等待）
+        v_code, v_img = next_code()
+        attempt = 1
+        check_interval = 5  # 每抢 N 次查询一次已预约列表
     
-    while True:
-        # 获取最新讲座列表（失败时跳过余量检查，继续抢）
-        s, lecture_list_refresh, stu_cnt_arr = get_lecture_list(s)
-        try:
-            with console.status(
-                    f"[bold][yellow]{datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}[/yellow] - 第 {attempt} 次尝试..."
-            ):
+        while True:
+            try:
+                with console.status(
+                        f"[bold][yellow]{datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}[/yellow] - 第 {attempt} 次尝试..."
+                ):
+
+                    # 读取余量快照（尚未取到数据或快照过旧时不做余量检查，继续抢）
+                    snap = monitor.current()
+                    if snap and snap[0] <= snap[1]:
+                        console.print(f"[yellow]当前人数已满 ({snap[1]}/{snap[0]})，等待下次尝试...[/]")
+                        attempt += 1
+                        time.sleep(1)
+                        continue
+
+                    used = s
+                    code, msg, success = fetch_lecture(wid, used, v_code)
+                    style = "green" if success else "yellow" if "繁忙" in msg else "red" if "频繁" in msg else "yellow"
+                    console.print(f"[{style}]» 状态码: {code}\n   消息: {msg}\n   成功: {success}[/]")
+                    if "满" in msg:
+                        # 服务器提示已满，立即刷新余量快照
+                        monitor.poke()
+                    # 服务器的判定写回对照表：正确的答案以后直接命中，错误的答案不再提交
+                    solver.feedback(v_img, v_code, code, msg, success)
+                    if session_pool.report(used, code, msg) is not used:
+                        # 已切换到热备会话（on_failover 已替换 s），旧会话下的验证码作废，重新获取
+                        v_code, v_img = next_code()
+                        continue
+
+                    if not v_code:
+                        # 验证码为空，立即重新获取
+                        v_code, v_img = next_code()
+                        continue
+
+                    if "验证码错误" in msg:
+                        # 这张验证码已用完，下面随机延迟的同时预取下一张
+                        prefetcher.done()
+                        # 保存验证码
+                        if save_code:
+                            with open(f"code_img/false/captcha_{attempt}_code{v_code}.jpg", "wb") as f:
+                                f.write(v_img)
+
+                        # 验证码错误后随机延迟 0.1-0.5 秒
+                        random_delay = random.uniform(0.1, 0.5)
+                        time.sleep(random_delay)
+                    
+                        v_code, v_img = next_code()
+                        continue
+                    else:
+                        # 保存验证码
+                        if save_code:
+                            with open(f"code_img/true/captcha_{attempt}_code{v_code}.jpg", "wb") as f:
+                                f.write(v_img)
+
+                    if success:
+                        console.print("[bold green]✓ 服务器返回预约成功，正在通过已预约列表确认...[/]")
+
+                    # 定期查询已预约列表确认是否成功（每 check_interval 次或服务器返回成功时）
+                    if attempt % check_interval == 0 or success:
+                        with console.status("[bold cyan]正在查询已预约讲座列表确认结果...[/]"):
+                            if check_booking_success(s, wid):
+                                console.print(Panel.fit(
+                                    f"[bold green]🎉 抢课成功确认！[/]\n讲座WID: {wid}\n讲座名称: {lecture_info['JZMC']}\n于第 {attempt} 次尝试确认成功",
+                                    title="✓ 成功"
+                                ))
+                                success_confirmed = True
+                                break
+                            elif success:
+                                console.print("[yellow]⚠ 服务器返回成功但已预约列表中未找到，可能存在延迟，继续尝试...[/]")
+
+                    if "频繁" in msg:
+                        console.print("[yellow]请求过于频繁，等待 10 秒后重试...[/]")
+                        time.sleep(10)
 
-                if stu_cnt_arr and stu_cnt_arr[int(target_index)][0] <= stu_cnt_arr[int(target_index)][1]:  # pyright: ignore[reportOptionalSubscript]
-                    console.print("[yellow]当前人数已满，等待下次尝试...[/]")
                     attempt += 1
-                    time.sleep(1)
-                    continue
-                elif not stu_cnt_arr:
-                    # 获取列表失败，跳过余量检查
-                    pass
-
-                code, msg, success = fetch_lecture(wid, s, v_code)
-                style = "green" if success else "yellow" if "繁忙" in msg else "red" if "频繁" in msg else "yellow"
-                console.print(f"[{style}]» 状态码: {code}\n   消息: {msg}\n   成功: {success}[/]")
-
-                if not v_code:
-                    # 验证码为空，立即重新获取
-                    v_code, v_img = get_code(ss=s, captcha_hash_table=captcha_hash_table)
-                    continue
-
-                if "验证码错误" in msg:
-                    # 保存验证码
-                    if save_code:
-                        with open(f"code_img/false/captcha_{attempt}_code{v_code}.jpg", "wb") as f:
-                            f.write(v_img)
-
-                    # 验证码错误后随机延迟 0.1-0.5 秒
-                    random_delay = random.uniform(0.1, 0.5)
-                    time.sleep(random_delay)
-                    
-                    v_code, v_img = get_code(ss=s, captcha_hash_table=captcha_hash_table)
-                    continue
-                else:
-                    # 保存验证码
-                    if save_code:
-                        with open(f"code_img/true/captcha_{attempt}_code{v_code}.jpg", "wb") as f:
-                            f.write(v_img)
-
-                if success:
-                    console.print("[bold green]✓ 服务器返回预约成功，正在通过已预约列表确认...[/]")
-
-                # 定期查询已预约列表确认是否成功（每 check_interval 次或服务器返回成功时）
-                if attempt % check_interval == 0 or success:
-                    with console.status("[bold cyan]正在查询已预约讲座列表确认结果...[/]"):
-                        if check_booking_success(s, wid):
-                            console.print(Panel.fit(
-                                f"[bold green]🎉 抢课成功确认！[/]\n讲座WID: {wid}\n讲座名称: {lecture_info['JZMC']}\n于第 {attempt} 次尝试确认成功",
-                                title="✓ 成功"
-                            ))
-                            success_confirmed = True
-                            break
-                        elif success:
-                            console.print("[yellow]⚠ 服务器返回成功但已预约列表中未找到，可能存在延迟，继续尝试...[/]")
-
-                if "频繁" in msg:
-                    console.print("[yellow]请求过于频繁，等待 10 秒后重试...[/]")
-                    time.sleep(10)
-
-                attempt += 1
-                time.sleep(0.5)
-        except Exception as e:
-            console.print(f"[yellow]⚠ 异常(继续重试): {str(e)}[/]")
-            time.sleep(1)
+                    time.sleep(0.5)
+            except Exception as e:
+                console.print(f"[yellow]⚠ 异常(继续重试): {str(e)}[/]")
+                time.sleep(1)
+
+    prefetcher.stop()
+    monitor.stop()
+    session_pool.stop()
+    if session_pool.failovers:
+        console.print(f"[dim]抢课期间切换热备会话 {session_pool.failovers} 次[/]")
 
     # 退出处理
     if success_confirmed:
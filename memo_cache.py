@@ -0,0 +1,85 @@
+"""
+有界、线程安全的 LRU 备忘缓存，带过期时间与命中统计。
+
+vcode.do 被频繁请求时服务器会反复返回同一张验证码图片，
+以图片原始字节的 md5 为键缓存识别结果，重复的图片无需再查表或推理。
+缓存条目数不超过 maxsize（超出时淘汰最久未使用的条目），每条最多保留 ttl 秒。
+"""
+import threading
+import time
+from collections import OrderedDict
+
+MEMO_SIZE = 256
+MEMO_TTL = 600
+
+
+class MemoCache:
+    def __init__(self, maxsize=MEMO_SIZE, ttl=MEMO_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self._data = OrderedDict()  # key -> (value, 过期时刻 monotonic)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key):
+        """取出未过期的缓存值，未命中返回 None。"""
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                self.misses += 1
+                return None
+            value, expires_at = item
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def peek(self, key):
+        """取出缓存值但不计入命中统计、不调整淘汰顺序，未命中或已过期返回 None。"""
+        with self._lock:
+            item = self._data.get(key)
+        if item is None or item[1] <= time.monotonic():
+            return None
+        return item[0]
+
+    def put(self, key, value):
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + self.ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def pop(self, key):
+        with self._lock:
+            item = self._data.pop(key, None)
+        return None if item is None else item[0]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
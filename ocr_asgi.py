@@ -0,0 +1,268 @@
+"""
+OCR 服务的异步（ASGI）前端，路由与 ddddocr_api.py 的 Flask 前端一致，共用 ocr_service 中的模型与对照表。
+
+- 查表命中直接在事件循环中返回，不经过线程池，慢的 OCR 请求不会拖慢查表命中与健康检查；
+- 阻塞的 OCR 推理放到线程池（或多进程工作池）中执行；
+- 每个请求有截止时间（默认 8 秒，小于油猴脚本 10 秒的超时），超时返回 504；
+- 客户端断开连接后立即放弃等待，尚未开始执行的识别任务会被取消。
+
+启动：python ddddocr_api.py --asgi [--workers N] [--deadline 8]
+"""
+import asyncio
+import functools
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.responses import JSONResponse, PlainTextResponse, Response
+from starlette.routing import Route
+
+import ocr_metrics
+import ocr_service
+from ocr_pool import OcrPoolSaturated, OcrWorkerPool
+
+# 单次识别的默认截止时间（秒）
+DEFAULT_DEADLINE = 8.0
+# 检查客户端是否已断开连接的间隔（秒）
+DISCONNECT_POLL = 0.1
+
+_deadline = DEFAULT_DEADLINE
+_executor = None
+
+
+class RequestAborted(Exception):
+    """识别超时或客户端已断开，status 为应返回的 HTTP 状态码。"""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def configure(deadline=DEFAULT_DEADLINE, threads=4):
+    """设置截止时间与 OCR 线程池大小，需在服务启动前调用。"""
+    global _deadline, _executor
+    _deadline = deadline
+    _executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="ocr")
+
+
+def _finish_ocr(image_bytes, result, future):
+    """工作进程识别完成：与 ocr_service.classify 一样计入统计与失败数，结果经 solver.remember 过滤后交给 result。"""
+    if future.cancelled():
+        result.cancel()
+        return
+    error = future.exception()
+    if error is not None:
+        ocr_metrics.INFERENCE_ERRORS.inc(type(error).__name__)
+        if not result.cancelled():
+            result.set_exception(error)
+        return
+    ocr_service.record("ocr")
+    label = ocr_service.solver.remember(image_bytes, future.result())
+    if not result.cancelled():
+        result.set_result(label)
+
+
+def _submit(func, *args):
+    """提交阻塞任务，返回 concurrent.futures.Future。工作池模式下 OCR 直接交给工作进程。"""
+    if func is ocr_service.classify and isinstance(ocr_service.ocr, OcrWorkerPool):
+        future = ocr_service.ocr.submit(*args)
+        # 返回的 future 取消时一并取消尚未开始的识别任务
+        result = Future()
+        result.add_done_callback(lambda f: f.cancelled() and future.cancel())
+        future.add_done_callback(functools.partial(_finish_ocr, args[0], result))
+        return result
+    if _executor is None:
+        configure()
+    return _executor.submit(func, *args)
+
+
+async def _wait_disconnect(request):
+    while not await request.is_disconnected():
+        await asyncio.sleep(DISCONNECT_POLL)
+
+
+async def _run_blocking(request, func, *args):
+    """在线程池/工作池中执行阻塞任务，受截止时间与客户端断开约束。"""
+    cf_future = _submit(func, *args)
+    future = asyncio.wrap_future(cf_future)
+    watcher = asyncio.create_task(_wait_disconnect(request))
+    try:
+        done, _ = await asyncio.wait({future, watcher}, timeout=_deadline,
+                                     return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        watcher.cancel()
+    if future in done:
+        return future.result()
+    # 尚未开始执行的任务可以直接取消；已在执行的任务无法中断，结果被丢弃
+    cf_future.cancel()
+    if watcher in done:
+        raise RequestAborted(499, "客户端已断开连接")
+    raise RequestAborted(504, f"识别超时（超过 {_deadline:g} 秒）")
+
+
+async def _recognize(request, image_bytes):
+    result = ocr_service.lookup(image_bytes)
+    if result is not None:
+        return result, "hit"
+    return await _run_blocking(request, ocr_service.classify, image_bytes), "ocr"
+
+
+def _error(status, message):
+    return JSONResponse({"error": message}, status_code=status)
+
+
+async def predict(request):
+    """识别上传图片文件的API端点"""
+    if ocr_service.ocr is None:
+        return _error(503, "OCR模型尚未加载")
+    try:
+        form = await request.form()
+        file = form.get("image")
+        if file is None or isinstance(file, str):
+            return _error(400, "未提供图片文件")
+        if not file.filename:
+            return _error(400, "未选择文件")
+        result, source = await _recognize(request, await file.read())
+        return JSONResponse({"result": result, "source": source})
+    except OcrPoolSaturated as e:
+        return _error(503, str(e))
+    except RequestAborted as e:
+        return _error(e.status, str(e))
+    except Exception as e:
+        return _error(500, str(e))
+
+
+async def predict_base64(request):
+    """识别Base64编码的验证码图片的API端点"""
+    if ocr_service.ocr is None:
+        return _error(503, "OCR模型尚未加载")
+    try:
+        try:
+            data = await request.json()
+        except ValueError:
+            data = None
+        if not isinstance(data, dict):
+            return _error(400, "请求数据格式错误，请确保发送的是有效的JSON")
+        img_b64 = data.get("img_b64")
+        if not img_b64:
+            return _error(400, "JSON中未找到img_b64字段或其值为空")
+        result, source = await _recognize(request, ocr_service.decode_base64(img_b64))
+        return JSONResponse({"result": result, "source": source})
+    except OcrPoolSaturated as e:
+        return _error(503, str(e))
+    except RequestAborted as e:
+        return _error(e.status, str(e))
+    except Exception as e:
+        return _error(500, f"识别过程中发生错误: {str(e)}")
+
+
+async def predict_raw(request):
+    """低开销识别端点：请求体为图片原始字节，响应体为纯文本识别结果。"""
+    if ocr_service.ocr is None:
+        return PlainTextResponse("OCR模型尚未加载", status_code=503)
+    image_bytes = await request.body()
+    if not image_bytes:
+        return PlainTextResponse("未提供图片数据", status_code=400)
+    try:
+        result, source = await _recognize(request, image_bytes)
+    except OcrPoolSaturated as e:
+        return PlainTextResponse(str(e), status_code=503)
+    except RequestAborted as e:
+        return PlainTextResponse(str(e), status_code=e.status)
+    except Exception as e:
+        return PlainTextResponse(f"识别过程中发生错误: {str(e)}", status_code=500)
+    return Response(result, media_type="text/plain", headers={"X-OCR-Source": source})
+
+
+async def predict_batch(request):
+    """批量识别（多张图片合并到一个请求的便捷封装，服务端仍逐张识别），请求格式与 Flask 前端相同。"""
+    if ocr_service.ocr is None:
+        return _error(503, "OCR模型尚未加载")
+    try:
+        if request.headers.get("content-type", "").startswith("multipart/form-data"):
+            form = await request.form()
+            images = [await f.read() for _, f in form.multi_items() if not isinstance(f, str)]
+        else:
+            try:
+                data = await request.json()
+            except ValueError:
+                data = None
+            if not isinstance(data, dict) or not isinstance(data.get("images"), list):
+                return _error(400, "请求数据格式错误，需要 JSON {\"images\": [...]} 或 multipart 文件上传")
+            images = []
+            for i, img_b64 in enumerate(data["images"]):
+                if not isinstance(img_b64, str) or not img_b64:
+                    return _error(400, f"第 {i} 张图片的 Base64 数据为空或格式错误")
+                images.append(ocr_service.decode_base64(img_b64))
+
+        if not images:
+            return _error(400, "未提供图片")
+        if len(images) > ocr_service.MAX_BATCH_SIZE:
+            return _error(400, f"单次最多识别 {ocr_service.MAX_BATCH_SIZE} 张图片")
+
+        results = await _run_blocking(request, ocr_service.recognize_batch, images)
+        hits = sum(1 for r in results if r["source"] == "hit")
+        return JSONResponse({"results": results, "count": len(results), "hit": hits, "ocr": len(results) - hits})
+    except OcrPoolSaturated as e:
+        return _error(503, str(e))
+    except RequestAborted as e:
+        return _error(e.status, str(e))
+    except Exception as e:
+        return _error(500, f"识别过程中发生错误: {str(e)}")
+
+
+async def metrics(request):
+    """Prometheus 指标端点（文本暴露格式）"""
+    return Response(ocr_metrics.render(), headers={"Content-Type": ocr_metrics.CONTENT_TYPE})
+
+
+class MetricsMiddleware:
+    """记录各路由的请求数、在途数与总耗时（纯 ASGI 中间件，从 http.response.start 中取状态码）。"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] not in ROUTE_PATHS:
+            await self.app(scope, receive, send)
+            return
+        route = scope["path"]
+        started_at = ocr_metrics.request_started(route)
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            ocr_metrics.request_finished(route, status, started_at)
+
+
+async def health(request):
+    """健康检查端点"""
+    return JSONResponse(ocr_service.health_info())
+
+
+ROUTES = [
+    Route("/predict", predict, methods=["POST"]),
+    Route("/predict_base64", predict_base64, methods=["POST"]),
+    Route("/predict_raw", predict_raw, methods=["POST"]),
+    Route("/predict_batch", predict_batch, methods=["POST"]),
+    Route("/health", health, methods=["GET"]),
+    Route("/metrics", metrics, methods=["GET"]),
+]
+ROUTE_PATHS = {r.path for r in ROUTES}
+
+app = Starlette(
+    routes=ROUTES,
+    middleware=[
+        Middleware(MetricsMiddleware),
+        Middleware(CORSMiddleware, allow_origins=["*"], allow_methods=["*"], allow_headers=["*"],
+                   expose_headers=["X-OCR-Source"]),
+    ],
+)
@@ -0,0 +1,25 @@
+"""
+多张图片的识别封装（/predict_batch 使用）。
+
+ddddocr 只提供单张识别接口，内置默认模型的 batch 维也固定为 1，无法合并成一次推理；
+这里只是逐张调用 classification()，单张失败不影响其余图片，单张推理开销与逐个请求相同。
+传入 OcrWorkerPool 时由其 classify_many() 把图片并行分发给各工作进程。
+"""
+
+
+def _classify_one(ocr, img_bytes):
+    try:
+        return ocr.classification(img_bytes), None
+    except Exception as e:
+        return "", str(e)
+
+
+def classify_batch(ocr, images):
+    """
+    批量识别，按输入顺序返回 [(label, error), ...]，error 为 None 表示识别成功。
+    单张图片失败不影响其余图片。
+    """
+    if hasattr(ocr, "classify_many"):
+        # 多进程工作池：把各张图片同时分发给空闲的工作进程
+        return ocr.classify_many(images)
+    return [_classify_one(ocr, img) for img in images]
@@ -0,0 +1,212 @@
+"""
+带置信度的 OCR 识别：逐字符概率、整串置信度与 top-k 候选。
+
+ddddocr 的 classification() 只返回一个字符串，抢课循环只能把每个结果都提交给 yySave.do，
+猜错一次就白白浪费一个请求往返和一次「验证码错误」惩罚。这里直接取模型输出的 CTC 概率矩阵做贪心解码：
+    - 每个字符的概率取该字符所占各帧中的最大 softmax 概率；
+    - 整串置信度为各字符概率之积（近似贪心路径整体正确的概率）；
+    - 每个位置保留 top-k 候选字符，组合出概率最高的 k 个候选串。
+低于阈值的结果由 CaptchaSolver 丢弃，调用方直接重新获取验证码，不消耗抢课请求（默认阈值为 0，不丢弃）。
+
+阈值可根据实际提交结果调整：ConfidenceLog 把每次提交的 (置信度, 是否正确) 追加到
+captcha_confidence.csv，tools/tune_confidence.py 据此给出建议阈值并写入 captcha_threshold.txt。
+"""
+import heapq
+import math
+import os
+import threading
+from collections import namedtuple
+
+CONFIDENCE_LOG = "captcha_confidence.csv"
+THRESHOLD_PATH = "captcha_threshold.txt"
+# 没有阈值文件（尚未用 tools/tune_confidence.py 根据提交结果调整）时不丢弃任何结果，
+# 每个结果都会提交并记入置信度日志，供之后调整阈值
+DEFAULT_MIN_CONFIDENCE = 0.0
+TOP_K = 3
+
+# text 识别结果；confidence 整串置信度（无法取得概率时为 None）；
+# char_probs 各字符概率；alternatives 为 [(text, 概率), ...]，按概率降序，第一项即 text
+OcrResult = namedtuple("OcrResult", "text confidence char_probs alternatives")
+
+
+def _engine(ocr):
+    """返回 ddddocr 1.6+ 的 OCR 引擎，内部结构不同时返回 None。"""
+    engine = getattr(ocr, "ocr_engine", None)
+    if getattr(engine, "session", None) is None or not hasattr(engine, "_preprocess_image"):
+        return None
+    return engine
+
+
+def _softmax(logits):
+    import numpy as np
+
+    e = np.exp(logits - logits.max(axis=-1, keepdims=True))
+    return e / e.sum(axis=-1, keepdims=True)
+
+
+def _probabilities(ocr, img_bytes):
+    """
+    返回 (概率矩阵 (帧数, 类别数), 字符表, 有效类别下标集合或 None)。
+    ocr 不支持输出概率（如 OcrWorkerPool）时返回 None。
+    """
+    import numpy as np
+
+    engine = _engine(ocr)
+    if engine is not None:
+        try:
+            return _model_probabilities(engine, img_bytes)
+        except (AttributeError, ImportError):
+            # ddddocr 内部结构变化，退回公开的 probability=True 接口
+            pass
+
+    try:
+        info = ocr.classification(img_bytes, probability=True)
+    except TypeError:
+        return None
+    if not isinstance(info, dict) or "probabilities" not in info:
+        return None
+    probs = _squeeze(np.asarray(info["probabilities"], dtype=np.float32))
+    return probs, info["charset"], None
+
+
+def _model_probabilities(engine, img_bytes):
+    """
+    直接跑模型取 logits，避免 probability=True 把整个概率矩阵转成 Python 列表。
+    依赖 ddddocr 1.6 的内部接口，结构不同时抛出 AttributeError / ImportError。
+    """
+    from ddddocr.utils.image_io import load_image_from_input
+
+    arr = engine._preprocess_image(load_image_from_input(img_bytes), False)
+    out = engine.session.run(None, {engine.session.get_inputs()[0].name: arr})[0]
+    charset_manager = engine.charset_manager
+    charset_manager._update_valid_indices()
+    valid = charset_manager.get_valid_indices()
+    return _softmax(_squeeze(out)), charset_manager.get_charset(), set(valid) if valid else None
+
+
+def _squeeze(out):
+    """把模型输出 (seq, 1, classes) 或 (1, seq, classes) 压成 (seq, classes)。"""
+    if out.ndim == 3:
+        return out[:, 0, :] if out.shape[1] == 1 else out[0]
+    return out
+
+
+def ctc_decode(probs, charset, valid=None, top_k=TOP_K):
+    """对 (帧数, 类别数) 的概率矩阵做 CTC 贪心解码，返回 OcrResult。下标 0 为 blank。"""
+    import numpy as np
+
+    if valid:
+        # 字符集范围限制：屏蔽范围外的类别（保留 blank）
+        mask = np.zeros(probs.shape[-1], dtype=bool)
+        mask[list(valid)] = True
+        mask[0] = True
+        probs = np.where(mask, probs, 0.0)
+
+    best = probs.argmax(axis=-1)
+    segments = []  # [(类别下标, [帧...])]
+    prev = None
+    for t, idx in enumerate(best.tolist()):
+        if idx != 0:
+            if idx == prev:
+                segments[-1][1].append(t)
+            else:
+                segments.append((idx, [t]))
+        prev = idx
+
+    candidates = []  # 每个位置的 [(字符, 概率), ...]，降序
+    for idx, frames in segments:
+        peak = frames[int(np.argmax(probs[frames, idx]))]
+        row = probs[peak]
+        n = min(top_k + 1, row.shape[0])
+        top = np.argpartition(row, -n)[-n:]
+        order = [int(i) for i in top[np.argsort(row[top])[::-1]] if i != 0 and i < len(charset)]
+        if idx in order:
+            order.remove(idx)
+        order = [idx] + order[:top_k - 1]
+        candidates.append([(charset[i], float(row[i])) for i in order])
+
+    char_probs = [c[0][1] for c in candidates]
+    text = "".join(c[0][0] for c in candidates)
+    confidence = math.prod(char_probs) if candidates else 0.0
+    return OcrResult(text, confidence, char_probs, _k_best(candidates, top_k) or [(text, confidence)])
+
+
+def _k_best(candidates, k):
+    """各位置相互独立时，按概率之积取前 k 个组合。"""
+    if not candidates:
+        return []
+
+    def score(choice):
+        return math.prod(candidates[i][j][1] for i, j in enumerate(choice))
+
+    start = (0,) * len(candidates)
+    heap = [(-score(start), start)]
+    seen = {start}
+    results = []
+    while heap and len(results) < k:
+        neg, choice = heapq.heappop(heap)
+        results.append(("".join(candidates[i][j][0] for i, j in enumerate(choice)), -neg))
+        for i, j in enumerate(choice):
+            if j + 1 < len(candidates[i]):
+                nxt = choice[:i] + (j + 1,) + choice[i + 1:]
+                if nxt not in seen:
+                    seen.add(nxt)
+                    heapq.heappush(heap, (-score(nxt), nxt))
+    return results
+
+
+def recognize(ocr, img_bytes, top_k=TOP_K):
+    """识别一张验证码，返回 OcrResult；ocr 不支持输出概率时置信度为 None。"""
+    probs = _probabilities(ocr, img_bytes)
+    if probs is None:
+        return OcrResult(ocr.classification(img_bytes), None, [], [])
+    return ctc_decode(*probs, top_k=top_k)
+
+
+def load_threshold(path=THRESHOLD_PATH, default=DEFAULT_MIN_CONFIDENCE):
+    """读取阈值文件（单个 0~1 的小数），不存在或格式错误时返回默认值。"""
+    try:
+        with open(path, encoding="utf-8") as f:
+            value = float(f.read().strip())
+    except (OSError, ValueError):
+        return default
+    return min(max(value, 0.0), 1.0)
+
+
+class ConfidenceLog:
+    """
+    把每次提交的 (OCR 置信度, 服务器是否接受) 追加写入 CSV，供 tools/tune_confidence.py 调整阈值。
+    因低于阈值被丢弃、没有提交的结果 correct 为 None，记为 `confidence,-`。
+    """
+
+    def __init__(self, path=CONFIDENCE_LOG):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def append(self, confidence, correct):
+        mark = "-" if correct is None else 1 if correct else 0
+        data = f"{confidence:.6f},{mark}\n".encode("utf-8")
+        with self._lock:
+            try:
+                fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+                try:
+                    os.write(fd, data)
+                finally:
+                    os.close(fd)
+            except OSError:
+                pass
+
+
+def read_log(path=CONFIDENCE_LOG):
+    """读取置信度日志，返回 [(confidence, correct), ...]，被丢弃未提交的结果 correct 为 None。"""
+    samples = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            parts = line.strip().split(",")
+            if len(parts) != 2:
+                continue
+            try:
+                samples.append((float(parts[0]), None if parts[1] == "-" else parts[1] == "1"))
+            except ValueError:
+                continue
+    return samples
@@ -0,0 +1,87 @@
+"""
+OCR 模型后台预热：程序启动时即在后台线程加载模型与对照表，与登录、获取讲座列表并行进行。
+
+加载 onnxruntime 模型和解析对照表 CSV 需要数秒，首次推理还要额外付出图优化的开销；
+放到后台后，第一次识别验证码时只有模型确实尚未就绪才需要等待。
+
+使用方法：
+    loader = BackgroundLoader(build_solver).start()
+    ...
+    solver = loader.get()  # 已就绪时立即返回，否则阻塞到加载完成
+"""
+import threading
+import time
+from io import BytesIO
+
+
+def dummy_inference(ocr):
+    """用一张空白图片空跑一次识别，让 onnxruntime 提前完成图优化与内存分配。"""
+    from PIL import Image
+
+    with BytesIO() as out:
+        Image.new("RGB", (90, 34), (255, 255, 255)).save(out, format="JPEG")
+        try:
+            ocr.classification(out.getvalue())
+        except Exception:
+            # 只关心预热本身，空白图片的识别结果与异常都无所谓
+            pass
+
+
+def load_ocr():
+    """加载 ddddocr 内置模型并完成一次空跑。ddddocr 在这里才导入，避免拖慢程序启动。"""
+    import ddddocr
+
+    # 自定义模型 model.onnx 已与当前验证码格式不兼容，改用默认内置模型
+    ocr = ddddocr.DdddOcr(show_ad=False)
+    dummy_inference(ocr)
+    return ocr
+
+
+class BackgroundLoader:
+    """在后台线程执行一次 factory()，get() 返回其结果（加载失败时重新抛出异常）。"""
+
+    def __init__(self, factory, name="ocr-loader"):
+        self._factory = factory
+        self._name = name
+        self._done = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._value = None
+        self._error = None
+        # 加载耗时（秒），完成后才有值
+        self.elapsed = None
+
+    def start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name=self._name, daemon=True)
+                self._thread.start()
+        return self
+
+    def _run(self):
+        start = time.perf_counter()
+        try:
+            self._value = self._factory()
+        except Exception as e:
+            self._error = e
+        finally:
+            self.elapsed = time.perf_counter() - start
+            self._done.set()
+
+    @property
+    def ready(self):
+        return self._done.is_set()
+
+    @property
+    def value(self):
+        """已加载完成时返回结果，否则（或加载失败时）返回 None，不阻塞。"""
+        return self._value if self._done.is_set() else None
+
+    def get(self, timeout=None):
+        """等待加载完成并返回结果；尚未启动时先启动。超时抛出 TimeoutError。"""
+        self.start()
+        if not self._done.wait(timeout):
+            raise TimeoutError("OCR 模型加载超时")
+        if self._error is not None:
+            raise self._error
+        return self._value
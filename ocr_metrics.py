@@ -0,0 +1,198 @@
+"""
+OCR 服务的 Prometheus 指标（文本暴露格式），不依赖 prometheus_client。
+
+指标：
+    ocr_requests_total{route,status}      各路由请求数
+    ocr_inflight_requests{route}          正在处理的请求数
+    ocr_stage_seconds{stage}              分阶段耗时直方图：decode / lookup / queue / inference / total
+    ocr_errors_total{type}                按类型统计的请求错误数（由 HTTP 状态码归类）
+    ocr_inference_errors_total{type}      OCR 推理抛出的异常数（按异常类名）
+    ocr_hash_lookups_total{result}        查表次数（hit / miss）
+    ocr_hash_hit_ratio                    查表命中率
+    ocr_memo_entries / ocr_memo_hit_ratio 备忘缓存条目数与命中率（由 ocr_service 注册）
+"""
+import threading
+import time
+from contextlib import contextmanager
+
+# 直方图桶上限（秒），覆盖查表的亚毫秒级到 OCR 排队的数秒级
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# HTTP 状态码对应的错误类型
+STATUS_ERROR_TYPES = {
+    400: "bad_request",
+    499: "client_disconnected",
+    500: "internal",
+    503: "unavailable",
+    504: "deadline_exceeded",
+}
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=""):
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    type_name = "untyped"
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for labels, value in items:
+            lines.append(f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}")
+        return lines
+
+
+class Counter(_Metric):
+    type_name = "counter"
+
+    def inc(self, *labelvalues, amount=1):
+        with self._lock:
+            self._values[labelvalues] = self._values.get(labelvalues, 0) + amount
+
+
+class Gauge(_Metric):
+    type_name = "gauge"
+
+    def __init__(self, name, documentation, labelnames=(), func=None):
+        super().__init__(name, documentation, labelnames)
+        # func 不为空时，渲染时调用 func() 取值（仅用于无标签的指标）
+        self._func = func
+
+    def set(self, value, *labelvalues):
+        with self._lock:
+            self._values[labelvalues] = value
+
+    def inc(self, *labelvalues, amount=1):
+        with self._lock:
+            self._values[labelvalues] = self._values.get(labelvalues, 0) + amount
+
+    def dec(self, *labelvalues, amount=1):
+        self.inc(*labelvalues, amount=-amount)
+
+    def render(self):
+        if self._func is not None:
+            self.set(self._func())
+        return super().render()
+
+
+class Histogram(_Metric):
+    type_name = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+
+    def observe(self, value, *labelvalues):
+        with self._lock:
+            state = self._values.get(labelvalues)
+            if state is None:
+                # [各桶计数..., 总和, 总数]
+                state = self._values[labelvalues] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[i] += 1
+                    break
+            state[-2] += value
+            state[-1] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+        with self._lock:
+            items = sorted((k, list(v)) for k, v in self._values.items())
+        for labels, state in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets, state):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative}")
+            label_str = _format_labels(self.labelnames, labels)
+            lines.append(f"{self.name}_sum{label_str} {_format_value(state[-2])}")
+            lines.append(f"{self.name}_count{label_str} {state[-1]}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+REQUESTS = REGISTRY.register(Counter("ocr_requests_total", "OCR 服务收到的请求数", ("route", "status")))
+INFLIGHT = REGISTRY.register(Gauge("ocr_inflight_requests", "正在处理的请求数", ("route",)))
+STAGE_SECONDS = REGISTRY.register(Histogram("ocr_stage_seconds", "各处理阶段耗时（秒）", ("stage",)))
+ERRORS = REGISTRY.register(Counter("ocr_errors_total", "按类型统计的请求错误数", ("type",)))
+INFERENCE_ERRORS = REGISTRY.register(Counter("ocr_inference_errors_total", "OCR 推理抛出的异常数（按异常类名）", ("type",)))
+LOOKUPS = REGISTRY.register(Counter("ocr_hash_lookups_total", "验证码对照表查询次数", ("result",)))
+
+
+def _hit_ratio():
+    hit = LOOKUPS._values.get(("hit",), 0)
+    total = hit + LOOKUPS._values.get(("miss",), 0)
+    return hit / total if total else 0.0
+
+
+HIT_RATIO = REGISTRY.register(Gauge("ocr_hash_hit_ratio", "验证码对照表查询命中率", func=_hit_ratio))
+
+
+@contextmanager
+def time_stage(stage):
+    """统计一个处理阶段的耗时。"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_SECONDS.observe(time.perf_counter() - start, stage)
+
+
+def request_started(route):
+    INFLIGHT.inc(route)
+    return time.perf_counter()
+
+
+def request_finished(route, status, started_at):
+    """记录一次请求结束：请求计数、在途数、总耗时，以及非 2xx 状态对应的错误类型。"""
+    INFLIGHT.dec(route)
+    REQUESTS.inc(route, str(status))
+    if route.startswith("/predict"):
+        # 总耗时只统计识别请求，不含 /health、/metrics
+        STAGE_SECONDS.observe(time.perf_counter() - started_at, "total")
+    if status >= 400:
+        ERRORS.inc(STATUS_ERROR_TYPES.get(status, f"http_{status}"))
+
+
+def render():
+    return REGISTRY.render()
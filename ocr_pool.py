@@ -0,0 +1,202 @@
+"""
+OCR 多进程工作池：每个工作进程各自预加载一份 ddddocr 模型，互不争抢 GIL。
+
+ProcessPoolExecutor 的任务队列由所有工作进程共享，空闲的进程会立即取走下一个请求。
+池前面有一个有界的名额计数：同时在途（正在识别 + 排队）的请求超过 workers + queue_size 时，
+submit 直接抛出 OcrPoolSaturated，由 HTTP 层返回 503，而不是让请求无限排队。
+
+OcrWorkerPool 提供与 DdddOcr 相同的 classification() 接口，可直接作为 CaptchaSolver 的 ocr 使用。
+工作进程意外退出（如被 OOM 杀掉）会使整个 ProcessPoolExecutor 失效，此时重建一个新的执行器。
+"""
+import threading
+import time
+from concurrent.futures import Future, InvalidStateError, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+# 等待单次识别结果的最长秒数
+OCR_TIMEOUT = 10
+
+_worker_ocr = None
+
+
+class OcrPoolSaturated(RuntimeError):
+    """在途请求已达上限。"""
+
+
+def set_intra_op_threads(ocr, threads):
+    """
+    用指定的 intra-op 线程数重建 ddddocr 内部的 onnxruntime 会话，成功返回 True。
+    兼容 ddddocr 1.6+（ocr_engine.session）与 1.5.x（_DdddOcr__ort_session）两种内部结构。
+    """
+    import onnxruntime
+
+    engine = getattr(ocr, "ocr_engine", None)
+    if engine is not None and getattr(engine, "session", None) is not None:
+        owner, attr = engine, "session"
+    elif getattr(ocr, "_DdddOcr__ort_session", None) is not None:
+        owner, attr = ocr, "_DdddOcr__ort_session"
+    else:
+        return False
+    session = getattr(owner, attr)
+    model = getattr(session, "_model_path", None) or getattr(session, "_model_bytes", None)
+    model = model or getattr(ocr, "_DdddOcr__graph_path", None)
+    if not model:
+        return False
+
+    options = onnxruntime.SessionOptions()
+    options.intra_op_num_threads = threads
+    options.inter_op_num_threads = 1
+    setattr(owner, attr, onnxruntime.InferenceSession(
+        model, sess_options=options, providers=session.get_providers()
+    ))
+    return True
+
+
+def _init_worker(intra_threads):
+    """工作进程初始化：加载模型并做一次空跑，使首个真实请求不必等待模型初始化。"""
+    global _worker_ocr
+    import ddddocr
+    from ocr_loader import dummy_inference
+
+    _worker_ocr = ddddocr.DdddOcr(show_ad=False)
+    if intra_threads:
+        set_intra_op_threads(_worker_ocr, intra_threads)
+    dummy_inference(_worker_ocr)
+
+
+def _classify(img_bytes):
+    """在工作进程中识别，返回 (label, 推理耗时秒数)，供主进程区分排队与推理时间。"""
+    start = time.perf_counter()
+    label = _worker_ocr.classification(img_bytes)
+    return label, time.perf_counter() - start
+
+
+class OcrWorkerPool:
+    def __init__(self, workers=2, intra_threads=1, queue_size=16, timeout=OCR_TIMEOUT):
+        self.workers = max(1, int(workers))
+        self.intra_threads = intra_threads
+        self.queue_size = max(0, int(queue_size))
+        self.timeout = timeout
+        self.rejected = 0
+        self.rebuilds = 0
+        # 可选回调 on_timing(queue_seconds, inference_seconds)，每次识别成功后调用
+        self.on_timing = None
+        self._slots = threading.BoundedSemaphore(self.workers + self.queue_size)
+        self._lock = threading.Lock()  # 保护 rejected / rebuilds / _executor 的替换
+        self._executor = self._new_executor()
+
+    def _new_executor(self):
+        return ProcessPoolExecutor(
+            max_workers=self.workers, initializer=_init_worker, initargs=(self.intra_threads,)
+        )
+
+    def _rebuild(self, broken):
+        """broken 仍是当前执行器时换成新的执行器（多个失败的任务同时回调时只重建一次）。"""
+        with self._lock:
+            if self._executor is not broken:
+                return
+            self._executor = self._new_executor()
+            self.rebuilds += 1
+        broken.shutdown(wait=False, cancel_futures=True)
+
+    def warmup(self):
+        """阻塞直到所有工作进程完成模型加载。"""
+        futures = [self._executor.submit(_classify, b"") for _ in range(self.workers)]
+        for f in futures:
+            try:
+                f.result()
+            except Exception:
+                # 空图片识别会失败，这里只关心进程已完成初始化
+                pass
+
+    def submit(self, img_bytes):
+        """
+        提交一张图片，返回结果为识别文本的 Future；在途请求已满时抛出 OcrPoolSaturated。
+        取消返回的 Future 会一并取消尚未开始执行的任务。
+        """
+        if not self._slots.acquire(blocking=False):
+            self._reject()
+        return self._submit(img_bytes)
+
+    def _reject(self):
+        with self._lock:
+            self.rejected += 1
+        raise OcrPoolSaturated("OCR服务繁忙，请稍后重试")
+
+    def _submit(self, img_bytes):
+        """调用方已占用一个名额，提交任务并在完成时归还。"""
+        submitted_at = time.perf_counter()
+        executor = self._executor
+        try:
+            try:
+                inner = executor.submit(_classify, img_bytes)
+            except BrokenProcessPool:
+                # 执行器已失效：重建后重试一次
+                self._rebuild(executor)
+                executor = self._executor
+                inner = executor.submit(_classify, img_bytes)
+        except Exception:
+            self._slots.release()
+            raise
+        outer = Future()
+
+        def _done(f):
+            self._slots.release()
+            if f.cancelled():
+                outer.cancel()
+                return
+            try:
+                if f.exception() is not None:
+                    if isinstance(f.exception(), BrokenProcessPool):
+                        # 工作进程意外退出，本次请求失败，之后的请求交给新的执行器
+                        self._rebuild(executor)
+                    outer.set_exception(f.exception())
+                    return
+                label, infer_seconds = f.result()
+                outer.set_result(label)
+            except InvalidStateError:
+                # 调用方已取消
+                return
+            if self.on_timing is not None:
+                self.on_timing(max(0.0, time.perf_counter() - submitted_at - infer_seconds), infer_seconds)
+
+        inner.add_done_callback(_done)
+        outer.add_done_callback(lambda f: f.cancelled() and inner.cancel())
+        return outer
+
+    def classification(self, img_bytes):
+        return self.submit(img_bytes).result(self.timeout)
+
+    def classify_many(self, images):
+        """
+        并行识别多张图片，按输入顺序返回 [(label, error), ...]。
+        整批只在入口处做一次快速拒绝（此时没有空闲名额则抛出 OcrPoolSaturated）；被接纳后其余图片
+        阻塞等待名额，批量大于 workers + queue_size 也能全部识别，不会与自身争抢名额而被拒绝。
+        """
+        if not images:
+            return []
+        if not self._slots.acquire(blocking=False):
+            self._reject()
+        futures = []
+        for i, img in enumerate(images):
+            # 第一张使用入口处占到的名额；后面的等已提交的图片识别完、归还名额
+            if i and not self._slots.acquire(timeout=self.timeout):
+                futures.append(OcrPoolSaturated("OCR服务繁忙，等待识别名额超时"))
+                continue
+            try:
+                futures.append(self._submit(img))
+            except Exception as e:
+                futures.append(e)
+        results = []
+        for f in futures:
+            if isinstance(f, Exception):
+                results.append(("", str(f)))
+                continue
+            try:
+                results.append((f.result(self.timeout), None))
+            except Exception as e:
+                results.append(("", str(e)))
+        return results
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
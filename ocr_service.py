@@ -0,0 +1,165 @@
+"""
+OCR 服务核心：模型/工作池、验证码对照表、识别流水线与统计，供 Flask（ddddocr_api.py）
+与 ASGI（ocr_asgi.py）两种前端共用。
+
+识别分为两步，前端可以分别调度：
+    lookup()   只查备忘缓存与哈希表/感知哈希索引，耗时微秒级，可在事件循环中直接调用；
+    classify() 调用 OCR 模型，会阻塞，ASGI 前端需放到线程池/工作池中执行。
+OCR 结果写入识别流水线的备忘缓存，同一张图片再次请求时由 lookup() 直接返回。
+"""
+import base64
+import os
+import sys
+import threading
+
+import ddddocr
+
+import ocr_metrics
+from captcha_table import CaptchaHashTable, preferred_table_path
+from captcha_phash import PerceptualIndex
+from captcha_solver import CaptchaSolver
+from ocr_loader import dummy_inference
+from ocr_pool import OcrWorkerPool, set_intra_op_threads
+
+# 单次批量请求最多包含的图片数，避免一个请求长时间占用模型
+MAX_BATCH_SIZE = 64
+
+# 全局 OCR 模型实例（DdddOcr 或 OcrWorkerPool）
+ocr = None
+captcha_hash_table = CaptchaHashTable()
+# 识别流水线：先查备忘缓存与哈希表/感知哈希索引，未命中才调用 OCR
+solver = CaptchaSolver(captcha_hash_table)
+
+# 命中率统计（前端以多线程方式处理请求，计数需加锁）
+_stats_lock = threading.Lock()
+_stats = {"requests": 0, "hit": 0, "ocr": 0}
+
+
+def resource_path(relative_path):
+    if getattr(sys, 'frozen', False):  # 判断是否处于打包环境
+        base_path = getattr(sys, '_MEIPASS', '')  # 临时解压路径
+    else:
+        # 以脚本所在目录为基准，确保无论从哪启动都能找到资源
+        base_path = os.path.dirname(os.path.abspath(__file__))
+    return str(os.path.join(base_path, relative_path))
+
+
+def init_service(workers=0, threads=0, queue_size=16):
+    """加载 OCR 模型（或启动工作池）与验证码对照表。模型加载失败时服务仍可运行，仅查表可用。"""
+    global ocr, captcha_hash_table, solver
+    try:
+        if workers > 0:
+            print(f"正在启动 {workers} 个 OCR 工作进程...")
+            ocr = OcrWorkerPool(workers, intra_threads=threads, queue_size=queue_size)
+            ocr.on_timing = _observe_pool_timing
+            ocr.warmup()
+        else:
+            ocr = ddddocr.DdddOcr(show_ad=False)
+            if threads:
+                set_intra_op_threads(ocr, threads)
+            # 空跑一次，首个真实请求不必承担图优化开销
+            dummy_inference(ocr)
+    except Exception as e:
+        print(f"FATAL ERROR: Failed to initialize ddddocr model: {e}")
+        # 即使模型加载失败，服务也继续运行以提供健康检查和调试
+
+    captcha_hash_table = CaptchaHashTable(preferred_table_path(resource_path("captcha_hash_table.csv")))
+    solver = CaptchaSolver(
+        captcha_hash_table, PerceptualIndex(resource_path("captcha_phash_table.csv")), ocr
+    )
+
+
+def _memo_stat(key):
+    return lambda: solver.memo.stats()[key]
+
+
+ocr_metrics.REGISTRY.register(ocr_metrics.Gauge("ocr_memo_entries", "备忘缓存中的条目数", func=_memo_stat("size")))
+ocr_metrics.REGISTRY.register(ocr_metrics.Gauge("ocr_memo_hit_ratio", "备忘缓存命中率", func=_memo_stat("hit_rate")))
+
+
+def _observe_pool_timing(queue_seconds, inference_seconds):
+    ocr_metrics.STAGE_SECONDS.observe(queue_seconds, "queue")
+    ocr_metrics.STAGE_SECONDS.observe(inference_seconds, "inference")
+
+
+def decode_base64(img_b64):
+    """解码 Base64 图片，兼容带 data:image/...;base64, 前缀的写法。"""
+    with ocr_metrics.time_stage("decode"):
+        return base64.b64decode(img_b64.split(",")[-1])
+
+
+def record(source, n=1):
+    with _stats_lock:
+        _stats["requests"] += n
+        _stats[source] += n
+
+
+def lookup(image_bytes):
+    """只查表，命中返回识别结果并计入统计，未命中返回 None。"""
+    with ocr_metrics.time_stage("lookup"):
+        hit = solver.lookup(image_bytes)
+    if hit is None:
+        ocr_metrics.LOOKUPS.inc("miss")
+        return None
+    ocr_metrics.LOOKUPS.inc("hit")
+    record("hit")
+    return hit[0]
+
+
+def classify(image_bytes):
+    """调用 OCR 模型识别（阻塞），并计入统计。工作池模式下排队与推理耗时由工作池回调分别记录。"""
+    try:
+        if isinstance(ocr, OcrWorkerPool):
+            result = ocr.classification(image_bytes)
+        else:
+            with ocr_metrics.time_stage("inference"):
+                result = ocr.classification(image_bytes)
+    except Exception as e:
+        ocr_metrics.INFERENCE_ERRORS.inc(type(e).__name__)
+        raise
+    record("ocr")
+    return solver.remember(image_bytes, result)
+
+
+def recognize(image_bytes):
+    """识别一张验证码，返回 (result, source)，source 为 "hit"（查表命中）或 "ocr"。"""
+    result = lookup(image_bytes)
+    if result is not None:
+        return result, "hit"
+    return classify(image_bytes), "ocr"
+
+
+def recognize_batch(images):
+    """批量识别，按输入顺序返回 [{"result", "source"[, "error"]}, ...]。"""
+    results = []
+    counts = {"hit": 0, "ocr": 0}
+    for label, source, _, error in solver.solve_batch(images):
+        source = "ocr" if source == "ocr" else "hit"
+        counts[source] += 1
+        item = {"result": label, "source": source}
+        if error:
+            item["error"] = error
+        results.append(item)
+    for source, n in counts.items():
+        if n:
+            record(source, n)
+            ocr_metrics.LOOKUPS.inc("hit" if source == "hit" else "miss", amount=n)
+    return results
+
+
+def health_info():
+    with _stats_lock:
+        stats = dict(_stats)
+    stats["hit_rate"] = round(stats["hit"] / stats["requests"], 4) if stats["requests"] else 0.0
+    body = {
+        "status": "healthy",
+        "model_loaded": ocr is not None,
+        "hash_table_size": len(captcha_hash_table),
+        "stats": stats,
+        "memo": solver.memo.stats(),
+    }
+    if isinstance(ocr, OcrWorkerPool):
+        body["workers"] = ocr.workers
+        body["queue_size"] = ocr.queue_size
+        body["rejected"] = ocr.rejected
+    return body
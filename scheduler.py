@@ -0,0 +1,49 @@
+"""
+高精度定时：倒计时最后阶段的「粗睡眠 → 短睡眠 → 忙等」混合调度。
+
+time.sleep() 的唤醒时刻受系统调度影响，单次可能晚到数毫秒；
+wait_until() 先用长睡眠度过大部分时间，临近截止时改为短睡眠，最后约 1 毫秒忙等，
+返回实际唤醒比截止时刻晚了多少纳秒，用于统计调度抖动。
+"""
+import time
+
+# 距截止不足该纳秒数时改为短睡眠
+SHORT_SLEEP_NS = 20_000_000
+# 距截止不足该纳秒数时改为忙等
+SPIN_NS = 1_500_000
+# 短睡眠阶段每次睡眠的时长（秒）
+SHORT_SLEEP = 0.0005
+
+
+def deadline_from_epoch(ts):
+    """把本地 time.time() 时间戳换算成 time.monotonic_ns() 截止时刻。"""
+    return time.monotonic_ns() + int((ts - time.time()) * 1_000_000_000)
+
+
+def wait_until(deadline_ns, should_stop=None, coarse_slice=0.1):
+    """
+    阻塞直到 time.monotonic_ns() >= deadline_ns。
+
+    Args:
+        deadline_ns: time.monotonic_ns() 时间基准下的截止时刻
+        should_stop: 可选的无参函数，粗睡眠阶段每次醒来时检查，返回 True 则提前放弃等待
+        coarse_slice: 粗睡眠阶段单次睡眠上限（秒），决定 should_stop 的响应速度
+
+    Returns:
+        实际唤醒时刻比截止时刻晚的纳秒数（>= 0）；被 should_stop 中止时返回 None
+    """
+    while True:
+        remaining = deadline_ns - time.monotonic_ns()
+        if remaining <= SHORT_SLEEP_NS:
+            break
+        if should_stop is not None and should_stop():
+            return None
+        time.sleep(min(coarse_slice, (remaining - SHORT_SLEEP_NS) / 1_000_000_000))
+
+    while deadline_ns - time.monotonic_ns() > SPIN_NS:
+        time.sleep(SHORT_SLEEP)
+
+    now = time.monotonic_ns()
+    while now < deadline_ns:
+        now = time.monotonic_ns()
+    return now - deadline_ns
@@ -0,0 +1,134 @@
+"""
+ehall 会话保活与失效检测：后台线程定时用一次轻量请求探测登录状态，只在需要时才重新登录。
+
+原先的做法是在开抢前 RELOGIN_BEFORE_SECONDS 秒无条件重新登录，把一次完整的统一认证往返
+放在了最关键的时刻。SessionKeeper 改为：
+    - 每隔 interval 秒探测一次（同油猴脚本的 keepAliveRequest，探测本身也让服务器端会话保持活跃）；
+    - 按 get_lecture_list 的规则识别登录/门户重定向，确认失效才重新登录；网络异常、服务器繁忙不触发登录；
+    - 记录每个会话确认存活的时长（写入 sessions/lifetimes.json），会话年龄接近历史存活时长的中位数时提前刷新，
+      让刷新发生在倒计时的早期而不是最后几秒。只有刷新后至少一次探测确认有效的会话才记录存活时长，
+      估计值不低于 MIN_LIFETIME_INTERVALS 个探测间隔，过旧的记录不再参与估计；
+    - 开抢前调用 ensure_valid() 做一次同步探测，会话有效则不再重新登录。
+
+新会话通过 session 属性取得，renewals 计数递增；on_renewed 回调在执行刷新的线程中调用。
+"""
+import statistics
+import threading
+import time
+
+from session_store import SESSION_EXPIRED, SESSION_OK, check_session
+
+KEEPALIVE_INTERVAL = 60
+# 会话年龄达到历史最短存活时长的该比例时提前刷新
+REFRESH_FRACTION = 0.8
+# 存活时长估计的下限（探测间隔的倍数），避免个别异常记录导致每次探测都重新登录
+MIN_LIFETIME_INTERVALS = 2
+
+
+class SessionKeeper:
+    def __init__(self, session, relogin, interval=KEEPALIVE_INTERVAL, store=None, on_renewed=None,
+                 check=check_session):
+        """
+        relogin: 无参函数，完整登录并返回新 session，失败返回 None；
+        store:   可选的 SessionStore，用于读写历史存活时长。
+        """
+        self._session = session
+        self._relogin = relogin
+        self.interval = interval
+        self.store = store
+        self.on_renewed = on_renewed
+        self._check = check
+        self.renewals = 0
+        self.failures = 0  # 连续无法判断登录状态的次数
+        self.last_ok = None  # 当前 session 最近一次被探测确认有效的时刻
+        self.last_status = None
+        self._lock = threading.Lock()  # 保证同一时刻只有一次探测/刷新
+        self._stop = threading.Event()
+        self._thread = None
+        self._mark_created(session)
+
+    @property
+    def session(self):
+        return self._session
+
+    @property
+    def lifetime_estimate(self):
+        """近期观测到的存活时长的中位数（秒），不低于 MIN_LIFETIME_INTERVALS 个探测间隔；没有记录时为 None。"""
+        lifetimes = self.store.lifetimes() if self.store is not None else []
+        if not lifetimes:
+            return None
+        return max(statistics.median_low(lifetimes), self.interval * MIN_LIFETIME_INTERVALS)
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="session-keeper", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout=2)
+        self._thread = None
+
+    def age(self):
+        return time.time() - getattr(self._session, "created_at", time.time())
+
+    def ensure_valid(self):
+        """
+        同步探测一次：有效或无法判断时返回当前 session，确认失效则立即重新登录。
+        重新登录失败返回 None。
+        """
+        with self._lock:
+            status = self._probe()
+            if status == SESSION_EXPIRED:
+                return self._renew("expired")
+            return self._session
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            with self._lock:
+                status = self._probe()
+                if status == SESSION_EXPIRED:
+                    self._renew("expired")
+                elif status == SESSION_OK and self._expiring_soon():
+                    self._renew("proactive")
+
+    def _probe(self):
+        status = self._check(self._session)
+        self.last_status = status
+        if status == SESSION_OK:
+            self.last_ok = time.time()
+            self.failures = 0
+        elif status == SESSION_EXPIRED:
+            # 以最后一次探测确认有效的时刻计算存活时长，偏保守；从未确认有效过的会话不记录
+            created_at = getattr(self._session, "created_at", None)
+            if self.store is not None and created_at and self.last_ok:
+                self.store.record_lifetime(self.last_ok - created_at)
+        else:
+            self.failures += 1
+        return status
+
+    def _expiring_soon(self):
+        lifetime = self.lifetime_estimate
+        # 下一次探测前可能就过期的也提前刷新
+        return lifetime is not None and self.age() + self.interval >= lifetime * REFRESH_FRACTION
+
+    def _renew(self, reason):
+        session = self._relogin()
+        if session is None:
+            return None
+        self._mark_created(session)
+        self._session = session
+        self.renewals += 1
+        # 新 session 尚未被探测确认过，存活时长从下一次成功探测开始计算
+        self.last_ok = None
+        if self.on_renewed is not None:
+            self.on_renewed(session, reason)
+        return session
+
+    @staticmethod
+    def _mark_created(session):
+        if session is not None and getattr(session, "created_at", None) is None:
+            session.created_at = time.time()
@@ -0,0 +1,231 @@
+"""
+热备会话池：同一账号同时保持 K 个互相独立的 ehall 会话，抢课中途当前会话失效时立即切换。
+
+抢课只用一个 session，一旦它在高峰期被服务器注销（请求被重定向到登录页）或连接反复出错，
+原来要么停止抢课（GUI 的「致命错误」），要么只能等下一次完整登录，损失的往往是最关键的几秒。
+SessionPool 的做法：
+    - 开抢前用当前会话中统一认证的 TGT 派生（derive_session）K 个热备会话，不额外走 getChiperKey / casLogin；
+    - 后台线程定时用 check_session 探测热备会话（探测本身也起到保活作用），失效的丢弃并补充；
+    - 抢课循环把每次请求的结果交给 report()：登录失效立即切换，连续 error_limit 次网络层异常也切换；
+    - 切换只是从热备队列里取出一个，耗时可忽略；随后后台补充新的热备会话。
+      派生失败（统一认证会话也已失效）时回退到 relogin 完整登录。
+    - 热备用完时抢课线程不会自己去派生或登录（可能耗时数秒），而是继续用当前会话，
+      由后台线程创建新会话，创建好后立即切换。
+
+并发抢课时额外的在途请求也需要各自独立的会话，通过 lease() 从热备中借出。
+
+切换后通过 on_failover(session, reason) 回调通知调用方（替换验证码预取、余量监视所用的 session），
+回调在执行切换的线程中调用。
+"""
+import logging
+import threading
+import time
+
+from session_store import SESSION_EXPIRED, check_session, derive_session
+
+STANDBY_COUNT = 2
+HEALTH_INTERVAL = 30
+# 连续多少次网络层异常后切换会话
+TRANSPORT_ERROR_LIMIT = 3
+# 创建新会话失败后，后台线程至少间隔多少秒再尝试
+RETRY_INTERVAL = 5
+
+# 抢课请求被重定向到登录页时返回的状态码与消息（与其他本地构造的错误一样用 500，不作为验证码学习依据）
+LOGIN_EXPIRED_CODE = 500
+LOGIN_EXPIRED_MSG = "登录已失效，请求被重定向到登录页"
+TRANSPORT_ERROR_MSG = "服务器繁忙，请求异常"
+
+_log = logging.getLogger(__name__)
+
+# session_fault() 的结果
+FAULT_EXPIRED = "expired"
+FAULT_TRANSPORT = "transport"
+
+
+def session_fault(code, msg):
+    """对一次抢课请求的结果归类：登录失效返回 FAULT_EXPIRED，网络层异常返回 FAULT_TRANSPORT，其余返回 None。"""
+    if code != LOGIN_EXPIRED_CODE:
+        return None
+    msg = msg or ""
+    if msg.startswith(LOGIN_EXPIRED_MSG):
+        return FAULT_EXPIRED
+    if msg.startswith(TRANSPORT_ERROR_MSG):
+        return FAULT_TRANSPORT
+    return None
+
+
+class SessionPool:
+    def __init__(self, session, relogin=None, size=STANDBY_COUNT, interval=HEALTH_INTERVAL,
+                 error_limit=TRANSPORT_ERROR_LIMIT, on_failover=None, derive=derive_session, check=check_session):
+        """
+        session: 当前使用的 ehall session，同时作为派生热备会话的统一认证 cookie 来源；
+        relogin: 可选的无参函数，派生失败时完整登录并返回新 session，失败返回 None。
+        """
+        self._active = session
+        self._source = session  # 派生热备会话所用的统一认证 cookie 来源
+        self._relogin = relogin
+        self.size = max(0, int(size))
+        self.interval = interval
+        self.error_limit = max(1, int(error_limit))
+        self.on_failover = on_failover
+        self._derive = derive
+        self._check = check
+        self._standby = []
+        self._errors = 0  # 当前会话连续网络层异常次数
+        # 需要切换但没有热备时记下失效的会话，由后台线程创建好新会话后切换
+        self._pending = None
+        self.failovers = 0
+        self.created = 0
+        self.last_error = None
+        self._lock = threading.Lock()  # 保护 _active / _standby / _errors / _pending
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def active(self):
+        return self._active
+
+    @property
+    def standby_count(self):
+        return len(self._standby)
+
+    def set_active(self, session):
+        """外部替换了当前会话（如保活线程重新登录），之后以它为准。"""
+        with self._lock:
+            self._active = session
+            self._source = session
+            self._errors = 0
+            self._pending = None
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="session-pool", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout=2)
+        self._thread = None
+
+    def lease(self, count=1):
+        """
+        借出至多 count 个热备会话供其他用途（如并发抢课的额外通道），不阻塞，热备不足时返回的会更少。
+        借出的会话不再由会话池探测或用于切换；后台随即补充热备。
+        """
+        with self._lock:
+            leased = self._standby[:count]
+            del self._standby[:count]
+        if leased:
+            self._wake.set()
+        return leased
+
+    def report(self, session, code, msg):
+        """
+        报告用 session 发出的一次请求的结果，返回之后应使用的 session。
+        session 已被其他线程换掉时直接返回当前会话；需要切换但暂无热备时返回原 session，
+        后台创建好新会话后再切换，不阻塞调用方。
+        """
+        fault = session_fault(code, msg)
+        with self._lock:
+            if session is not self._active:
+                return self._active
+            if fault is None:
+                self._errors = 0
+                return session
+            if fault == FAULT_TRANSPORT:
+                self._errors += 1
+                if self._errors < self.error_limit:
+                    return session
+        return self.failover(session, fault) or session
+
+    def failover(self, session, reason=FAULT_EXPIRED):
+        """
+        把失效的 session 换成热备会话，立即返回。
+        返回新的当前会话；session 已被其他线程换掉时返回当前会话；
+        暂无热备时返回 None，由后台线程创建新会话后自动切换。
+        """
+        with self._lock:
+            if session is not self._active:
+                if self._pending is not None and self._pending[0] is session:
+                    self._pending = None
+                return self._active
+            self._errors = 0
+            if not self._standby:
+                self._pending = (session, reason)
+                standby = None
+            else:
+                standby = self._standby.pop(0)
+                self._active = standby
+                self._pending = None
+                self.failovers += 1
+        # 唤醒后台线程补充热备（或为等待中的切换创建新会话）
+        self._wake.set()
+        if standby is not None and self.on_failover is not None:
+            self.on_failover(standby, reason)
+        return standby
+
+    def _create(self):
+        """从统一认证 cookie 派生一个新会话，派生失败时完整登录；都失败返回 None。"""
+        session, error = self._derive(self._source)
+        if session is None and self._relogin is not None:
+            session = self._relogin()
+            if session is not None:
+                # 新登录的统一认证会话也用于之后的派生
+                self._source = session
+                error = None
+        if session is None:
+            self.last_error = error or "重新登录失败"
+            return None
+        if getattr(session, "created_at", None) is None:
+            session.created_at = time.time()
+        self.created += 1
+        return session
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self._fill()
+            except Exception as e:
+                # 派生、登录中的任何异常都不能让后台线程退出，否则热备再也不会补充
+                self.last_error = e
+                _log.warning("补充热备会话失败: %s", e, exc_info=True)
+            # 有等待中的切换且这轮没能创建出新会话时，RETRY_INTERVAL 秒后重试
+            woken = self._wake.wait(RETRY_INTERVAL if self._pending is not None else self.interval)
+            self._wake.clear()
+            if self._stop.is_set():
+                break
+            if woken:
+                # 被切换唤醒：先补充热备，探测留到下一轮
+                continue
+            try:
+                self._check_standby()
+            except Exception as e:
+                self.last_error = e
+                _log.warning("检查热备会话失败: %s", e, exc_info=True)
+
+    def _fill(self):
+        while not self._stop.is_set() and (len(self._standby) < self.size or self._pending is not None):
+            session = self._create()
+            if session is None:
+                # 下一轮再试
+                return
+            with self._lock:
+                self._standby.append(session)
+                pending = self._pending
+            if pending is not None:
+                # 有等待中的切换：新会话一创建好就切过去
+                self.failover(*pending)
+
+    def _check_standby(self):
+        for session in list(self._standby):
+            if self._stop.is_set():
+                return
+            if self._check(session) == SESSION_EXPIRED:
+                with self._lock:
+                    if session in self._standby:
+                        self._standby.remove(session)
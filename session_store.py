@@ -0,0 +1,241 @@
+"""
+会话快照：按账号把登录成功的 session（cookie、ehall_referer、创建时间）保存到 sessions/ 目录。
+
+每次启动 main.py 或在 GUI 中登录都要走一遍完整的统一认证流程（getChiperKey → RSA 加密 → casLogin →
+带 ticket 重定向到 ehall，非可信设备还要手机验证码），耗时数秒且计入认证服务器的频率限制。
+有快照时先用一次 ehall 请求探测其是否仍然有效：有效则直接复用，重启或同时开第二个实例只需一次往返；
+探测失败才删除快照、回退到完整登录。
+
+derive_session() 则用已登录 session 中统一认证的 TGT cookie 为 ehall 另申请一张 ticket，
+需要多个并行 ehall 会话时只登录一次，其余会话都由它派生。
+
+快照中包含统一认证的 cookie，等同于登录凭据：文件权限设为仅当前用户可读写，目录已加入 .gitignore。
+"""
+import copy
+import json
+import os
+import re
+import time
+
+import requests
+
+from seu_auth import USER_AGENT, create_session
+from tls_transport import mount_tls
+
+EHALL_SERVICE_URL = "http://ehall.seu.edu.cn/gsapp/sys/jzxxtjapp/*default/index.do"
+AUTH_DOMAIN = "auth.seu.edu.cn"
+SESSIONS_DIR = "sessions"
+# 超过该时长（秒）的快照不再探测，直接视为过期
+SNAPSHOT_MAX_AGE = 12 * 3600
+# 观测到的会话存活时长，供 SessionKeeper 估计何时需要提前刷新
+LIFETIMES_FILE = "lifetimes.json"
+# 超过该时长（秒）的存活时长记录不再参与估计
+LIFETIME_MAX_AGE = 7 * 24 * 3600
+PROBE_TIMEOUT = 5
+PROBE_URL = "https://ehall.seu.edu.cn/gsapp/sys/jzxxtjapp/hdyy/queryActivityList.do"
+DEFAULT_REFERER = "https://ehall.seu.edu.cn/gsapp/sys/jzxxtjapp/*default/index.do"
+
+
+# check_session() 的三种结果
+SESSION_OK = "ok"
+SESSION_EXPIRED = "expired"
+SESSION_UNKNOWN = "unknown"  # 网络异常、服务器繁忙等，无法判断登录状态
+
+
+class SessionExpiredError(RuntimeError):
+    """ehall 请求被重定向到登录/门户页面，即当前 session 已失效。"""
+
+
+def is_login_redirect(url):
+    """响应的最终 URL 是登录页或门户页（ehall 会话已失效）时返回 True；VPN 跳转不算。"""
+    url = str(url or "")
+    return "vpn.seu.edu.cn" not in url and ("login" in url or "portal" in url)
+
+
+def copy_cookie_jar(session):
+    """
+    复制 session 的 cookie，返回新的 RequestsCookieJar。
+    验证码预取等线程可能正在往同一个 jar 写入 cookie，直接遍历会抛 RuntimeError，这里在 jar 自身的锁内取快照。
+    """
+    source = session.cookies
+    with source._cookies_lock:
+        cookies = list(source)
+    jar = requests.cookies.RequestsCookieJar()
+    for cookie in cookies:
+        jar.set_cookie(copy.copy(cookie))
+    return jar
+
+
+def check_session(session, timeout=PROBE_TIMEOUT):
+    """
+    用一次只取 1 条记录的讲座列表请求探测 session 的登录状态。
+    与 get_lecture_list 的判断一致：被重定向到 login / portal 页面即视为失效；
+    返回正常 JSON 为有效；请求异常、VPN 跳转或其他非预期响应无法判断。
+    """
+    try:
+        res = session.post(
+            f"{PROBE_URL}?_={int(time.time() * 1000)}",
+            data={"pageIndex": 1, "pageSize": 1},
+            headers={"Content-Type": "application/x-www-form-urlencoded; charset=UTF-8"},
+            verify=False, timeout=timeout,
+        )
+    except requests.exceptions.RequestException:
+        return SESSION_UNKNOWN
+    final_url = str(res.url or "")
+    if "vpn.seu.edu.cn" in final_url:
+        return SESSION_UNKNOWN
+    if is_login_redirect(final_url):
+        return SESSION_EXPIRED
+    try:
+        return SESSION_OK if "datas" in res.json() else SESSION_UNKNOWN
+    except ValueError:
+        return SESSION_UNKNOWN
+
+
+def probe_session(session, timeout=PROBE_TIMEOUT):
+    """session 确认仍然有效时返回 True。"""
+    return check_session(session, timeout) == SESSION_OK
+
+
+def new_session():
+    """创建与登录后 session 配置一致（不读代理环境变量、TLS 适配器、UA）的空 session。"""
+    session = create_session()
+    session.headers.update({"User-Agent": USER_AGENT})
+    mount_tls(session)
+    return session
+
+
+def derive_session(session, service_url=EHALL_SERVICE_URL, timeout=10):
+    """
+    用已登录 session 中统一认证的 cookie（TGT）为讲座系统再申请一张 service ticket，
+    得到一个与原 session 互相独立的 ehall 会话，无需再走 getChiperKey / casLogin。
+    返回 (session, error_info)；统一认证会话已失效等情况下 session 为 None，由调用方回退到完整登录。
+    """
+    derived = new_session()
+    # 原 session 可能正被抢课、验证码预取线程使用，在 jar 的锁内复制
+    for cookie in copy_cookie_jar(session):
+        if cookie.domain.lstrip(".").endswith(AUTH_DOMAIN):
+            derived.cookies.set_cookie(cookie)
+    if not derived.cookies:
+        return None, "没有可用的统一认证 cookie"
+    try:
+        # 未登录的新 session 访问 ehall 会被重定向到统一认证，带着 TGT 即可直接拿到 ticket 跳回 ehall
+        res = derived.get(service_url, verify=False, allow_redirects=True, timeout=timeout)
+    except requests.exceptions.RequestException as e:
+        return None, f"申请 ticket 失败: {e}"
+    final_url = str(res.url or "")
+    if res.status_code != 200 or AUTH_DOMAIN in final_url or "login" in final_url:
+        return None, "统一认证会话已失效"
+    derived.ehall_referer = final_url
+    derived.created_at = time.time()
+    return derived, None
+
+
+class SessionStore:
+    """按账号读写会话快照，每个账号一个 JSON 文件。"""
+
+    def __init__(self, directory=SESSIONS_DIR, max_age=SNAPSHOT_MAX_AGE):
+        self.directory = directory
+        self.max_age = max_age
+
+    def path(self, username):
+        # 账号只用作文件名，去掉路径分隔符等字符
+        return os.path.join(self.directory, re.sub(r"[^0-9A-Za-z_.-]", "_", username) + ".json")
+
+    def save(self, username, session):
+        """保存 session 的快照（先写临时文件再替换）。保存失败不影响登录，返回是否成功。"""
+        cookies = [
+            {"name": c.name, "value": c.value, "domain": c.domain, "path": c.path,
+             "secure": c.secure, "expires": c.expires}
+            for c in session.cookies
+        ]
+        snapshot = {
+            "username": username,
+            "created_at": getattr(session, "created_at", None) or time.time(),
+            "ehall_referer": getattr(session, "ehall_referer", None),
+            "cookies": cookies,
+        }
+        path = self.path(username)
+        tmp_path = f"{path}.tmp"
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(snapshot, f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+        except OSError:
+            return False
+        return True
+
+    def load(self, username):
+        """读取快照并构造 session，不做有效性探测；没有快照、已过期或文件损坏时返回 None。"""
+        try:
+            with open(self.path(username), encoding="utf-8") as f:
+                snapshot = json.load(f)
+        except (OSError, ValueError):
+            return None
+        created_at = snapshot.get("created_at") or 0
+        if time.time() - created_at > self.max_age:
+            return None
+
+        session = new_session()
+        for c in snapshot.get("cookies", []):
+            session.cookies.set(
+                c["name"], c["value"], domain=c.get("domain"), path=c.get("path") or "/",
+                secure=c.get("secure", False), expires=c.get("expires"),
+            )
+        session.ehall_referer = snapshot.get("ehall_referer") or DEFAULT_REFERER
+        session.created_at = created_at
+        return session
+
+    def record_lifetime(self, seconds, keep=20):
+        """记录一次观测到的会话存活时长（秒），只保留最近 keep 条。"""
+        if seconds <= 0:
+            return
+        records = self._lifetime_records()[-(keep - 1):] + [[round(seconds, 1), round(time.time())]]
+        path = os.path.join(self.directory, LIFETIMES_FILE)
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(f"{path}.tmp", "w", encoding="utf-8") as f:
+                json.dump(records, f)
+            os.replace(f"{path}.tmp", path)
+        except OSError:
+            pass
+
+    def lifetimes(self, max_age=LIFETIME_MAX_AGE):
+        """返回最近 max_age 秒内记录的存活时长（秒）。"""
+        now = time.time()
+        return [seconds for seconds, recorded_at in self._lifetime_records() if now - recorded_at <= max_age]
+
+    def _lifetime_records(self):
+        """读取 [[存活秒数, 记录时间戳], ...]；旧格式（只有秒数、没有记录时间）的条目直接丢弃。"""
+        try:
+            with open(os.path.join(self.directory, LIFETIMES_FILE), encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return []
+        records = []
+        for item in data if isinstance(data, list) else []:
+            try:
+                seconds, recorded_at = float(item[0]), float(item[1])
+            except (TypeError, ValueError, IndexError, KeyError):
+                continue
+            if seconds > 0:
+                records.append([seconds, recorded_at])
+        return records
+
+    def discard(self, username):
+        try:
+            os.remove(self.path(username))
+        except OSError:
+            pass
+
+    def restore(self, username, probe=probe_session):
+        """读取快照并探测：仍然有效返回 session，否则删除快照并返回 None。"""
+        session = self.load(username)
+        if session is None:
+            return None
+        if probe(session):
+            return session
+        self.discard(username)
+        return None
@@ -4,6 +4,8 @@
 get_pub_key()函数用于获取RSA公钥；
 rsa_encrypt()函数用于使用RSA公钥加密用户密码；
 seu_login()函数用于发起登录请求，返回成功登录的session和包含了ticket的重定向url。包括了对前两个函数的调用，一般只需要导入seu_login()函数即可。
+LoginPipeline类把一次登录的各步骤放在同一个auth session（同一条TLS连接）上完成，可以在用户输入账号密码、
+手机验证码的同时提前在后台获取公钥，并记录各阶段耗时；seu_login()即是对它的简单封装。
 
 使用方法：
 1. 导入seu_login()函数；
@@ -18,14 +20,22 @@ License: GPL-3.0 License
 
 import base64
 import json
-import ssl
+import threading
+import time
+from contextlib import contextmanager
+from functools import lru_cache
 from urllib.parse import unquote
 
 import requests
 from Crypto.Cipher import PKCS1_v1_5
 from Crypto.PublicKey import RSA
 
-from requests.adapters import HTTPAdapter
+from tls_transport import TLSAdapter
+
+USER_AGENT = ('Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) '
+              'Chrome/115.0.0.0 Safari/537.36')
+# 预取的公钥超过该时长（秒）未使用则作废，登录时重新获取
+PUB_KEY_MAX_AGE = 120
 
 
 def create_session():
@@ -34,58 +44,47 @@ def create_session():
     session.trust_env = False
     return session
 
-class TLSAdapter(HTTPAdapter):
-    """
-    用于支持TLSv1.2的适配器。解决校园网内脚本ssl报错。
+def create_auth_session():
+    """创建访问统一身份认证平台的session（TLS适配器与必填的Headers）。"""
+    session = create_session()
+    session.mount("https://", TLSAdapter())
+
+    # Headers中的Content-Type、UA必填；
+    # Host、Origin、Referer在后续访问其他服务时大多需要填，内容自己去抓包看；
+    # 经测试，以下Headers中注释掉的字段均不影响身份认证的登录过程，但访问其他服务时需要自行抓包填写。
+    headers = {
+        # 'Accept': 'application/json',
+        # 'Accept-Encoding': 'gzip, deflate, br',
+        # 'Accept-Language': 'zh-CN,zh;q=0.9,en;q=0.8,en-GB;q=0.7,en-US;q=0.6',
+        # 'Connection': 'keep-alive',
+        'Content-Type':
+        'application/json',
+        # 'Host': 'auth.seu.edu.cn',
+        # 'Origin': 'https://auth.seu.edu.cn',
+        # 'Referer': 'https://auth.seu.edu.cn/dist/',
+        # 'Sec-Fetch-Dest': 'empty',
+        # 'Sec-Fetch-Mode': 'cors',
+        # 'Sec-Fetch-Site': 'same-origin',
+        'User-Agent': USER_AGENT
+    }
+    session.headers.update(headers)
+    return session
 
-    @author: zhjcreator
-    """
-    def init_poolmanager(self, *args, **kwargs):
-        ctx = ssl.create_default_context()
-        # 降低安全级别以允许旧协议重协商
-        ctx.set_ciphers("DEFAULT@SECLEVEL=1")
-        ctx.check_hostname=False
-        # 禁用证书验证（解决证书验证失败问题）
-        ctx.verify_mode = ssl.CERT_NONE
-        # 启用OP_LEGACY_SERVER_CONNECT（关键配置）
-        ctx.options |= 0x4  # 对应ssl.OP_LEGACY_SERVER_CONNECT
-        kwargs["ssl_context"] = ctx
-        return super().init_poolmanager(*args, **kwargs)
-
-
-def get_pub_key():
+
+def get_pub_key(session=None):
     """从服务器请求RSA公钥并保存cookie（使用session就不需要另外保存cookie）。
     RSA公钥是变化的，并且应该和cookie有关联，每次登录前需要重新获取。
 
+    Args:
+        session: 可选，已有的auth session（复用其cookie与连接），不传则新建
+
     Returns:
         session: 包含了和公钥配对的cookie的session，用于后续发起登录请求
         pub_key: RSA公钥
     """
     try:
-        session = create_session()
-        session.mount("https://", TLSAdapter())
-
-        # Headers中的Content-Type、UA必填；
-        # Host、Origin、Referer在后续访问其他服务时大多需要填，内容自己去抓包看；
-        # 经测试，以下Headers中注释掉的字段均不影响身份认证的登录过程，但访问其他服务时需要自行抓包填写。
-        headers = {
-            # 'Accept': 'application/json',
-            # 'Accept-Encoding': 'gzip, deflate, br',
-            # 'Accept-Language': 'zh-CN,zh;q=0.9,en;q=0.8,en-GB;q=0.7,en-US;q=0.6',
-            # 'Connection': 'keep-alive',
-            'Content-Type':
-            'application/json',
-            # 'Host': 'auth.seu.edu.cn',
-            # 'Origin': 'https://auth.seu.edu.cn',
-            # 'Referer': 'https://auth.seu.edu.cn/dist/',
-            # 'Sec-Fetch-Dest': 'empty',
-            # 'Sec-Fetch-Mode': 'cors',
-            # 'Sec-Fetch-Site': 'same-origin',
-            'User-Agent':
-            'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) '
-            'Chrome/115.0.0.0 Safari/537.36'
-        }
-        session.headers.update(headers)
+        if session is None:
+            session = create_auth_session()
         url = 'https://auth.seu.edu.cn/auth/casback/getChiperKey'
         res = session.post(url=url, data=json.dumps({}))
 
@@ -100,6 +99,22 @@ def get_pub_key():
         return None, None
 
 
+@lru_cache(maxsize=8)
+def load_pub_key(pub_key):
+    """解析服务器返回的公钥（base64url）并构造加密器。同一公钥加密密码和手机验证码时只解析一次。
+
+    Args:
+        pub_key: 服务器提供的公钥
+
+    Returns:
+        cipher: PKCS1_v1_5加密器
+    """
+    pub_key = pub_key.replace('-', '+').replace('_',
+                                                '/')  # base64url -> base64
+    pub_key = '-----BEGIN PUBLIC KEY-----\n' + pub_key + '\n-----END PUBLIC KEY-----'
+    return PKCS1_v1_5.new(RSA.importKey(pub_key))
+
+
 def rsa_encrypt(message, pub_key):
     """使用服务器返回的公钥对用户密码进行RSA加密。
 
@@ -111,11 +126,7 @@ def rsa_encrypt(message, pub_key):
         cipher_text: 加密后的用户密码（base64）
     """
     try:
-        pub_key = pub_key.replace('-', '+').replace('_',
-                                                    '/')  # base64url -> base64
-        pub_key = '-----BEGIN PUBLIC KEY-----\n' + pub_key + '\n-----END PUBLIC KEY-----'
-        rsa_key = RSA.importKey(pub_key)
-        cipher = PKCS1_v1_5.new(rsa_key)
+        cipher = load_pub_key(pub_key)
         cipher_text = base64.b64encode(cipher.encrypt(
             message.encode()))  # base64
 
@@ -126,73 +137,153 @@ def rsa_encrypt(message, pub_key):
         return None
 
 
-def seu_login(username, password, service_url='', fingerprint=None, mobile_verify_code=None):
+
+
+class LoginPipeline:
+    """一次完整的登录流程：getChiperKey → RSA加密 → casLogin，非可信设备时还有发送手机验证码 → 再次casLogin。
+
+    所有请求都使用同一个auth session，复用同一条TLS连接和cookie；公钥可以用prefetch()提前在后台获取，
+    与用户输入账号密码、手机验证码重叠，casLogin时只需等待尚未完成的部分。
+    每个公钥只用于一次casLogin。timings记录各阶段耗时（秒），调用方可用timed()补记后续阶段（如redirect）。
+    """
+
+    def __init__(self, session=None):
+        self.session = session
+        self.timings = {}
+        self._key = None  # (公钥, 获取时刻)
+        self._thread = None
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def timed(self, stage):
+        """记录with块的耗时到timings[stage]。"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[stage] = time.perf_counter() - start
+
+    def format_timings(self):
+        return ' · '.join(f'{stage} {seconds:.2f}s' for stage, seconds in self.timings.items())
+
+    def prefetch(self):
+        """在后台线程获取并解析公钥，立即返回。正在获取或已有未过期的公钥时什么也不做。"""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return self
+            if self._fresh_key() is not None:
+                return self
+            self._thread = threading.Thread(target=self._fetch_key, name='auth-prefetch', daemon=True)
+            self._thread.start()
+        return self
+
+    def _fresh_key(self):
+        key = self._key
+        if key is not None and time.monotonic() - key[1] <= PUB_KEY_MAX_AGE:
+            return key[0]
+        return None
+
+    def _fetch_key(self):
+        with self.timed('getChiperKey'):
+            session, pub_key = get_pub_key(self.session)
+        if pub_key:
+            self.session = session
+            load_pub_key(pub_key)  # 提前解析，casLogin前只剩加密本身
+            self._key = (pub_key, time.monotonic())
+
+    def take_pub_key(self):
+        """取出一个可用的公钥：等待进行中的预取，没有可用公钥时当场获取；失败返回None。"""
+        thread = self._thread
+        if thread is not None:
+            with self.timed('keyWait'):
+                thread.join()
+            self._thread = None
+        pub_key = self._fresh_key()
+        if pub_key is None:
+            self._fetch_key()
+            pub_key = self._fresh_key()
+        self._key = None
+        return pub_key
+
+    def login(self, username, password, service_url='', fingerprint=None, mobile_verify_code=None):
+        """向统一身份认证平台发起登录请求，参数与返回值同seu_login()。"""
+        # 获取RSA公钥（已预取时直接使用）
+        pub_key = self.take_pub_key()
+        if not pub_key:
+            return None, None, "获取RSA公钥失败，请检查网络连接"
+        session = self.session
+
+        # 使用服务器返回的RSA公钥加密用户密码
+        with self.timed('encrypt'):
+            encrypted_password = rsa_encrypt(password, pub_key)
+            encrypted_code = rsa_encrypt(mobile_verify_code, pub_key) if mobile_verify_code else ''
+        if not encrypted_password:
+            return None, None, "密码加密失败"
+
+        # 发起登录请求
+        try:
+            url = 'https://auth.seu.edu.cn/auth/casback/casLogin'
+            data = {
+                'captcha': '',
+                'loginType': 'account',
+                'mobilePhoneNum': '',
+                'mobileVerifyCode': '',
+                'password': encrypted_password,
+                'rememberMe': False,
+                'service': service_url,
+                'username': username,
+                'wxBinded': False,
+            }
+            if fingerprint:
+                data['fingerPrint'] = fingerprint
+            if mobile_verify_code:
+                data['mobileVerifyCode'] = encrypted_code
+            with self.timed('casLogin'):
+                res = session.post(url=url, data=json.dumps(data))
+
+            if res.status_code != 200:
+                raise Exception(f'[{res.status_code} {res.reason}]')
+
+            result = res.json()
+            if not result.get('success'):
+                error_msg = result.get('info', '登录失败')
+                print(f'Authentication failed: {error_msg}')
+                if '非可信设备' in error_msg:
+                    return session, None, 'non_trusted_device'
+                return None, None, error_msg
+
+            print('Successfully authenticated')
+
+            # 未指定服务，无需重定向，直接返回session
+            if result.get('redirectUrl') is None:
+                return session, None, None
+
+            # 指定服务，返回重定向url（含ticket）
+            redirect_url = unquote(result['redirectUrl'])
+
+            return session, redirect_url, None
+        except Exception as e:
+            print('Failed to authenticate, info:', e)
+            error_str = str(e)
+            if '非可信设备' in error_str:
+                return session, None, 'non_trusted_device'
+            return None, None, f"认证请求异常: {error_str}"
+
+
+def seu_login(username, password, service_url='', fingerprint=None, mobile_verify_code=None, pipeline=None):
     """向统一身份认证平台发起登录请求。
 
     Args:
         username: 一卡通号
         password: 用户密码（明文）
         service_url: 所要访问服务的url，如`http://ehall.seu.edu.cn`
+        pipeline: 可选，已预取公钥或需要沿用auth session（如手机验证码登录）的LoginPipeline
 
     Returns:
         session: 成功通过身份认证的session，用于后续访问其他服务
         redirect_url: 登录后重定向到所要访问的服务的url
         error_info: 失败时返回错误信息字符串，成功时为 None
     """
-    # 获取RSA公钥
-    session, pub_key = get_pub_key()
-    if not session:
-        return None, None, "获取RSA公钥失败，请检查网络连接"
-
-    # 使用服务器返回的RSA公钥加密用户密码
-    encrypted_password = rsa_encrypt(password, pub_key)
-    if not encrypted_password:
-        return None, None, "密码加密失败"
-
-    # 发起登录请求
-    try:
-        url = 'https://auth.seu.edu.cn/auth/casback/casLogin'
-        data = {
-            'captcha': '',
-            'loginType': 'account',
-            'mobilePhoneNum': '',
-            'mobileVerifyCode': '',
-            'password': encrypted_password,
-            'rememberMe': False,
-            'service': service_url,
-            'username': username,
-            'wxBinded': False,
-        }
-        if fingerprint:
-            data['fingerPrint'] = fingerprint
-        if mobile_verify_code:
-            data['mobileVerifyCode'] = rsa_encrypt(mobile_verify_code, pub_key)
-        res = session.post(url=url, data=json.dumps(data))
-
-        if res.status_code != 200:
-            raise Exception(f'[{res.status_code} {res.reason}]')
-
-        result = res.json()
-        if not result.get('success'):
-            error_msg = result.get('info', '登录失败')
-            print(f'Authentication failed: {error_msg}')
-            if '非可信设备' in error_msg:
-                return session, None, 'non_trusted_device'
-            return None, None, error_msg
-
-        print('Successfully authenticated')
-
-        # 未指定服务，无需重定向，直接返回session
-        if result.get('redirectUrl') is None:
-            return session, None, None
-
-        # 指定服务，返回重定向url（含ticket）
-        redirect_url = unquote(result['redirectUrl'])
-
-        return session, redirect_url, None
-    except Exception as e:
-        print('Failed to authenticate, info:', e)
-        error_str = str(e)
-        if '非可信设备' in error_str:
-            return session, None, 'non_trusted_device'
-        return None, None, f"认证请求异常: {error_str}"
+    if pipeline is None:
+        pipeline = LoginPipeline()
+    return pipeline.login(username, password, service_url, fingerprint, mobile_verify_code)
@@ -0,0 +1,32 @@
+from io import BytesIO
+
+import pytest
+
+pytest.importorskip("ddddocr")
+from PIL import Image
+
+from ocr_pool import OcrWorkerPool
+
+
+def _image():
+    buf = BytesIO()
+    Image.new("RGB", (100, 30), "white").save(buf, format="PNG")
+    return buf.getvalue()
+
+
+@pytest.fixture
+def pool():
+    pool = OcrWorkerPool(workers=2, queue_size=1)
+    pool.warmup()
+    yield pool
+    pool.shutdown()
+
+
+def test_batch_larger_than_capacity_succeeds_on_idle_pool(pool):
+    images = [_image() for _ in range(pool.workers + pool.queue_size + 3)]
+
+    results = pool.classify_many(images)
+
+    assert len(results) == len(images)
+    assert [error for _, error in results] == [None] * len(images)
+    assert pool.rejected == 0
@@ -0,0 +1,100 @@
+"""
+共享的 TLS 传输层：main.py、gui/backend.py、seu_auth.py 共用同一个兼容旧服务器的 SSLContext。
+
+- SSLContext 只构建一次，不再在每次创建连接池时重复 create_default_context() + set_ciphers()；
+- 按主机缓存 TLS 会话，二次登录换 session 后新连接可复用旧会话（会话恢复），省去完整握手；
+- mount_tls() 统一挂载适配器，并暴露连接池大小（pool_connections / pool_maxsize）。
+"""
+import ssl
+import threading
+import time
+import weakref
+
+from requests.adapters import HTTPAdapter
+
+# 每个 session 缓存的主机连接池个数，以及每个主机连接池保留的最大连接数
+POOL_CONNECTIONS = 4
+POOL_MAXSIZE = 16
+
+
+class _ResumingSSLContext(ssl.SSLContext):
+    """在 wrap_socket() 时自动带上该主机上一次的 TLS 会话，实现跨连接、跨 session 的会话恢复。"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__()
+        self._session_lock = threading.Lock()
+        self._sessions = {}    # server_hostname -> ssl.SSLSession
+        self._last_socks = {}  # server_hostname -> weakref(SSLSocket)
+
+    def _cached_session(self, key):
+        with self._session_lock:
+            # TLS 1.3 的会话票据在握手完成后才下发，因此从上一条连接上取最新的会话
+            ref = self._last_socks.get(key)
+            sock = ref() if ref else None
+            if sock is not None:
+                try:
+                    if sock.session is not None:
+                        self._sessions[key] = sock.session
+                except (ValueError, OSError):
+                    pass
+            session = self._sessions.get(key)
+            if session is not None and time.time() > session.time + session.timeout:
+                del self._sessions[key]
+                session = None
+            return session
+
+    def wrap_socket(self, sock, *args, server_hostname=None, session=None, **kwargs):
+        key = server_hostname
+        if session is None and key:
+            session = self._cached_session(key)
+        ssock = super().wrap_socket(sock, *args, server_hostname=server_hostname, session=session, **kwargs)
+        if key:
+            with self._session_lock:
+                self._last_socks[key] = weakref.ref(ssock)
+                if ssock.session is not None:
+                    self._sessions[key] = ssock.session
+        return ssock
+
+
+_ssl_context = None
+_ssl_context_lock = threading.Lock()
+
+
+def legacy_ssl_context():
+    """返回进程内共享的 SSLContext（首次调用时构建）。"""
+    global _ssl_context
+    if _ssl_context is None:
+        with _ssl_context_lock:
+            if _ssl_context is None:
+                ctx = _ResumingSSLContext(ssl.PROTOCOL_TLS_CLIENT)
+                # 降低安全级别以允许旧协议重协商
+                ctx.set_ciphers("DEFAULT@SECLEVEL=1")
+                ctx.check_hostname = False
+                # 禁用证书验证（解决证书验证失败问题）
+                ctx.verify_mode = ssl.CERT_NONE
+                # 启用OP_LEGACY_SERVER_CONNECT（关键配置）
+                ctx.options |= 0x4  # 对应ssl.OP_LEGACY_SERVER_CONNECT
+                _ssl_context = ctx
+    return _ssl_context
+
+
+class TLSAdapter(HTTPAdapter):
+    """
+    用于支持TLSv1.2的适配器。解决校园网内脚本ssl报错。
+
+    @author: zhjcreator
+    """
+    def __init__(self, pool_connections=POOL_CONNECTIONS, pool_maxsize=POOL_MAXSIZE, **kwargs):
+        super().__init__(pool_connections=pool_connections, pool_maxsize=pool_maxsize, **kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        kwargs["ssl_context"] = legacy_ssl_context()
+        return super().init_poolmanager(*args, **kwargs)
+
+
+def mount_tls(session, pool_connections=POOL_CONNECTIONS, pool_maxsize=POOL_MAXSIZE):
+    """给 session 的 http:// 与 https:// 挂载共享 SSLContext 的适配器，返回该 session。"""
+    adapter = TLSAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
@@ -0,0 +1,65 @@
+"""
+从已标注的验证码图片生成感知哈希索引 captcha_phash_table.csv。
+
+标签来源（按优先级）：
+1. 位于 true 目录且文件名形如 captcha_<n>_code<label>.jpg（服务器已确认正确）；
+2. 图片原始字节 md5 命中 captcha_hash_table.csv 的新键条目。
+
+用法：
+    python tools/build_phash_index.py --images code_img/true
+    python tools/build_phash_index.py --images code_img --out captcha_phash_table.csv
+"""
+import argparse
+import os
+import re
+import sys
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+
+from captcha_phash import PerceptualIndex, dhash
+from captcha_table import CaptchaHashTable, raw_digest
+
+_LABEL_RE = re.compile(r"_code([0-9A-Za-z]+)\.")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="生成验证码感知哈希索引")
+    parser.add_argument("--images", nargs="+", required=True, help="验证码图片目录")
+    parser.add_argument("--table", default=os.path.join(PROJECT_ROOT, "captcha_hash_table.csv"))
+    parser.add_argument("--out", default=os.path.join(PROJECT_ROOT, "captcha_phash_table.csv"))
+    args = parser.parse_args()
+
+    table = CaptchaHashTable(args.table)
+    index = PerceptualIndex(args.out)
+    before = len(index)
+    skipped = 0
+
+    for path in args.images:
+        for root, _, files in os.walk(path):
+            for name in sorted(files):
+                if not name.lower().endswith((".jpg", ".jpeg", ".png")):
+                    continue
+                with open(os.path.join(root, name), "rb") as f:
+                    img_bytes = f.read()
+                label = None
+                m = _LABEL_RE.search(name)
+                if m and os.path.basename(root) == "true":
+                    label = m.group(1)
+                else:
+                    label = table.get(raw_digest(img_bytes))
+                if not label:
+                    skipped += 1
+                    continue
+                try:
+                    index.add(dhash(img_bytes), label)
+                except Exception:
+                    skipped += 1
+
+    index.save(args.out)
+    print(f"索引条目: {len(index)}（新增 {len(index) - before}，跳过无标签/无法解码 {skipped}）")
+    print(f"已写入: {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""
+把 CSV 验证码对照表转换为 mmap 查找用的二进制格式（captcha_hash_table.bin）。
+
+只转换新键（原始字节 md5）条目；旧格式条目需要先用 migrate_captcha_table.py 迁移，
+否则转换后将不再可用。程序启动时同目录下存在不旧于 CSV 的 .bin 即优先加载 .bin，
+CSV 有更新时需重新运行本脚本。
+
+用法：
+    python tools/convert_captcha_table.py
+    python tools/convert_captcha_table.py --table captcha_hash_table.csv --out captcha_hash_table.bin
+"""
+import argparse
+import os
+import sys
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+
+from captcha_table import PackedTable, read_table, write_binary_table
+
+
+def main():
+    parser = argparse.ArgumentParser(description="将验证码对照表转换为二进制格式")
+    parser.add_argument("--table", default=os.path.join(PROJECT_ROOT, "captcha_hash_table.csv"))
+    parser.add_argument("--out", help="输出路径，默认与 --table 同名的 .bin")
+    args = parser.parse_args()
+
+    raw, legacy = read_table(args.table)
+    invalid = [h for h in raw if len(h) != 32]
+    for hash_val in invalid:
+        del raw[hash_val]
+
+    out = args.out or os.path.splitext(args.table)[0] + ".bin"
+    width = write_binary_table(out, raw)
+
+    # 回读校验
+    packed = PackedTable(out)
+    mismatched = sum(1 for hash_val, label in raw.items() if packed.get(hash_val) != label)
+    packed.close()
+
+    print(f"已写入: {out}（{len(raw)} 条，标签宽度 {width} 字节，文件 {os.path.getsize(out)} 字节）")
+    if invalid:
+        print(f"跳过格式错误的键: {len(invalid)}")
+    if legacy:
+        print(f"注意：{len(legacy)} 条旧格式条目未转换，请先运行 tools/migrate_captcha_table.py 迁移")
+    if mismatched:
+        print(f"校验失败: {mismatched} 条")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+把验证码对照表迁移为以原始图片字节 md5 为键的新格式。
+
+md5 不可逆，旧表（PIL 重新编码后的 md5）无法直接换算成新键，需要原始验证码图片：
+命令行与 GUI 开启 save_code 时保存在 code_img/ 下的图片正是 vcode.do 返回的原始字节。
+
+对每张图片同时计算新旧两种键：
+- 旧键命中旧表 → 以新键记录该标签；
+- 位于 true 目录且文件名形如 captcha_<n>_code<label>.jpg（服务器已确认正确）→ 直接以文件名中的标签记录。
+未能迁移的旧条目默认保留在文件的 legacy 段中，仍可通过兼容路径命中。
+
+用法：
+    python tools/migrate_captcha_table.py --images code_img/true code_img/false
+    python tools/migrate_captcha_table.py --images code_img --out new_table.csv --drop-legacy
+"""
+import argparse
+import os
+import re
+import sys
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+
+from captcha_table import legacy_digest, raw_digest, read_table, write_table
+
+_LABEL_RE = re.compile(r"_code([0-9A-Za-z]+)\.")
+
+
+def iter_images(paths):
+    for path in paths:
+        if os.path.isfile(path):
+            yield path
+            continue
+        for root, _, files in os.walk(path):
+            for name in sorted(files):
+                if name.lower().endswith((".jpg", ".jpeg", ".png", ".gif", ".bmp")):
+                    yield os.path.join(root, name)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="将验证码对照表迁移为原始字节 md5 键")
+    parser.add_argument("--table", default=os.path.join(PROJECT_ROOT, "captcha_hash_table.csv"))
+    parser.add_argument("--images", nargs="+", required=True, help="原始验证码图片文件或目录（如 code_img/）")
+    parser.add_argument("--out", help="输出路径，默认覆盖 --table")
+    parser.add_argument("--drop-legacy", action="store_true", help="不保留未能迁移的旧条目")
+    args = parser.parse_args()
+
+    raw, legacy = read_table(args.table) if os.path.exists(args.table) else ({}, {})
+    migrated = set()
+    from_name = conflicts = unreadable = 0
+
+    for path in iter_images(args.images):
+        with open(path, "rb") as f:
+            img_bytes = f.read()
+        key = raw_digest(img_bytes)
+        label = None
+        try:
+            old_key = legacy_digest(img_bytes)
+        except Exception:
+            unreadable += 1
+            continue
+        if old_key in legacy:
+            label = legacy[old_key]
+            migrated.add(old_key)
+        m = _LABEL_RE.search(os.path.basename(path))
+        if m and os.path.basename(os.path.dirname(path)) == "true":
+            if label is not None and label != m.group(1):
+                conflicts += 1
+            # 服务器确认过的标签优先
+            label = m.group(1)
+            from_name += 1
+        if label is not None:
+            raw[key] = label
+
+    if args.drop_legacy:
+        legacy = {}
+    else:
+        legacy = {k: v for k, v in legacy.items() if k not in migrated}
+
+    out = args.out or args.table
+    write_table(out, raw, legacy)
+    print(f"新键条目: {len(raw)}（其中旧表迁移 {len(migrated)}，文件名标签 {from_name}，标签冲突 {conflicts}）")
+    print(f"保留的旧条目: {len(legacy)}，无法解码的图片: {unreadable}")
+    print(f"已写入: {out}")
+
+
+if __name__ == "__main__":
+    main()
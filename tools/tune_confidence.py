@@ -0,0 +1,82 @@
+"""
+根据置信度日志（captcha_confidence.csv）调整 OCR 置信度阈值。
+
+日志每行 `confidence,correct`，由抢课时 CaptchaSolver.feedback() 写入。对每个候选阈值 t，
+低于 t 的结果被丢弃并重新获取验证码，其余结果提交给服务器。按下面的模型估算每次成功通过验证码的期望耗时：
+
+    期望耗时 = (获取验证码耗时 + 提交比例 × (提交往返 + 错误率 × 错误惩罚)) / (提交比例 × 正确率)
+
+取期望耗时最小的阈值。阈值生效后被丢弃的结果不会提交，日志中记为 `confidence,-`，
+只计入丢弃数量、不参与估算；收集数据时可先把阈值设为 0（默认即为 0，或删除 captcha_threshold.txt）。
+
+用法：
+    python tools/tune_confidence.py
+    python tools/tune_confidence.py --log captcha_confidence.csv --fetch 0.15 --rtt 0.2 --penalty 0.3 --write
+"""
+import argparse
+import math
+import os
+import sys
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+
+from ocr_confidence import CONFIDENCE_LOG, THRESHOLD_PATH, read_log
+
+
+def evaluate(samples, threshold, fetch, rtt, penalty):
+    """返回 (提交比例, 提交结果的正确率, 每次成功的期望耗时)。"""
+    kept = [correct for confidence, correct in samples if confidence >= threshold]
+    if not kept:
+        return 0.0, 0.0, float("inf")
+    keep_rate = len(kept) / len(samples)
+    accuracy = sum(kept) / len(kept)
+    if accuracy == 0:
+        return keep_rate, accuracy, float("inf")
+    cost = (fetch + keep_rate * (rtt + (1 - accuracy) * penalty)) / (keep_rate * accuracy)
+    return keep_rate, accuracy, cost
+
+
+def main():
+    parser = argparse.ArgumentParser(description="根据提交结果调整 OCR 置信度阈值")
+    parser.add_argument("--log", default=os.path.join(PROJECT_ROOT, CONFIDENCE_LOG))
+    parser.add_argument("--fetch", type=float, default=0.15, help="获取并识别一张验证码的耗时（秒）")
+    parser.add_argument("--rtt", type=float, default=0.2, help="一次 yySave.do 往返耗时（秒）")
+    parser.add_argument("--penalty", type=float, default=0.3, help="验证码错误后的额外等待（秒）")
+    parser.add_argument("--write", action="store_true", help=f"把建议阈值写入 {THRESHOLD_PATH}")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.log):
+        print(f"未找到置信度日志: {args.log}")
+        sys.exit(1)
+    samples = read_log(args.log)
+    dropped = sum(1 for _, correct in samples if correct is None)
+    samples = [(confidence, correct) for confidence, correct in samples if correct is not None]
+    if dropped:
+        print(f"低于当时阈值被丢弃的样本: {dropped}（未提交，不参与估算）")
+    if not samples:
+        print("置信度日志中没有已提交的样本")
+        sys.exit(1)
+
+    correct = sum(c for _, c in samples)
+    print(f"样本数: {len(samples)}，整体正确率: {correct / len(samples):.1%}")
+    # 候选阈值：0 与所有出现过的置信度
+    thresholds = sorted({0.0} | {confidence for confidence, _ in samples})
+    best = min(thresholds, key=lambda t: evaluate(samples, t, args.fetch, args.rtt, args.penalty)[2])
+
+    print(f"{'阈值':>8}{'提交比例':>10}{'正确率':>10}{'期望耗时(s)':>14}")
+    for t in (0.0, 0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9, best):
+        keep_rate, accuracy, cost = evaluate(samples, t, args.fetch, args.rtt, args.penalty)
+        mark = "  ← 建议" if t == best else ""
+        print(f"{t:>8.4f}{keep_rate:>10.1%}{accuracy:>10.1%}{cost:>14.3f}{mark}")
+
+    if args.write:
+        path = os.path.join(PROJECT_ROOT, THRESHOLD_PATH)
+        with open(path, "w", encoding="utf-8") as f:
+            # 向下取整，确保恰好等于阈值的样本仍被保留
+            f.write(f"{math.floor(best * 1e6) / 1e6:.6f}\n")
+        print(f"已写入: {path}")
+
+
+if __name__ == "__main__":
+    main()